@@ -1,7 +1,52 @@
-from data.csv_handler import CSVHandler
-from data.sql_handler import SQLHandler
-from data.mongo_handler import MongoHandler
-from shared.state import update_state
+import importlib
+import os
+
+from shared.state import create_initial_state, update_state
+
+
+# =============================================
+# 0. HANDLER REGISTRY (Import handlers only when needed)
+# =============================================
+# Handlers pull in pandas/pyarrow, which dominates start-up time for short
+# worker processes. They are imported on first use instead of at import time.
+
+HANDLER_REGISTRY = {
+    "csv": ("data.csv_handler", "CSVHandler"),
+    "sqlite": ("data.sql_handler", "SQLHandler"),
+    "json": ("data.mongo_handler", "MongoHandler"),
+    "mongodb": ("data.mongo_handler", "MongoHandler"),
+    "parquet": ("data.parquet_handler", "ParquetHandler"),
+    "arrow": ("data.parquet_handler", "ParquetHandler"),
+}
+
+_handler_classes = {}
+
+
+def register_handler(source_type, module_name, class_name):
+    """Register (or replace) the handler class used for a source type"""
+    HANDLER_REGISTRY[source_type] = (module_name, class_name)
+    _handler_classes.pop(source_type, None)
+
+
+def get_handler(source_type):
+    """Create the handler for a source type, importing its module on first use"""
+    if source_type not in _handler_classes:
+        if source_type not in HANDLER_REGISTRY:
+            raise ValueError(f"No handler registered for source type: {source_type}")
+        module_name, class_name = HANDLER_REGISTRY[source_type]
+        module = importlib.import_module(module_name)
+        _handler_classes[source_type] = getattr(module, class_name)
+    return _handler_classes[source_type]()
+
+
+def _register_dataset(state, source_file=None):
+    """Keep the ingested dataset in the session workspace (if there is one)
+    and add it to the semantic index (section 8)"""
+    workspace = state.get("workspace")
+    if workspace is not None and state.get("df") is not None:
+        workspace.register(state["dataset_id"], state["df"],
+                           schema=state["schema"], source_type=state["source_type"])
+    _index_dataset(state, source_file)
 
 
 # =============================================
@@ -9,30 +54,45 @@ from shared.state import update_state
 # =============================================
 
 def detect_data_source(file_path):
-    """Auto-detect data source type based on file extension"""
-    if isinstance(file_path, str):
-        if file_path.lower().endswith('.csv'):
-            return "csv"
-        elif file_path.lower().endswith(('.db', '.sqlite', '.sqlite3')):
-            return "sqlite"
-        elif file_path.lower().endswith(('.json', '.jsonl')):
-            return "json"
+    """Auto-detect data source type from the first few KB of the file
+
+    Falls back to the file extension when the file does not exist or its
+    content is not recognized. CSV and JSON files may be compressed
+    (.gz, .bz2, .zst, .xz).
+    """
+    return describe_data_source(file_path)["source_type"]
 
-    return "unknown"
+
+def describe_data_source(file_path):
+    """Source descriptor (type, compression, parse options) - see data/sniffer.py"""
+    from data.sniffer import sniff_source
+
+    if not isinstance(file_path, str):
+        return {"source_type": "unknown", "compression": None,
+                "detected_by": "extension", "parse_options": {}}
+    return sniff_source(file_path)
 
 
 # =============================================
 # 2. PROCESSING METHODS (The main work)
 # =============================================
 
-def process_csv_file(file_path, state):
-    """Process CSV file using CSV handler"""
+def process_csv_file(file_path, state, descriptor=None, options=None):
+    """Process CSV file using CSV handler (dialect sniffed from the content)
+
+    options are passed to CSVHandler.process_csv (max_rows, sample_method,
+    parallel, ...); max_size_mb goes to the validator.
+    """
     state = update_state(state, status="processing")
 
-    csv_handler = CSVHandler()
+    csv_handler = get_handler("csv")
+    descriptor = descriptor or describe_data_source(file_path)
+    dialect = descriptor["parse_options"] if descriptor["source_type"] == "csv" else None
+    options = dict(options or {})
+    max_size_mb = options.pop("max_size_mb", 100)
 
     # Step 1: Validate first
-    is_valid, message = csv_handler.validate_csv_file(file_path)
+    is_valid, message = csv_handler.validate_csv_file(file_path, descriptor, max_size_mb)
     if not is_valid:
         state = update_state(
             state, error=f"CSV validation failed: {message}", status="error")
@@ -40,7 +100,7 @@ def process_csv_file(file_path, state):
 
     # Step 2: Process the file
     try:
-        df, schema = csv_handler.process_csv(file_path)
+        df, schema = csv_handler.process_csv(file_path, dialect=dialect, **options)
         dataset_id = csv_handler.generate_dataset_id(file_path)
 
         state = update_state(
@@ -51,6 +111,7 @@ def process_csv_file(file_path, state):
             schema=schema,
             status="completed"
         )
+        _register_dataset(state, file_path)
 
         print(f"✅ CSV processed successfully!")
         print(f"📊 Dataset ID: {dataset_id}")
@@ -64,14 +125,19 @@ def process_csv_file(file_path, state):
         return state
 
 
-def process_sqlite_file(db_path, state):
-    """Process SQLite database file - automatically discovers tables (max 3 tables, 1000 rows each)"""
+def process_sqlite_file(db_path, state, descriptor=None, options=None):
+    """Process SQLite database file - automatically discovers tables (max 3 tables, 1000 sampled rows each)
+
+    options are passed to SQLHandler.process_sqlite_file (max_tables,
+    max_rows_per_table, ...).
+    """
     state = update_state(state, status="processing")
 
-    sql_handler = SQLHandler()
+    sql_handler = get_handler("sqlite")
+    descriptor = descriptor or describe_data_source(db_path)
 
     # Step 1: Validate first
-    is_valid, message = sql_handler.validate_sqlite_file(db_path)
+    is_valid, message = sql_handler.validate_sqlite_file(db_path, descriptor)
     if not is_valid:
         state = update_state(
             state, error=f"SQLite validation failed: {message}", status="error")
@@ -79,7 +145,7 @@ def process_sqlite_file(db_path, state):
 
     # Step 2: Process the database
     try:
-        df, schema = sql_handler.process_sqlite_file(db_path)
+        df, schema = sql_handler.process_sqlite_file(db_path, **(options or {}))
         dataset_id = sql_handler.generate_dataset_id(db_path)
 
         state = update_state(
@@ -90,6 +156,7 @@ def process_sqlite_file(db_path, state):
             schema=schema,
             status="completed"
         )
+        _register_dataset(state, db_path)
 
         print(f"✅ SQLite database processed successfully!")
         print(f"📊 Dataset ID: {dataset_id}")
@@ -103,14 +170,18 @@ def process_sqlite_file(db_path, state):
         return state
 
 
-def process_json_file(file_path, state):
-    """Process JSON file as document data (max 1000 documents)"""
+def process_json_file(file_path, state, descriptor=None, options=None):
+    """Process JSON file as document data (max 1000 sampled documents)
+
+    options are passed to MongoHandler.process_json_file (max_docs, ...).
+    """
     state = update_state(state, status="processing")
 
-    mongo_handler = MongoHandler()
+    mongo_handler = get_handler("json")
+    descriptor = descriptor or describe_data_source(file_path)
 
     # Step 1: Validate first
-    is_valid, message = mongo_handler.validate_json_file(file_path)
+    is_valid, message = mongo_handler.validate_json_file(file_path, descriptor)
     if not is_valid:
         state = update_state(
             state, error=f"JSON validation failed: {message}", status="error")
@@ -118,7 +189,8 @@ def process_json_file(file_path, state):
 
     # Step 2: Process the file
     try:
-        df, schema = mongo_handler.process_json_file(file_path)
+        df, schema = mongo_handler.process_json_file(file_path, descriptor=descriptor,
+                                                     **(options or {}))
         dataset_id = mongo_handler.generate_dataset_id(file_path)
 
         state = update_state(
@@ -129,6 +201,7 @@ def process_json_file(file_path, state):
             schema=schema,
             status="completed"
         )
+        _register_dataset(state, file_path)
 
         print(f"✅ JSON file processed successfully!")
         print(f"📊 Dataset ID: {dataset_id}")
@@ -142,34 +215,651 @@ def process_json_file(file_path, state):
         return state
 
 
+def process_mongodb_collection(source, state, descriptor=None, options=None):
+    """Process a MongoDB collection from a URI like mongodb://host/db.collection
+    (max 1000 sampled documents)
+
+    options are passed to MongoHandler.process_collection (query,
+    projection, batch_size, parallel, client, ...).
+    """
+    state = update_state(state, status="processing")
+
+    mongo_handler = get_handler("mongodb")
+    options = dict(options or {})
+
+    # Step 1: Validate first
+    is_valid, message = mongo_handler.validate_collection(
+        source, options.get("client"), options.get("collection"))
+    if not is_valid:
+        state = update_state(
+            state, error=f"MongoDB validation failed: {message}", status="error")
+        return state
+
+    # Step 2: Read the collection
+    try:
+        df, schema = mongo_handler.process_collection(source, **options)
+        dataset_id = mongo_handler.generate_dataset_id(source, options.get("collection"))
+
+        state = update_state(
+            state,
+            source_type="mongodb",
+            dataset_id=dataset_id,
+            df=df,
+            schema=schema,
+            status="completed"
+        )
+        _register_dataset(state, schema["source_file"])  # without credentials
+
+        print(f"✅ MongoDB collection processed successfully!")
+        print(f"📊 Dataset ID: {dataset_id}")
+        print(f"📊 Loaded {len(df)} documents and {len(df.columns)} fields")
+
+        return state
+
+    except Exception as e:
+        state = update_state(
+            state, error=f"MongoDB processing failed: {str(e)}", status="error")
+        return state
+
+
+def process_parquet_file(file_path, state, descriptor=None, options=None):
+    """Process a Parquet or Arrow/Feather file (max 10,000 sampled rows)
+
+    options are passed to ParquetHandler.process_parquet_file (max_rows,
+    columns, filters, ...); max_size_mb goes to the validator.
+    """
+    state = update_state(state, status="processing")
+
+    descriptor = descriptor or describe_data_source(file_path)
+    source_type = descriptor["source_type"] if descriptor["source_type"] == "arrow" else "parquet"
+    parquet_handler = get_handler(source_type)
+    options = dict(options or {})
+    max_size_mb = options.pop("max_size_mb", 1024)
+
+    # Step 1: Validate first
+    is_valid, message = parquet_handler.validate_parquet_file(file_path, descriptor, max_size_mb)
+    if not is_valid:
+        state = update_state(
+            state, error=f"Parquet validation failed: {message}", status="error")
+        return state
+
+    # Step 2: Process the file
+    try:
+        df, schema = parquet_handler.process_parquet_file(file_path, **options)
+        dataset_id = parquet_handler.generate_dataset_id(file_path)
+
+        state = update_state(
+            state,
+            source_type=source_type,
+            dataset_id=dataset_id,
+            df=df,
+            schema=schema,
+            status="completed"
+        )
+        _register_dataset(state, file_path)
+
+        print(f"✅ {source_type.capitalize()} file processed successfully!")
+        print(f"📊 Dataset ID: {dataset_id}")
+        print(f"📊 Loaded {len(df)} rows and {len(df.columns)} columns")
+
+        return state
+
+    except Exception as e:
+        state = update_state(
+            state, error=f"Parquet processing failed: {str(e)}", status="error")
+        return state
+
+
 # =============================================
 # 3. MAIN INGESTION FUNCTION (The entry point)
 # =============================================
 
-def ingest_data_file(file_path, state):
+def ingest_data_file(file_path, state, memory_budget_mb=None, latency_budget_s=None, dedup=None,
+                     quality=None):
     """
     Simple function for file-based ingestion.
     Just provide a file path - the agent figures out the rest!
 
-    Limits for students:
+    Limits for students (larger sources are randomly sampled, not truncated):
     - CSV: Max 10,000 rows
     - SQLite: Max 3 tables, 1000 rows each
-    - JSON: Max 1000 documents
+    - JSON, MongoDB collections (mongodb://host/db.collection): Max 1000 documents
+    - Parquet / Arrow: Max 10,000 rows
+
+    With a memory and/or latency budget the limits are replaced by a plan
+    (see plan_ingestion below). dedup drops repeated records while
+    reading: True compares whole rows, a column name or list compares
+    those key columns; the counts end up in schema["deduplication"].
+    quality is a list of data-quality rules (or a dict with "rules" and
+    max_error_rate / max_errors, see data/quality_rules.py) checked on
+    every batch; the results end up in state["quality"], also when the
+    ingestion was aborted because too many rows failed.
     """
     print(f"🔍 Auto-detecting data source: {file_path}")
 
-    # Step 1: Detect what type of file this is
-    source_type = detect_data_source(file_path)
-    print(f"📋 Detected source type: {source_type}")
+    # Step 1: Detect what type of file this is (from its first few KB)
+    descriptor = describe_data_source(file_path)
+    source_type = descriptor["source_type"]
+    print(f"📋 Detected source type: {source_type} (by {descriptor['detected_by']})")
+
+    options = {"dedup": dedup} if dedup else {}
+    checker = None
+    if quality is not None:
+        from data.quality_rules import create_quality_checker
+        try:
+            checker = options["quality"] = create_quality_checker(quality)
+        except ValueError as e:
+            return update_state(state, error=f"Invalid quality rules: {str(e)}", status="error")
+
+    if (memory_budget_mb is not None or latency_budget_s is not None) \
+            and source_type in _ROW_LIMIT_OPTION and os.path.exists(file_path):
+        plan = plan_ingestion(file_path, memory_budget_mb or 512, latency_budget_s or 30.0,
+                              descriptor)
+        plan["options"].update(options)
+        state = execute_plan(plan, state)
 
     # Step 2: Route to the correct processor
-    if source_type == "csv":
-        return process_csv_file(file_path, state)
+    elif source_type == "csv":
+        state = process_csv_file(file_path, state, descriptor, options)
     elif source_type == "sqlite":
-        return process_sqlite_file(file_path, state)
+        state = process_sqlite_file(file_path, state, descriptor, options)
     elif source_type == "json":
-        return process_json_file(file_path, state)
+        state = process_json_file(file_path, state, descriptor, options)
+    elif source_type in ("parquet", "arrow"):
+        state = process_parquet_file(file_path, state, descriptor, options)
+    elif source_type == "mongodb":
+        state = process_mongodb_collection(file_path, state, descriptor, options)
     else:
         state = update_state(
             state, error=f"Unsupported file type: {file_path}", status="error")
+
+    if checker is not None:
+        checker.close()
+    return update_state(state, quality=checker.summary() if checker is not None else None)
+
+
+# =============================================
+# 4. INCREMENTAL INGESTION (Re-ingest growing files)
+# =============================================
+
+_default_tracker = None
+
+
+def _get_tracker():
+    global _default_tracker
+    if _default_tracker is None:
+        from data.file_tracker import FileTracker
+        _default_tracker = FileTracker()
+    return _default_tracker
+
+
+def _stored_dataset(state, record):
+    """The previously ingested version of a tracked file, if we still have it"""
+    if record is None or not record.get("dataset_id"):
+        return None
+    dataset_id = record["dataset_id"]
+    workspace = state.get("workspace")
+    if workspace is not None and dataset_id in workspace:
+        return workspace.get(dataset_id)
+    if state.get("dataset_id") == dataset_id and state.get("df") is not None:
+        return state["df"]
+    return None
+
+
+def ingest_incremental(file_path, state, tracker=None):
+    """
+    Re-ingest an append-only CSV or JSON Lines file.
+
+    - Unchanged files are skipped
+    - Grown files only have their new lines parsed and appended
+    - Truncated or rewritten files are reloaded from scratch
+
+    Incremental datasets keep every row (appending to a sample would skew
+    it). A last line without a newline is treated as still being written
+    and picked up on the next run. Other file types (and compressed files)
+    use ingest_data_file.
+    """
+    from data.compression import detect_compression
+    from data.file_tracker import complete_lines_end
+
+    descriptor = describe_data_source(file_path)
+    source_type = descriptor["source_type"]
+    if source_type == "csv":
+        tailable = True
+    elif source_type == "json":
+        tailable = get_handler("json")._is_json_lines(file_path, descriptor)
+    else:
+        tailable = False
+    if not tailable or detect_compression(file_path) is not None:
+        return ingest_data_file(file_path, state)  # compressed streams cannot be seeked
+
+    tracker = tracker or _get_tracker()
+    handler = get_handler(source_type)
+    dialect = descriptor["parse_options"] if source_type == "csv" else None
+    state = update_state(state, status="processing")
+
+    # Step 1: Validate first
+    validate = handler.validate_csv_file if source_type == "csv" else handler.validate_json_file
+    is_valid, message = validate(file_path, descriptor)
+    if not is_valid:
+        state = update_state(
+            state, error=f"Incremental ingestion failed: {message}", status="error")
+        return state
+
+    # Step 2: Work out what changed since the last run
+    try:
+        change, record = tracker.check(file_path)
+        current = _stored_dataset(state, record)
+        full_load = change in ("new", "rewritten") or current is None
+        start = 0 if full_load else record["offset"]
+        if change == "unchanged" and not full_load:
+            end = start
+        else:
+            end = complete_lines_end(file_path, start)
+
+        # Step 3: Parse only the bytes we have not seen
+        if end == start and not full_load:
+            new_rows = None
+        elif source_type == "csv":
+            columns = None if full_load else list(current.columns)
+            new_rows = handler.read_csv_range(file_path, start, end, columns, dialect)
+        else:
+            new_rows = handler.read_jsonl_range(file_path, start, end)
+
+        # Step 4: Combine with what we already have
+        dataset_id = (record or {}).get("dataset_id") or handler.generate_dataset_id(file_path)
+        workspace = state.get("workspace")
+        appended_in_workspace = False
+        if full_load:
+            df = new_rows
+        elif new_rows is None or not len(new_rows):
+            df = current
+        elif workspace is not None and dataset_id in workspace:
+            df = workspace.append(dataset_id, new_rows)
+            appended_in_workspace = True
+        else:
+            import pandas as pd
+            df = pd.concat([current, new_rows], ignore_index=True)
+
+        if source_type == "csv":
+            schema = handler._get_basic_schema(df)
+        else:
+            schema = handler._get_basic_schema(df, file_path, len(df))
+            schema["note"] = "JSON Lines documents ingested incrementally, all rows kept"
+        schema["incremental"] = {
+            "change": change,
+            "full_load": full_load,
+            "rows_added": len(df) if full_load else (0 if new_rows is None else len(new_rows)),
+            "bytes_parsed": end - start,
+            "offset": end,
+        }
+
+        state = update_state(
+            state,
+            source_type=source_type,
+            dataset_id=dataset_id,
+            df=df,
+            schema=schema,
+            status="completed"
+        )
+        if appended_in_workspace:
+            workspace.set_schema(dataset_id, schema)
+            _index_dataset(state, file_path)
+        else:
+            _register_dataset(state, file_path)
+        tracker.update(file_path, end, dataset_id=dataset_id, source_type=source_type)
+
+        print(f"✅ {file_path}: {change}, {schema['incremental']['rows_added']} rows "
+              f"{'loaded' if full_load else 'appended'}")
+        print(f"📊 Dataset ID: {dataset_id} ({len(df)} rows)")
+
+        return state
+
+    except Exception as e:
+        state = update_state(
+            state, error=f"Incremental ingestion failed: {str(e)}", status="error")
+        return state
+
+
+# =============================================
+# 5. PARTITIONED DATASETS (Many files, one dataset)
+# =============================================
+
+def ingest_partitions(file_paths, state, dataset_name, root="data/partitions"):
+    """
+    Append one or more CSV/JSON files as partitions of one logical dataset.
+
+    Schemas are unified across partitions (new columns, widened types,
+    nullable columns) and every change is recorded as a schema version.
+    Existing partitions are never rewritten, and the combined DataFrame is
+    built once at the end, however many files are added.
+    """
+    from data.partitioned import PartitionedDataset
+
+    if isinstance(file_paths, str):
+        file_paths = [file_paths]
+    state = update_state(state, status="processing")
+
+    try:
+        dataset = PartitionedDataset(dataset_name, root=root)
+        for file_path in file_paths:
+            descriptor = describe_data_source(file_path)
+            source_type = descriptor["source_type"]
+            if source_type not in ("csv", "json"):
+                raise ValueError(f"Partitions must be CSV or JSON files: {file_path}")
+            handler = get_handler(source_type)
+            if source_type == "csv":
+                is_valid, message = handler.validate_csv_file(file_path, descriptor)
+                batches = handler.iter_csv_batches(file_path, dialect=descriptor["parse_options"])
+            else:
+                is_valid, message = handler.validate_json_file(file_path, descriptor)
+                batches = handler.iter_json_batches(file_path, descriptor=descriptor)
+            if not is_valid:
+                raise ValueError(f"{file_path}: {message}")
+
+            import pandas as pd
+            df = pd.concat(list(batches), ignore_index=True)
+            if source_type == "json":
+                df = handler._stringify_nested(df)
+            changes = dataset.add_partition(df, source=file_path)
+            print(f"📦 Added {file_path} as partition {len(dataset.manifest['partitions'])} "
+                  f"({len(df)} rows)")
+            for change in changes:
+                print(f"   🔄 Schema v{dataset.version}: {change}")
+
+        df = dataset.to_dataframe()
+        state = update_state(
+            state,
+            source_type="partitioned",
+            dataset_id=dataset_name,
+            df=df,
+            schema=dataset.schema(),
+            status="completed"
+        )
+        _register_dataset(state)
+
+        print(f"✅ Dataset {dataset_name}: {len(df)} rows, "
+              f"{len(dataset.manifest['partitions'])} partitions, schema v{dataset.version}")
+        return state
+
+    except Exception as e:
+        state = update_state(
+            state, error=f"Partition ingestion failed: {str(e)}", status="error")
+        return state
+
+
+# =============================================
+# 6. INGESTION PLANNING (Budgets instead of fixed limits)
+# =============================================
+# The limits above suit small teaching datasets. plan_ingestion() instead
+# estimates what a source costs (rows, memory, read time - from a parsed
+# probe, file metadata or the SQLite catalog) and picks the strategy that
+# fits a memory and latency budget:
+#
+#   full       everything fits: load every row
+#   parallel   fits in memory but one core is too slow: Arrow's threaded reader
+#   streaming  read every row in batches, keep a reservoir sample that fits
+#   sample     reading everything takes too long: read only the first rows
+#   lazy       not even a useful sample fits: keep a preview and query the
+#              file in place (filters pushed down by the query engine)
+
+PLAN_STRATEGIES = ("full", "parallel", "streaming", "sample", "lazy")
+MIN_SAMPLE_ROWS = 1000
+PREVIEW_ROWS = 100
+PARALLEL_EFFICIENCY = 0.7  # speedup per extra core of the threaded CSV reader
+LAZY_EXTENSIONS = ('.csv', '.db', '.sqlite', '.sqlite3', '.parquet', '.pq',
+                   '.feather', '.arrow', '.ipc')
+
+_ROW_LIMIT_OPTION = {"csv": "max_rows", "json": "max_docs", "parquet": "max_rows",
+                     "arrow": "max_rows", "sqlite": "max_rows_per_table"}
+
+
+def plan_ingestion(file_path, memory_budget_mb=512, latency_budget_s=30.0, descriptor=None,
+                   workers=None):
+    """Estimate the cost of ingesting a file and choose a strategy
+
+    Returns a plan dict that can be inspected (or printed with
+    explain_plan) before execute_plan() runs it:
+        {"file_path", "source_type", "descriptor", "strategy", "options",
+         "estimates", "budget", "reason"}
+    """
+    import sys
+
+    descriptor = descriptor or describe_data_source(file_path)
+    source_type = descriptor["source_type"]
+    if source_type not in _ROW_LIMIT_OPTION:
+        raise ValueError(f"Cannot plan ingestion of {source_type} file: {file_path}")
+
+    estimates = get_handler(source_type).estimate_ingestion(file_path, descriptor)
+    workers = workers or os.cpu_count() or 1
+    budget_bytes = memory_budget_mb * 1024 * 1024
+    rows = estimates["rows"]
+    bytes_per_row = max(estimates["bytes_per_row"], 1)
+    # Rows that fit in memory, and rows that can be read in time
+    rows_in_memory = int(budget_bytes / bytes_per_row)
+    rows_in_time = int(latency_budget_s * max(estimates["rows_per_second"], 1))
+    fits_memory = estimates["memory_bytes"] <= budget_bytes
+    fits_time = estimates["parse_seconds"] <= latency_budget_s
+    parallel_seconds = estimates["parse_seconds"] / max(1, workers * PARALLEL_EFFICIENCY)
+    lazy_ok = source_type != "json" and str(file_path).lower().endswith(LAZY_EXTENSIONS)
+    limit_option = _ROW_LIMIT_OPTION[source_type]
+    tables = len(estimates.get("tables", {})) or 1
+
+    options = {}
+    if fits_memory and fits_time:
+        strategy = "full"
+        reason = "the whole source fits the memory and latency budgets"
+        options = {limit_option: sys.maxsize, "sample_method": "head"}
+    elif source_type == "csv" and fits_memory and workers > 1 and parallel_seconds <= latency_budget_s:
+        strategy = "parallel"
+        reason = (f"fits in memory; one core needs ~{estimates['parse_seconds']:.1f}s, "
+                  f"{workers} cores ~{parallel_seconds:.1f}s")
+        options = {"parallel": True}
+    elif fits_time and rows_in_memory >= MIN_SAMPLE_ROWS:
+        strategy = "streaming"
+        reason = (f"~{estimates['memory_bytes'] / 1024 / 1024:.0f} MB does not fit in "
+                  f"{memory_budget_mb} MB: read every row, keep a {rows_in_memory:,}-row sample")
+        options = {limit_option: rows_in_memory // tables, "sample_method": "reservoir"}
+    elif min(rows_in_memory, rows_in_time) >= MIN_SAMPLE_ROWS or not lazy_ok:
+        keep = max(min(rows_in_memory, rows_in_time), PREVIEW_ROWS)
+        strategy = "sample"
+        reason = (f"reading all ~{rows:,} rows takes ~{estimates['parse_seconds']:.1f}s "
+                  f"(budget {latency_budget_s}s): read only {keep:,} rows")
+        # SQLite samples random rowids cheaply; files are read from the start
+        options = {limit_option: keep // tables,
+                   "sample_method": "reservoir" if source_type == "sqlite" else "head"}
+    else:
+        strategy = "lazy"
+        reason = "too big for any useful sample: keep a preview and query the file in place"
+        options = {limit_option: PREVIEW_ROWS, "sample_method": "head", "profile": False}
+
+    if source_type == "sqlite":
+        options["max_tables"] = None
+    if source_type in ("csv", "parquet", "arrow"):
+        options["max_size_mb"] = None  # the plan already accounts for the size
+
+    return {
+        "file_path": file_path,
+        "source_type": source_type,
+        "descriptor": descriptor,
+        "strategy": strategy,
+        "options": options,
+        "estimates": estimates,
+        "budget": {"memory_mb": memory_budget_mb, "latency_s": latency_budget_s,
+                   "workers": workers},
+        "reason": reason,
+    }
+
+
+def explain_plan(plan):
+    """Human-readable summary of a plan"""
+    e = plan["estimates"]
+    lines = [
+        f"📐 Plan for {plan['file_path']} ({plan['source_type']}): {plan['strategy'].upper()}",
+        f"   Estimated: ~{e['rows']:,} rows, ~{e['memory_bytes'] / 1024 / 1024:.1f} MB in memory, "
+        f"~{e['parse_seconds']:.2f}s to read ({e['rows_per_second']:,} rows/s, by {e['by']})",
+        f"   Budget: {plan['budget']['memory_mb']} MB, {plan['budget']['latency_s']}s, "
+        f"{plan['budget']['workers']} workers",
+        f"   Why: {plan['reason']}",
+    ]
+    return "\n".join(lines)
+
+
+def execute_plan(plan, state, progress=None):
+    """Ingest a file the way plan_ingestion decided
+
+    progress, if given, is passed to the handler (called with the rows
+    read so far).
+    """
+    print(explain_plan(plan))
+    processor = _PROCESSORS[plan["source_type"]]
+    options = dict(plan["options"], progress=progress) if progress else plan["options"]
+    state = processor(plan["file_path"], state, plan["descriptor"], options=options)
+    if state["status"] != "completed":
         return state
+
+    state["schema"]["plan"] = {key: plan[key] for key in ("strategy", "reason", "budget")}
+    state["schema"]["plan"]["options"] = {  # quality results are in schema["quality"]
+        key: value for key, value in plan["options"].items() if key != "quality"}
+    state["schema"]["plan"]["estimates"] = {
+        key: value for key, value in plan["estimates"].items() if key != "tables"}
+    if plan["strategy"] == "lazy":
+        # Queries go to the file itself; state["df"] is only a preview
+        tables = list(plan["estimates"].get("tables", {})) or None
+        state["schema"]["lazy"] = {"path": plan["file_path"], "tables": tables}
+        if plan["descriptor"]["source_type"] == "csv":
+            state["schema"]["lazy"]["dialect"] = {
+                key: value for key, value in plan["descriptor"]["parse_options"].items()
+                if key in ("sep", "quotechar", "header", "encoding")}
+    return state
+
+
+# =============================================
+# 7. PROGRESSIVE INGESTION (Preview now, the rest in the background)
+# =============================================
+# In an interactive session nobody wants to wait for a full parse before
+# seeing anything. ingest_progressive() reads only the first rows (a cost
+# that does not grow with the file), returns them at once with an
+# estimated schema, and runs the normal ingestion in a background thread.
+# Meanwhile the state has status "loading" and a progress fraction; when
+# the ingestion ends df, schema and dataset_id are replaced and status
+# becomes "completed" (or "error", keeping the preview).
+
+_PROCESSORS = {"csv": process_csv_file, "sqlite": process_sqlite_file,
+               "json": process_json_file, "parquet": process_parquet_file,
+               "arrow": process_parquet_file}
+
+_background = {}  # id(state) -> thread of a running progressive ingestion
+
+
+def ingest_progressive(file_path, state, preview_rows=PREVIEW_ROWS, memory_budget_mb=None,
+                       latency_budget_s=None):
+    """Return a preview of the file at once and ingest it in the background
+
+    Limits and budgets work as in ingest_data_file. Use
+    wait_for_ingestion(state) to block until the full data is in.
+    """
+    import threading
+
+    descriptor = describe_data_source(file_path)
+    source_type = descriptor["source_type"]
+    if source_type not in _PROCESSORS or not os.path.exists(file_path):
+        return ingest_data_file(file_path, state, memory_budget_mb, latency_budget_s)
+
+    # Step 1: Preview - the first rows and an estimated schema
+    try:
+        preview, schema = get_handler(source_type).preview(file_path, descriptor, preview_rows)
+    except Exception as e:
+        return update_state(state, error=f"Preview failed: {str(e)}", status="error")
+    state = update_state(state, source_type=source_type, dataset_id=None, df=preview,
+                         schema=schema, error=None, progress=0.0, status="loading")
+    print(f"👀 Preview: {len(preview)} of ~{schema['estimated_rows']:,} rows, "
+          f"{len(preview.columns)} columns (loading the rest in the background)")
+
+    # Step 2: The full ingestion, on a state of its own until it is done
+    plan = None
+    if memory_budget_mb is not None or latency_budget_s is not None:
+        plan = plan_ingestion(file_path, memory_budget_mb or 512, latency_budget_s or 30.0,
+                              descriptor)
+    estimated_rows = max(schema["estimated_rows"], 1)
+
+    def report_progress(rows_seen):
+        state["progress"] = round(min(rows_seen / estimated_rows, 0.99), 3)
+
+    def run():
+        result = create_initial_state(state.get("workspace"))
+        try:
+            if plan is not None:
+                result = execute_plan(plan, result, report_progress)
+            else:
+                result = _PROCESSORS[source_type](file_path, result, descriptor,
+                                                  options={"progress": report_progress})
+        except Exception as e:
+            result = update_state(result, error=f"Ingestion failed: {str(e)}", status="error")
+        if result["status"] == "completed":
+            # status last: readers that see "completed" also see the final data
+            update_state(state, dataset_id=result["dataset_id"], df=result["df"],
+                         schema=result["schema"], progress=1.0, status="completed")
+        else:
+            update_state(state, error=result["error"], status="error")
+        _background.pop(id(state), None)
+
+    thread = threading.Thread(target=run, name=f"ingest-{os.path.basename(file_path)}",
+                              daemon=True)
+    _background[id(state)] = thread
+    thread.start()
+    return state
+
+
+def wait_for_ingestion(state, timeout=None):
+    """Block until a progressive ingestion of state has finished; returns state"""
+    thread = _background.get(id(state))
+    if thread is not None:
+        thread.join(timeout)
+    return state
+
+
+# =============================================
+# 8. SEMANTIC INDEX (Find the right columns for a question)
+# =============================================
+# Every successful ingestion adds its dataset and columns to a local TF-IDF
+# index (data/semantic_index.py). Agents ask find_columns(question) for the
+# few relevant columns instead of putting every schema in the prompt. The
+# index lives in memory unless SEMANTIC_INDEX_PATH names an .npz file to
+# keep it in (or set_semantic_index is given a SemanticIndex with a path).
+
+_default_index = None
+_index_enabled = True
+
+
+def get_semantic_index():
+    """The index ingestions are added to (None if disabled)"""
+    global _default_index
+    if _default_index is None and _index_enabled:
+        from data.semantic_index import SemanticIndex
+        _default_index = SemanticIndex(os.environ.get("SEMANTIC_INDEX_PATH") or None)
+    return _default_index
+
+
+def set_semantic_index(index):
+    """Use another SemanticIndex from now on; None turns indexing off"""
+    global _default_index, _index_enabled
+    _default_index = index
+    _index_enabled = index is not None
+
+
+def find_columns(question, k=10, kind="column"):
+    """Top-k indexed columns (or datasets, kind="dataset") for a question"""
+    index = get_semantic_index()
+    return index.search(question, k=k, kind=kind) if index is not None else []
+
+
+def _index_dataset(state, source_file=None):
+    index = get_semantic_index()
+    if index is None or state.get("schema") is None:
+        return
+    try:
+        index.add_dataset(state["dataset_id"], state["schema"], df=state.get("df"),
+                          source_file=source_file)
+    except Exception as e:  # the data is loaded; a stale index only hurts retrieval
+        print(f"⚠️  Semantic index not updated: {e}")
@@ -0,0 +1,467 @@
+"""
+Local ingestion service: one warm process instead of one process per client.
+
+Every client that runs ingest_data_file in its own short-lived process pays
+for starting Python and importing pandas/pyarrow before any data is read.
+The service keeps one process running and answers over HTTP:
+
+- POST /ingest with a JSON body {"file_path": ..., "memory_budget_mb": ...,
+  "latency_budget_s": ..., "cache": true} returns the ingested DataFrame as
+  an Arrow IPC stream (application/vnd.apache.arrow.stream); dataset_id,
+  source_type and the ingestion schema travel as JSON in the Arrow schema
+  metadata
+- GET /health returns load and cache statistics as JSON
+- Requests are handled by threads, at most `workers` ingestions at a time;
+  up to `queue_size` more wait (for at most queue_timeout seconds) and the
+  rest are turned away at once with 503 + Retry-After (backpressure), so
+  an overloaded service answers quickly instead of timing out
+- Handlers are imported when the service starts, the datetime format cache
+  stays warm between requests, and serialized results are kept in a
+  bounded LRU cache keyed by file path, size and mtime; identical requests
+  that arrive together share one ingestion
+- Only files below the root directory can be ingested
+
+Run it:  python -m agents.ingestion_service --port 8765 --workers 4
+Client:  state = ingest_remote("http://127.0.0.1:8765", "data/sales.csv", state)
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from agents.ingestion import HANDLER_REGISTRY, get_handler, ingest_data_file
+from shared.metrics import metrics as default_metrics
+from shared.state import create_initial_state, update_state
+
+
+ARROW_STREAM_TYPE = "application/vnd.apache.arrow.stream"
+METADATA_KEY = b"ingestion"
+
+
+# =============================================
+# 1. ADMISSION CONTROL (Backpressure)
+# =============================================
+
+class AdmissionController:
+    """At most max_active ingestions at a time and max_waiting in line"""
+
+    def __init__(self, max_active, max_waiting, wait_timeout=5.0):
+        self.max_active = max_active
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self._slots = threading.BoundedSemaphore(max_active)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def acquire(self):
+        """Take a slot; False if the line is full or the wait timed out"""
+        admitted = self._slots.acquire(blocking=False)
+        if not admitted:
+            with self._lock:
+                if self.waiting >= self.max_waiting:
+                    self.rejected += 1
+                    return False
+                self.waiting += 1
+            admitted = self._slots.acquire(timeout=self.wait_timeout)
+            with self._lock:
+                self.waiting -= 1
+        with self._lock:
+            if admitted:
+                self.active += 1
+            else:
+                self.rejected += 1
+        return admitted
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+        self._slots.release()
+
+
+# =============================================
+# 2. RESULT CACHE (Serialized Arrow payloads)
+# =============================================
+
+class ResultCache:
+    """LRU cache of response payloads, bounded by total size
+
+    Identical requests that arrive while one of them is being ingested
+    wait for that result instead of ingesting the file again.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (payload, headers)
+        self._in_flight = {}  # key -> Event set when the first request finishes
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        """(payload, headers, hit) - compute() -> (payload, headers) runs once per key"""
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return (*self._entries[key], True)
+                event = self._in_flight.get(key)
+                if event is None:
+                    self._in_flight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            event.wait()  # another thread is ingesting this file; if it failed, retry
+
+        try:
+            payload, headers = compute()
+            self._store(key, payload, headers)
+            return payload, headers, False
+        finally:
+            with self._lock:
+                self._in_flight.pop(key).set()
+
+    def _store(self, key, payload, headers):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            self._entries[key] = (payload, headers)
+            self.bytes += len(payload)
+            while self.bytes > self.max_bytes:
+                _, (old, _) = self._entries.popitem(last=False)
+                self.bytes -= len(old)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+class IngestionFailed(Exception):
+    """ingest_data_file returned an error state (reported to the client as 422)"""
+
+
+# =============================================
+# 3. HTTP SERVICE (Warm process, many clients)
+# =============================================
+
+class IngestionService:
+
+    def __init__(self, host="127.0.0.1", port=8765, workers=None, queue_size=16,
+                 queue_timeout=5.0, cache_mb=256, root=".", quiet=False, metrics=None):
+        """
+        workers:        ingestions running at the same time (default: CPU count)
+        queue_size:     requests allowed to wait for a worker; more get 503
+        queue_timeout:  seconds a request may wait before it gets 503
+        cache_mb:       size of the result cache (0 disables it)
+        root:           only files below this directory can be ingested
+        quiet:          silence the ingestion progress prints of request threads
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.admission = AdmissionController(self.workers, queue_size, queue_timeout)
+        self.cache = ResultCache(cache_mb * 1024 * 1024) if cache_mb else None
+        self.root = Path(root).resolve()
+        self.quiet = quiet
+        self.metrics = metrics or default_metrics
+        self.started_at = None
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stdout = None
+
+        self.server = _HTTPServer((host, port), _make_request_handler(self))
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # ----- lifecycle -----
+
+    def warm(self):
+        """Import every handler (pandas, pyarrow, ...) before the first request"""
+        import pyarrow  # noqa: F401  (used to serialize every response)
+
+        for source_type in HANDLER_REGISTRY:
+            get_handler(source_type)
+
+    def start(self):
+        """Warm up and serve in a background thread"""
+        self.warm()
+        self.started_at = time.time()
+        if self.quiet:
+            self._stdout, sys.stdout = sys.stdout, _QuietStream(sys.stdout)
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._stdout is not None:
+            sys.stdout, self._stdout = self._stdout, None
+
+    def serve_forever(self):
+        self.start()
+        print(f"🛰️  Ingestion service on {self.url} ({self.workers} workers)")
+        try:
+            self._thread.join()
+        except KeyboardInterrupt:
+            print("\n🛑 Stopping ingestion service")
+        finally:
+            print(f"📊 {self.stats()}")
+            self.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ----- requests -----
+
+    def handle_ingest(self, request):
+        """(status, headers, body) for one POST /ingest request"""
+        with self._lock:
+            self.requests += 1
+        self.metrics.increment("service.requests")
+        file_path = request.get("file_path")
+        if not isinstance(file_path, str):
+            return _json_response(400, {"error": "file_path is required"})
+        path = Path(file_path)
+        resolved = (path if path.is_absolute() else Path.cwd() / path).resolve()
+        if not resolved.is_relative_to(self.root):
+            return _json_response(403, {"error": f"{file_path} is outside {self.root}"})
+
+        if not self.admission.acquire():
+            self.metrics.increment("service.rejected")
+            status, headers, body = _json_response(503, {"error": "ingestion service is busy"})
+            headers["Retry-After"] = "1"
+            return status, headers, body
+        self._report_load()
+        try:
+            start = time.perf_counter()
+            options = (request.get("memory_budget_mb"), request.get("latency_budget_s"))
+
+            def compute():
+                return self._ingest(str(resolved), *options)
+
+            if self.cache is not None and request.get("cache", True) and resolved.exists():
+                stat = resolved.stat()
+                key = (str(resolved), stat.st_size, stat.st_mtime_ns, options)
+                payload, headers, hit = self.cache.get_or_compute(key, compute)
+            else:
+                (payload, headers), hit = compute(), False
+            seconds = time.perf_counter() - start
+            self.metrics.observe("service.ingest_seconds", seconds)
+            self.metrics.increment("service.cache_hits" if hit else "service.cache_misses")
+            headers = dict(headers, **{"X-Cache": "hit" if hit else "miss",
+                                       "X-Ingest-Seconds": f"{seconds:.4f}"})
+            return 200, headers, payload
+        except IngestionFailed as e:
+            return _json_response(422, {"error": str(e)})
+        except Exception as e:
+            return _json_response(500, {"error": f"Failed to ingest {file_path}: {str(e)}"})
+        finally:
+            self.admission.release()
+            self._report_load()
+
+    def _ingest(self, file_path, memory_budget_mb=None, latency_budget_s=None):
+        state = ingest_data_file(file_path, create_initial_state(),
+                                 memory_budget_mb=memory_budget_mb,
+                                 latency_budget_s=latency_budget_s)
+        if state["status"] != "completed":
+            raise IngestionFailed(state["error"])
+        payload = dataframe_to_arrow_ipc(state["df"], {
+            key: state[key] for key in ("dataset_id", "source_type", "schema")})
+        headers = {"Content-Type": ARROW_STREAM_TYPE,
+                   "X-Dataset-Id": state["dataset_id"],
+                   "X-Source-Type": state["source_type"]}
+        return payload, headers
+
+    def _report_load(self):
+        self.metrics.set_gauge("service.active", self.admission.active)
+        self.metrics.set_gauge("service.waiting", self.admission.waiting)
+
+    # ----- observability -----
+
+    def stats(self):
+        uptime = time.time() - self.started_at if self.started_at else 0.0
+        return {
+            "status": "ok",
+            "uptime_seconds": round(uptime, 1),
+            "requests": self.requests,
+            "workers": self.workers,
+            "active": self.admission.active,
+            "waiting": self.admission.waiting,
+            "rejected": self.admission.rejected,
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # listen backlog: bursts of clients connect without resets
+
+
+def _make_request_handler(service):
+
+    class RequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive: clients reuse their connection
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(*_json_response(200, service.stats()))
+            else:
+                self._send(*_json_response(404, {"error": f"Unknown path {self.path}"}))
+
+        def do_POST(self):
+            _request_thread.quiet = service.quiet
+            if self.path != "/ingest":
+                self._send(*_json_response(404, {"error": f"Unknown path {self.path}"}))
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send(*_json_response(400, {"error": "Body must be a JSON object"}))
+                return
+            if not isinstance(request, dict):
+                self._send(*_json_response(400, {"error": "Body must be a JSON object"}))
+                return
+            self._send(*service.handle_ingest(request))
+
+        def _send(self, status, headers, body):
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # one line per request would swamp the terminal under load
+
+    return RequestHandler
+
+
+_request_thread = threading.local()
+
+
+class _QuietStream:
+    """sys.stdout stand-in that drops what quiet request threads print"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, text):
+        if getattr(_request_thread, "quiet", False):
+            return len(text)
+        return self._stream.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def _json_response(status, data):
+    body = json.dumps(data, default=str).encode("utf-8")
+    return status, {"Content-Type": "application/json"}, body
+
+
+# =============================================
+# 4. ARROW IPC (Responses and the client side)
+# =============================================
+
+def dataframe_to_arrow_ipc(df, metadata=None):
+    """Serialize df (and a dict of metadata, as JSON) to an Arrow IPC stream"""
+    import pyarrow as pa
+
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed Python types in an object column: send them as text
+        mixed = df.select_dtypes(include="object").columns
+        table = pa.Table.from_pandas(df.astype({col: str for col in mixed}), preserve_index=False)
+    if metadata is not None:
+        merged = dict(table.schema.metadata or {})
+        merged[METADATA_KEY] = json.dumps(metadata, default=str).encode("utf-8")
+        table = table.replace_schema_metadata(merged)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def arrow_ipc_to_dataframe(payload):
+    """(df, metadata) from a dataframe_to_arrow_ipc payload"""
+    import pyarrow as pa
+
+    table = pa.ipc.open_stream(payload).read_all()
+    metadata = (table.schema.metadata or {}).get(METADATA_KEY)
+    return table.to_pandas(), json.loads(metadata) if metadata else {}
+
+
+def ingest_remote(url, file_path, state, memory_budget_mb=None, latency_budget_s=None,
+                  cache=True, timeout=300):
+    """Like ingest_data_file, but the file is ingested by a running service
+
+    state gets the same df, schema, dataset_id and source_type; errors
+    (including 503 when the service is busy) end up in state["error"].
+    """
+    import urllib.error
+    import urllib.request
+
+    body = json.dumps({"file_path": str(file_path), "memory_budget_mb": memory_budget_mb,
+                       "latency_budget_s": latency_budget_s, "cache": cache}).encode("utf-8")
+    request = urllib.request.Request(f"{url.rstrip('/')}/ingest", data=body, method="POST",
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            df, metadata = arrow_ipc_to_dataframe(response.read())
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.loads(e.read()).get("error", e.reason)
+        except ValueError:
+            message = e.reason
+        return update_state(state, error=f"Ingestion service returned {e.code}: {message}",
+                            status="error")
+    except OSError as e:
+        return update_state(state, error=f"Ingestion service unreachable: {str(e)}",
+                            status="error")
+    return update_state(state, df=df, error=None, status="completed", **metadata)
+
+
+# =============================================
+# 5. COMMAND LINE (Run as a daemon)
+# =============================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve ingest_data_file over local HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--queue-size", type=int, default=16)
+    parser.add_argument("--queue-timeout", type=float, default=5.0)
+    parser.add_argument("--cache-mb", type=int, default=256)
+    parser.add_argument("--root", default=".", help="only files below this directory are served")
+    args = parser.parse_args(argv)
+
+    service = IngestionService(
+        args.host, args.port, workers=args.workers, queue_size=args.queue_size,
+        queue_timeout=args.queue_timeout, cache_mb=args.cache_mb, root=args.root, quiet=True)
+    service.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
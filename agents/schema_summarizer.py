@@ -0,0 +1,230 @@
+"""
+Schema Summarizer - compact schemas for LLM prompts.
+
+Wide schemas (hundreds of prefixed SQLite columns, flattened JSON fields)
+do not fit in a prompt as-is. summarize_schema() renders a schema + profile
+with less and less detail until it fits a token budget:
+
+    level 0: one line per column with profile stats and short samples
+    level 1: similar columns grouped (same dtype, same name pattern)
+    level 2: groups without profile stats
+    level 3: as many groups as fit, then "... and N more columns"
+
+SchemaBatcher then packs the summaries of many datasets into as few
+requests as possible and sends them with bounded concurrency and a rate
+limit, instead of one round-trip per dataset.
+"""
+
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# =============================================
+# 1. TOKEN COUNTING
+# =============================================
+
+def estimate_tokens(text):
+    """Cheap offline token estimate (about 4 characters per token)"""
+    return max(1, (len(text) + 3) // 4)
+
+
+# =============================================
+# 2. SCHEMA SUMMARIZER (Fit a schema into a budget)
+# =============================================
+
+def summarize_schema(schema, token_budget=1500, dataset_id=None,
+                     max_sample_chars=40, count_tokens=estimate_tokens):
+    """Render a schema (and its profile, if any) within token_budget tokens"""
+    header = _header(schema, dataset_id)
+    columns = _column_entries(schema, max_sample_chars)
+
+    text = ""
+    for level in range(4):
+        text = header + "\n" + "\n".join(_render(columns, level, schema))
+        if count_tokens(text) <= token_budget:
+            return text
+
+    # Level 3: keep whole groups while they fit, then summarize the rest
+    lines = [header]
+    groups = _group_columns(columns, schema)
+    shown = 0
+    for group in groups:
+        line = _render_group(group, with_stats=False)
+        more = f"... and {len(columns) - shown - len(group)} more columns"
+        if count_tokens("\n".join(lines + [line, more])) > token_budget:
+            break
+        lines.append(line)
+        shown += len(group)
+    if shown < len(columns):
+        lines.append(f"... and {len(columns) - shown} more columns")
+    return "\n".join(lines)
+
+
+def _header(schema, dataset_id):
+    parts = [f"Dataset: {dataset_id or schema.get('source_file', 'unknown')}"]
+    parts.append(f"{schema.get('total_rows', '?')} rows x {schema.get('total_columns', len(schema.get('columns', [])))} columns")
+    if schema.get("tables_found"):
+        parts.append(f"tables: {', '.join(schema['tables_found'])}")
+    return " | ".join(parts)
+
+
+def _column_entries(schema, max_sample_chars):
+    profile = (schema.get("profile") or {}).get("columns", {})
+    entries = []
+    for col in schema.get("columns", []):
+        name = str(col)
+        stats = profile.get(name, {})
+        entries.append({
+            "name": name,
+            "dtype": schema.get("data_types", {}).get(col, stats.get("dtype", "?")),
+            "stats": _format_stats(stats, max_sample_chars),
+        })
+    return entries
+
+
+def _format_stats(stats, max_sample_chars):
+    if not stats:
+        return ""
+    parts = []
+    if stats.get("null_count"):
+        parts.append(f"nulls={stats['null_count']}")
+    if stats.get("distinct_estimate"):
+        parts.append(f"distinct~{stats['distinct_estimate']}")
+    if stats.get("min") is not None:
+        parts.append(f"range=[{_short(stats['min'], 20)}, {_short(stats['max'], 20)}]")
+    top = stats.get("top_values") or []
+    if top:
+        samples = ", ".join(_short(value, 12) for value, _ in top[:3])
+        parts.append(f"e.g. {_short(samples, max_sample_chars)}")
+    return "; ".join(parts)
+
+
+def _render(columns, level, schema):
+    if level == 0:
+        return [f"- {c['name']} ({c['dtype']})" + (f": {c['stats']}" if c["stats"] else "")
+                for c in columns]
+    with_stats = level == 1
+    return [_render_group(group, with_stats) for group in _group_columns(columns, schema)]
+
+
+def _group_columns(columns, schema):
+    """Group columns that share a table prefix, a name pattern and a dtype"""
+    prefixes = [f"{table}_" for table in schema.get("tables_found", [])]
+    groups = {}
+    for col in columns:
+        name = col["name"]
+        prefix = next((p for p in prefixes if name.startswith(p)), "")
+        pattern = prefix + re.sub(r"\d+", "#", name[len(prefix):])
+        groups.setdefault((pattern, col["dtype"]), []).append(col)
+    return list(groups.values())
+
+
+def _render_group(group, with_stats):
+    first = group[0]
+    if len(group) == 1:
+        line = f"- {first['name']} ({first['dtype']})"
+        return line + (f": {first['stats']}" if with_stats and first["stats"] else "")
+    pattern = re.sub(r"\d+", "#", first["name"])
+    return f"- {pattern} x{len(group)} ({first['dtype']}): {first['name']} .. {group[-1]['name']}"
+
+
+def _short(value, limit):
+    text = str(value)
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+# =============================================
+# 3. BATCHER (Many datasets, few requests)
+# =============================================
+
+class RateLimiter:
+    """Token bucket: at most `rate` requests per `per` seconds"""
+
+    def __init__(self, rate, per=60.0):
+        self.capacity = rate
+        self.tokens = float(rate)
+        self.fill_rate = rate / per
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.fill_rate
+            time.sleep(wait)
+
+
+class SchemaBatcher:
+    """Describe many datasets with as few LLM requests as possible"""
+
+    instructions = (
+        "You are a data analyst. For each dataset below, write a short description "
+        "of what it contains and what each group of columns means. Start each answer "
+        "with a line '### <dataset id>'.")
+
+    def __init__(self, model, max_prompt_tokens=6000, per_dataset_tokens=1500,
+                 max_concurrency=4, requests_per_minute=60, count_tokens=estimate_tokens):
+        self.model = model
+        self.max_prompt_tokens = max_prompt_tokens
+        self.per_dataset_tokens = per_dataset_tokens
+        self.count_tokens = count_tokens
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = RateLimiter(requests_per_minute)
+
+    def build_prompts(self, schemas):
+        """Pack {dataset_id: schema} into prompts that each fit the budget"""
+        overhead = self.count_tokens(self.instructions) + 1
+        budget = min(self.per_dataset_tokens, self.max_prompt_tokens - overhead)
+
+        prompts, current, used = [], [], overhead
+        for dataset_id, schema in schemas.items():
+            summary = summarize_schema(schema, budget, dataset_id=dataset_id,
+                                       count_tokens=self.count_tokens)
+            cost = self.count_tokens(summary) + 1
+            if current and used + cost > self.max_prompt_tokens:
+                prompts.append((current, self._prompt(current)))
+                current, used = [], overhead
+            current.append((dataset_id, summary))
+            used += cost
+        if current:
+            prompts.append((current, self._prompt(current)))
+        return [([dataset_id for dataset_id, _ in batch], prompt) for batch, prompt in prompts]
+
+    def describe(self, schemas):
+        """Return {dataset_id: description} for every schema"""
+        prompts = self.build_prompts(schemas)
+        descriptions = {}
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            for dataset_ids, text in pool.map(self._send, prompts):
+                descriptions.update(_split_answers(text, dataset_ids))
+        return descriptions
+
+    def _send(self, batch):
+        dataset_ids, prompt = batch
+        self.rate_limiter.acquire()
+        response = self.model.invoke(prompt)
+        return dataset_ids, response.content
+
+    def _prompt(self, batch):
+        sections = "\n\n".join(summary for _, summary in batch)
+        return f"{self.instructions}\n{sections}"
+
+
+def _split_answers(text, dataset_ids):
+    """Split a batched answer on its '### <dataset id>' headings"""
+    answers = {}
+    parts = re.split(r"^###\s*(.+?)\s*$", text, flags=re.MULTILINE)
+    for heading, body in zip(parts[1::2], parts[2::2]):
+        if heading in dataset_ids:
+            answers[heading] = body.strip()
+    if not answers and len(dataset_ids) == 1:
+        answers[dataset_ids[0]] = text.strip()
+    return answers
@@ -0,0 +1,375 @@
+"""
+Directory watcher for continuous ingestion.
+
+Drop .csv, .db/.sqlite and .json/.jsonl files into a landing directory and
+the watcher ingests them:
+
+- Changes are noticed with inotify (if the optional inotify_simple package
+  is installed) or by polling the directory
+- A file is only picked up once its size and mtime have stopped changing
+  for settle_seconds, so half-written files are not ingested
+- Jobs go through a bounded queue to a fixed pool of worker threads; when
+  the queue is full the scanner waits (backpressure)
+- Every job is recorded in a small SQLite queue next to the files, so after
+  a restart pending jobs are resumed and finished files are not re-ingested
+  unless they changed (hidden files, like the queue itself, are ignored)
+- Throughput, queue depth and failures are reported to shared.metrics and
+  by stats()
+
+Run it:  python -m agents.watcher data/landing --workers 4
+"""
+
+import argparse
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from agents.ingestion import ingest_data_file, ingest_incremental
+from shared.metrics import metrics as default_metrics
+from shared.state import create_initial_state
+
+
+WATCHED_EXTENSIONS = ('.csv', '.db', '.sqlite', '.sqlite3', '.json', '.jsonl')
+
+
+# =============================================
+# 1. PERSISTENT JOB QUEUE (Survives restarts)
+# =============================================
+
+class JobQueue:
+    """SQLite record of every file job: pending, running, done or failed"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,"
+            " status TEXT, attempts INTEGER DEFAULT 0, error TEXT,"
+            " updated_at REAL)")
+        self._conn.commit()
+
+    def is_current(self, path, size, mtime_ns):
+        """True if this exact version of the file is already queued or handled"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns FROM jobs WHERE path = ?", (path,)).fetchone()
+        return row is not None and row[0] == size and row[1] == mtime_ns
+
+    def add(self, path, size, mtime_ns):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (path, size, mtime_ns, status, updated_at)"
+                " VALUES (?, ?, ?, 'pending', ?)"
+                " ON CONFLICT(path) DO UPDATE SET size = excluded.size,"
+                " mtime_ns = excluded.mtime_ns, status = 'pending', error = NULL,"
+                " updated_at = excluded.updated_at",
+                (path, size, mtime_ns, time.time()))
+            self._conn.commit()
+
+    def mark(self, path, status, error=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ?,"
+                " attempts = attempts + (? = 'running') WHERE path = ?",
+                (status, error, time.time(), status, path))
+            self._conn.commit()
+
+    def unfinished(self):
+        """Jobs that were pending or running when the watcher last stopped"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM jobs WHERE status IN ('pending', 'running')"
+                " ORDER BY updated_at").fetchall()
+        return [row[0] for row in rows]
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# =============================================
+# 2. DIRECTORY WATCHER (Scanner + worker pool)
+# =============================================
+
+class DirectoryWatcher:
+
+    def __init__(self, directory, workspace=None, ingest=None, workers=2, queue_size=100,
+                 settle_seconds=1.0, poll_interval=1.0, queue_path=None, use_inotify=None,
+                 incremental=False, on_ingested=None, metrics=None):
+        """
+        ingest:       function(file_path, state) -> state, defaults to
+                      ingest_data_file (or ingest_incremental with incremental=True)
+        queue_size:   max jobs waiting for a worker before the scanner blocks
+        queue_path:   SQLite job queue, defaults to <directory>/.ingest_queue.db
+        use_inotify:  None = use it when inotify_simple is installed
+        on_ingested:  optional callback(file_path, state) after every job
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.workspace = workspace
+        self.ingest = ingest or (ingest_incremental if incremental else ingest_data_file)
+        self.workers = workers
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.on_ingested = on_ingested
+        self.metrics = metrics or default_metrics
+        self.jobs = JobQueue(queue_path or self.directory / ".ingest_queue.db")
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._candidates = {}  # path -> (size, mtime_ns, first seen with this size/mtime)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self._inotify = self._open_inotify() if use_inotify is not False else None
+        if use_inotify and self._inotify is None:
+            raise ValueError("inotify requested but inotify_simple is not available")
+
+        self.started_at = None
+        self.files_ingested = 0
+        self.files_failed = 0
+        self.bytes_ingested = 0
+
+    # ----- lifecycle -----
+
+    def start(self):
+        """Resume unfinished jobs, scan once and start the scanner and workers"""
+        self._stop.clear()
+        self.started_at = time.time()
+        for _ in range(self.workers):
+            self._spawn(self._work)
+        for path in self.jobs.unfinished():
+            self._enqueue(path)
+        self.scan_once()
+        self._spawn(self._scan_loop)
+        mode = "inotify" if self._inotify is not None else "polling"
+        print(f"👀 Watching {self.directory} ({mode}, {self.workers} workers)")
+        return self
+
+    def stop(self, timeout=5.0):
+        """Stop scanning, let workers finish their current job and exit"""
+        self._stop.set()
+        for _ in range(self.workers):
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        self.jobs.close()
+
+    def run_forever(self):
+        self.start()
+        try:
+            while not self._stop.is_set():
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            print("\n🛑 Stopping watcher")
+        finally:
+            print(f"📊 {self.stats()}")
+            self.stop()
+
+    def wait_idle(self, timeout=None):
+        """Block until nothing is settling, queued or running; True if idle"""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self._lock:
+                idle = not self._candidates and self._in_flight == 0 and self._queue.empty()
+            if idle:
+                return True
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(0.02)
+
+    # ----- discovery -----
+
+    def scan_once(self, paths=None):
+        """Look at files (all watched files by default) and queue the settled ones"""
+        if paths is None:
+            paths = [p for p in self.directory.iterdir() if p.is_file() and _is_watched(p.name)]
+        now = time.time()
+        for path in paths:
+            self._observe(str(path), now)
+
+        with self._lock:
+            candidates = list(self._candidates.items())
+        for path, (size, mtime_ns, since) in candidates:
+            if not os.path.exists(path):
+                self._forget(path)
+            elif now - since >= self.settle_seconds and self._is_settled(path, size, mtime_ns):
+                self._forget(path)
+                self.jobs.add(path, size, mtime_ns)
+                self._enqueue(path)
+
+    def _observe(self, path, now):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._forget(path)
+            return
+        if self.jobs.is_current(path, stat.st_size, stat.st_mtime_ns):
+            self._forget(path)  # already ingested (or queued) in this version
+            return
+        with self._lock:
+            seen = self._candidates.get(path)
+            if seen is None or seen[:2] != (stat.st_size, stat.st_mtime_ns):
+                # New or still being written: restart the settle timer
+                self._candidates[path] = (stat.st_size, stat.st_mtime_ns, now)
+
+    def _is_settled(self, path, size, mtime_ns):
+        stat = os.stat(path)
+        return (stat.st_size, stat.st_mtime_ns) == (size, mtime_ns)
+
+    def _forget(self, path):
+        with self._lock:
+            self._candidates.pop(path, None)
+
+    def _scan_loop(self):
+        while not self._stop.is_set():
+            if self._inotify is not None:
+                events = self._inotify.read(timeout=int(self.poll_interval * 1000))
+                paths = {self.directory / event.name for event in events
+                         if _is_watched(event.name)}
+                self.scan_once(sorted(paths))
+            else:
+                self._stop.wait(self.poll_interval)
+                self.scan_once()
+
+    def _open_inotify(self):
+        try:
+            from inotify_simple import INotify, flags
+        except ImportError:
+            return None
+        inotify = INotify()
+        inotify.add_watch(str(self.directory), flags.CLOSE_WRITE | flags.MOVED_TO
+                          | flags.CREATE | flags.MODIFY)
+        return inotify
+
+    # ----- workers -----
+
+    def _enqueue(self, path):
+        with self._lock:
+            self._in_flight += 1  # counted from queueing so wait_idle sees it
+        while not self._stop.is_set():
+            try:
+                self._queue.put(path, timeout=0.5)  # blocks while workers are behind
+                break
+            except queue.Full:
+                continue
+        else:
+            with self._lock:
+                self._in_flight -= 1
+        self.metrics.set_gauge("watcher.queue_depth", self._queue.qsize())
+
+    def _work(self):
+        while True:
+            path = self._queue.get()
+            if path is None:
+                return
+            self.metrics.set_gauge("watcher.queue_depth", self._queue.qsize())
+            try:
+                self._ingest(path)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+    def _ingest(self, path):
+        self.jobs.mark(path, "running")
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        start = time.perf_counter()
+        try:
+            state = self.ingest(path, create_initial_state(self.workspace))
+            error = state.get("error")
+        except Exception as e:
+            state, error = None, str(e)
+        self.metrics.observe("watcher.ingest_seconds", time.perf_counter() - start)
+
+        with self._lock:
+            if error:
+                self.files_failed += 1
+            else:
+                self.files_ingested += 1
+                self.bytes_ingested += size
+        if error:
+            self.jobs.mark(path, "failed", error)
+            self.metrics.increment("watcher.files_failed")
+            print(f"❌ Failed to ingest {path}: {error}")
+        else:
+            self.jobs.mark(path, "done")
+            self.metrics.increment("watcher.files_ingested")
+            self.metrics.increment("watcher.bytes_ingested", size)
+        if self.on_ingested is not None:
+            self.on_ingested(path, state)
+
+    def _spawn(self, target):
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    # ----- observability -----
+
+    def stats(self):
+        elapsed = time.time() - self.started_at if self.started_at else 0.0
+        with self._lock:
+            return {
+                "files_ingested": self.files_ingested,
+                "files_failed": self.files_failed,
+                "bytes_ingested": self.bytes_ingested,
+                "files_per_second": self.files_ingested / elapsed if elapsed else 0.0,
+                "mb_per_second": self.bytes_ingested / 1024 / 1024 / elapsed if elapsed else 0.0,
+                "queue_depth": self._queue.qsize(),
+                "in_flight": self._in_flight,
+                "settling": len(self._candidates),
+                "jobs": self.jobs.counts(),
+            }
+
+
+def _is_watched(name):
+    """Data files only; hidden files (temp uploads, the job queue) are skipped"""
+    from data.compression import strip_compression_suffix
+    return (not name.startswith(".")
+            and strip_compression_suffix(name).lower().endswith(WATCHED_EXTENSIONS))
+
+
+# =============================================
+# 3. COMMAND LINE (Run as a daemon)
+# =============================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest files dropped into a directory")
+    parser.add_argument("directory")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=100)
+    parser.add_argument("--settle-seconds", type=float, default=1.0)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--incremental", action="store_true",
+                        help="only parse appended lines of growing CSV/JSONL files")
+    parser.add_argument("--no-inotify", action="store_true")
+    args = parser.parse_args(argv)
+
+    watcher = DirectoryWatcher(
+        args.directory, workers=args.workers, queue_size=args.queue_size,
+        settle_seconds=args.settle_seconds, poll_interval=args.poll_interval,
+        use_inotify=False if args.no_inotify else None, incremental=args.incremental)
+    watcher.run_forever()
+
+
+if __name__ == "__main__":
+    main()
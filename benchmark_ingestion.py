@@ -0,0 +1,544 @@
+"""
+Benchmarks for the Ingestion Agent
+Run all benchmarks:      python benchmark_ingestion.py
+Run one benchmark:       python benchmark_ingestion.py import_time
+Fan-out size/processes:  FANOUT_MB=256 FANOUT_PROCESSES=4 python benchmark_ingestion.py fanout
+Generated files:         python benchmark_ingestion.py --out /path/to/dir  (default: system temp dir)
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+PROJECT_DIR = Path(__file__).parent
+# Generated inputs (up to ~500 MB) never go into the repo; reused between runs
+BENCH_DIR = Path(tempfile.gettempdir()) / "ingestion_bench"
+
+
+# =============================================
+# 1. HELPERS
+# =============================================
+
+def run_python(code, *flags):
+    """Run code in a fresh interpreter, return (wall seconds, stderr)"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=PROJECT_DIR, capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, result.stderr
+
+
+def parse_importtime(stderr):
+    """Turn `python -X importtime` output into {module: cumulative microseconds}"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def report(name, value, target, unit="ms"):
+    status = "✅" if value <= target else "❌"
+    print(f"{status} {name}: {value:.1f} {unit} (target <= {target} {unit})")
+    return value <= target
+
+
+def available_memory_mb():
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("inf")
+
+
+def fanout_task(payload):
+    """Worker side of bench_shared_fanout: touch every row of one column"""
+    from shared.shared_data import SharedDataset
+
+    df = payload.attach() if isinstance(payload, SharedDataset) else payload
+    return float(df["amount"].sum()), len(df)
+
+
+# =============================================
+# 2. BENCHMARKS
+# =============================================
+
+def bench_import_time():
+    """Cold-start cost of the ingestion entry point (python -X importtime)"""
+    print("\n⏱️  Import time (python -X importtime)")
+    print("-" * 40)
+
+    _, stderr = run_python("import agents.ingestion", "-X", "importtime")
+    modules = parse_importtime(stderr)
+    entry_ms = modules["agents.ingestion"] / 1000
+    heavy = [name for name in ("pandas", "pyarrow", "langchain_google_genai")
+             if name in modules]
+
+    ok = report("import agents.ingestion", entry_ms, 20)
+    print(f"   Heavy modules imported eagerly: {heavy or 'none'}")
+
+    _, stderr = run_python("import config.gemini_config", "-X", "importtime")
+    config_ms = parse_importtime(stderr)["config.gemini_config"] / 1000
+    ok &= report("import config.gemini_config", config_ms, 20)
+    return ok and not heavy
+
+
+def bench_small_csv_cold_start():
+    """Fresh process: import the agent and ingest a small CSV"""
+    print("\n⏱️  Cold start: ingest_data_file on a small CSV")
+    print("-" * 40)
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    csv_path = BENCH_DIR / "small.csv"
+    csv_path.write_text("id,name,value\n1,A,10.5\n2,B,20.7\n3,C,30.9\n")
+
+    code = (
+        "import io, contextlib, time\n"
+        "start = time.perf_counter()\n"
+        "from agents.ingestion import ingest_data_file\n"
+        "from shared.state import create_initial_state\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        f"    state = ingest_data_file({str(csv_path)!r}, create_initial_state())\n"
+        "assert state['status'] == 'completed', state['error']\n"
+        "import sys; print(time.perf_counter() - start, file=sys.stderr)\n"
+    )
+    runs = [run_python(code) for _ in range(5)]
+    process_ms = sorted(wall for wall, _ in runs)[len(runs) // 2] * 1000
+    in_process_ms = sorted(float(err.strip().splitlines()[-1]) for _, err in runs)[len(runs) // 2] * 1000
+
+    ok = report("ingest small CSV (in process, median)", in_process_ms, 1000)
+    report("whole process incl. interpreter (median)", process_ms, 1500)
+    return ok
+
+
+def bench_parquet_vs_csv(rows=1_000_000):
+    """Ingest the same data from CSV and from Parquet (sample + profile)"""
+    print(f"\n⏱️  Parquet vs CSV ingestion ({rows:,} rows)")
+    print("-" * 40)
+
+    import io
+    import contextlib
+    import numpy as np
+    import pandas as pd
+    from data.csv_handler import CSVHandler
+    from data.parquet_handler import ParquetHandler
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "id": np.arange(rows),
+        "amount": rng.random(rows) * 100,
+        "region": rng.choice(["North", "South", "East", "West"], rows),
+        "quantity": rng.integers(1, 50, rows),
+    })
+    csv_path, parquet_path = BENCH_DIR / "sales.csv", BENCH_DIR / "sales.parquet"
+    df.to_csv(csv_path, index=False)
+    df.to_parquet(parquet_path, row_group_size=100_000)
+
+    def timed(func):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        return time.perf_counter() - start
+
+    # Profiling costs the same for every format, so compare reading + sampling
+    csv_s = timed(lambda: CSVHandler().process_csv(str(csv_path), profile=False))
+    parquet_s = timed(lambda: ParquetHandler().process_parquet_file(str(parquet_path), profile=False))
+    pruned_s = timed(lambda: ParquetHandler().process_parquet_file(
+        str(parquet_path), columns=["id", "amount"], filters=[["id", ">=", rows - 50_000]],
+        profile=False))
+    profiled_s = timed(lambda: ParquetHandler().process_parquet_file(str(parquet_path)))
+
+    print(f"   CSV:     {csv_s * 1000:.0f} ms")
+    print(f"   Parquet: {parquet_s * 1000:.0f} ms ({csv_s / parquet_s:.1f}x faster)")
+    print(f"   Parquet, 2 columns + pruned row groups: {pruned_s * 1000:.0f} ms")
+    print(f"   Parquet with profiling: {profiled_s * 1000:.0f} ms")
+    return report("Parquet time as % of CSV time", parquet_s / csv_s * 100, 33, unit="%")
+
+
+def bench_compressed_csv(rows=500_000):
+    """Ingest the same CSV plain and compressed with every supported codec"""
+    print(f"\n⏱️  Compressed vs uncompressed CSV ingestion ({rows:,} rows)")
+    print("-" * 40)
+
+    import bz2
+    import contextlib
+    import gzip
+    import io
+    import lzma
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+    from data.csv_handler import CSVHandler
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(0)
+    pd.DataFrame({
+        "id": np.arange(rows),
+        "amount": rng.random(rows) * 100,
+        "region": rng.choice(["North", "South", "East", "West"], rows),
+    }).to_csv(BENCH_DIR / "plain.csv", index=False)
+    raw = (BENCH_DIR / "plain.csv").read_bytes()
+
+    files = {"plain": BENCH_DIR / "plain.csv"}
+    files["gzip"] = BENCH_DIR / "plain.csv.gz"
+    files["gzip"].write_bytes(gzip.compress(raw, 6))
+    files["zstd"] = BENCH_DIR / "plain.csv.zst"
+    with pa.output_stream(str(files["zstd"]), compression="zstd") as f:
+        f.write(raw)
+    files["bz2 (multi-stream)"] = BENCH_DIR / "plain.csv.bz2"
+    step = 900_000  # like pbzip2: one stream per 900 KB
+    files["bz2 (multi-stream)"].write_bytes(
+        b"".join(bz2.compress(raw[i:i + step]) for i in range(0, len(raw), step)))
+    files["xz"] = BENCH_DIR / "plain.csv.xz"
+    files["xz"].write_bytes(lzma.compress(raw, preset=1))
+
+    seconds = {}
+    for name, path in files.items():
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            CSVHandler().process_csv(str(path), profile=False)
+        seconds[name] = time.perf_counter() - start
+        mb_per_s = len(raw) / 1024 / 1024 / seconds[name]
+        print(f"   {name:20s} {path.stat().st_size / 1024 / 1024:6.1f} MB on disk, "
+              f"{seconds[name] * 1000:6.0f} ms, {mb_per_s:6.1f} MB/s of CSV")
+
+    return report("gzip time as % of plain CSV time",
+                  seconds["gzip"] / seconds["plain"] * 100, 200, unit="%")
+
+
+def bench_shared_fanout(size_mb=None, processes=None):
+    """Send one dataset to N worker processes: pickled vs shared-memory handle"""
+    size_mb = size_mb or int(os.environ.get("FANOUT_MB", 1024))
+    processes = processes or int(os.environ.get("FANOUT_PROCESSES", 8))
+    print(f"\n⏱️  Fan-out of a {size_mb} MB dataset to {processes} processes")
+    print("-" * 40)
+
+    import pickle
+    from concurrent.futures import ProcessPoolExecutor
+    import numpy as np
+    import pandas as pd
+    from shared.shared_data import publish_dataset
+
+    rows = size_mb * 1024 * 1024 // 32  # four 8-byte columns
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "id": np.arange(rows),
+        "amount": rng.random(rows) * 100,
+        "quantity": rng.integers(1, 50, rows),
+        "store": rng.integers(0, 1000, rows),
+    })
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        list(pool.map(abs, range(processes)))  # start the workers first
+
+        start = time.perf_counter()
+        handle = publish_dataset(df, "fanout")
+        results = list(pool.map(fanout_task, [handle] * processes))
+        shared_s = time.perf_counter() - start
+        assert all(n == rows for _, n in results)
+        handle_bytes = len(pickle.dumps(handle))
+        handle.release()
+        print(f"   Shared handle: {shared_s * 1000:.0f} ms "
+              f"({handle_bytes} bytes sent per task, publish included)")
+
+        # Pickling keeps a full copy per busy worker; skip it if that cannot fit
+        pickled_s = None
+        if size_mb * (processes + 2) < available_memory_mb():
+            start = time.perf_counter()
+            list(pool.map(fanout_task, [df] * processes))
+            pickled_s = time.perf_counter() - start
+            print(f"   Pickled df:    {pickled_s * 1000:.0f} ms "
+                  f"({size_mb} MB sent per task)")
+        else:
+            print(f"   Pickled df:    skipped, {processes} copies of {size_mb} MB "
+                  f"do not fit in {available_memory_mb():.0f} MB of free memory")
+
+    if pickled_s is None:
+        return report("bytes sent per task (shared handle)", handle_bytes, 1024, unit="B")
+    return report("shared fan-out time as % of pickled", shared_s / pickled_s * 100, 25, unit="%")
+
+
+def bench_sqlite_bulk_load(rows=1_000_000):
+    """Write the same DataFrame to SQLite with to_sql and with SQLiteBulkLoader"""
+    print(f"\n⏱️  SQLite bulk load vs DataFrame.to_sql ({rows:,} rows)")
+    print("-" * 40)
+
+    import sqlite3
+    import numpy as np
+    import pandas as pd
+    from data.sqlite_bulk_loader import SQLiteBulkLoader
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "id": np.arange(rows),
+        "amount": rng.random(rows) * 100,
+        "region": rng.choice(["North", "South", "East", "West"], rows),
+        "quantity": rng.integers(1, 50, rows),
+        "date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D"),
+    })
+    to_sql_path, bulk_path = BENCH_DIR / "to_sql.db", BENCH_DIR / "bulk.db"
+    to_sql_path.unlink(missing_ok=True)
+    bulk_path.unlink(missing_ok=True)
+
+    start = time.perf_counter()
+    conn = sqlite3.connect(to_sql_path)
+    df.to_sql("sales", conn, index=False)
+    conn.execute('CREATE INDEX ix_sales_id ON sales ("id")')
+    conn.commit()
+    conn.close()
+    to_sql_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stats = SQLiteBulkLoader(bulk_path).load("sales", df, indexes=["id"])
+    bulk_s = time.perf_counter() - start
+
+    csv_path = BENCH_DIR / "sales.csv"
+    df.to_csv(csv_path, index=False)
+    file_stats = SQLiteBulkLoader(bulk_path).load_file(str(csv_path), "sales_csv")
+
+    print(f"   to_sql + index:      {to_sql_s * 1000:6.0f} ms")
+    print(f"   SQLiteBulkLoader:    {bulk_s * 1000:6.0f} ms ({to_sql_s / bulk_s:.1f}x faster, "
+          f"{stats['rows_per_second']:,} rows/s)")
+    print(f"   load_file from CSV:  {file_stats['seconds'] * 1000:6.0f} ms (streamed in "
+          f"{file_stats['batches']} batches)")
+    return report("bulk load time as % of to_sql time", bulk_s / to_sql_s * 100, 50, unit="%")
+
+
+def bench_datetime_inference(rows=200_000):
+    """Parse date columns per value (dateutil) vs with an inferred fixed format"""
+    print(f"\n⏱️  Datetime parsing ({rows:,} rows, 3 date columns)")
+    print("-" * 40)
+
+    import warnings
+    import numpy as np
+    import pandas as pd
+    from data.datetime_inference import clear_format_cache, parse_datetime_columns
+
+    rng = np.random.default_rng(0)
+    stamps = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 10**8, rows), unit="s")
+    df = pd.DataFrame({
+        "created": stamps.strftime("%Y-%m-%d %H:%M:%S"),
+        "shipped": stamps.strftime("%d/%m/%Y %H:%M"),
+        "invoiced": stamps.strftime("%b %d, %Y"),
+        "region": rng.choice(["North", "South", "East", "West"], rows),
+    })
+
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for col in ("created", "shipped", "invoiced"):
+            pd.to_datetime(df[col], format="mixed", dayfirst=col == "shipped")
+    per_value_s = time.perf_counter() - start
+
+    clear_format_cache()
+    start = time.perf_counter()
+    parsed, formats = parse_datetime_columns(df, "bench.csv")
+    inferred_s = time.perf_counter() - start
+    assert set(formats) == {"created", "shipped", "invoiced"}, formats
+
+    start = time.perf_counter()
+    parse_datetime_columns(df, "bench.csv")
+    cached_s = time.perf_counter() - start
+
+    print(f"   Per value (format='mixed'):  {per_value_s * 1000:6.0f} ms")
+    print(f"   Inferred format:             {inferred_s * 1000:6.0f} ms "
+          f"({per_value_s / inferred_s:.1f}x faster)")
+    print(f"   Format from cache:           {cached_s * 1000:6.0f} ms")
+    for col, fmt in formats.items():
+        print(f"   {col}: {fmt!r} -> {parsed[col].dtype}")
+    return report("inferred parse time as % of per-value time", inferred_s / per_value_s * 100, 25,
+                  unit="%")
+
+
+def bench_progressive_preview(rows=1_000_000):
+    """Time to first preview for a small and a large CSV (progressive ingestion)"""
+    print(f"\n⏱️  Progressive ingestion: time to first preview (100 vs {rows:,} rows)")
+    print("-" * 40)
+
+    import io
+    import contextlib
+    import numpy as np
+    import pandas as pd
+    from agents.ingestion import ingest_progressive, wait_for_ingestion
+    from shared.state import create_initial_state
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(0)
+    paths = {}
+    for label, n in (("small", 100), ("large", rows)):
+        paths[label] = BENCH_DIR / f"progressive_{label}.csv"
+        pd.DataFrame({
+            "id": np.arange(n),
+            "amount": rng.random(n) * 100,
+            "region": rng.choice(["North", "South", "East", "West"], n),
+            "sold": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 10**7, n), unit="s"),
+        }).to_csv(paths[label], index=False)
+
+    preview_s, full_s = {}, {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        wait_for_ingestion(ingest_progressive(str(paths["small"]), create_initial_state()))  # warm up
+        for label, path in paths.items():
+            start = time.perf_counter()
+            state = ingest_progressive(str(path), create_initial_state())
+            preview_s[label] = time.perf_counter() - start
+            assert state["status"] == "loading" and len(state["df"]) > 0
+            wait_for_ingestion(state)
+            full_s[label] = time.perf_counter() - start
+            assert state["status"] == "completed", state["error"]
+
+    for label in paths:
+        print(f"   {label:5} file: preview in {preview_s[label] * 1000:5.1f} ms, "
+              f"complete after {full_s[label] * 1000:6.0f} ms")
+    return report("time to first preview (large file)", preview_s["large"] * 1000, 50)
+
+
+def bench_dedup(rows=1_000_000, batch_rows=50_000):
+    """Streaming deduplication: in memory and with spilled hashes"""
+    print(f"\n⏱️  Deduplication ({rows:,} rows in {batch_rows:,}-row batches, ~20% repeated)")
+    print("-" * 40)
+
+    import numpy as np
+    import pandas as pd
+    from data.dedup import Deduplicator
+
+    rng = np.random.default_rng(0)
+    unique = pd.DataFrame({
+        "id": np.arange(rows),
+        "amount": rng.random(rows).round(2),
+        "region": rng.choice(["North", "South", "East", "West"], rows),
+    })
+    df = unique.iloc[rng.integers(0, int(rows * 0.8), rows)].reset_index(drop=True)
+    expected = len(df.drop_duplicates())
+
+    timings = {}
+    for label, max_keys in (("in memory", 10 * rows), ("spilling", rows // 10)):
+        with Deduplicator(max_memory_keys=max_keys) as deduplicator:
+            start = time.perf_counter()
+            kept = sum(len(deduplicator.filter_batch(df.iloc[i:i + batch_rows]))
+                       for i in range(0, rows, batch_rows))
+            timings[label] = time.perf_counter() - start
+            spilled = deduplicator.summary()["keys_spilled"]
+        assert kept == expected, (kept, expected)
+        print(f"   {label:9}: {timings[label] * 1000:5.0f} ms, kept {kept:,} rows "
+              f"({spilled:,} hashes on disk)")
+    return report("time per 1M rows (spilling)", timings["spilling"] * 1e6 / rows * 1000, 1000)
+
+
+def bench_semantic_index(datasets=500, columns=20, queries=200):
+    """Semantic index: adding datasets and top-k column search"""
+    print(f"\n⏱️  Semantic index ({datasets} datasets x {columns} columns)")
+    print("-" * 40)
+
+    import numpy as np
+    from data.semantic_index import SemanticIndex
+
+    rng = np.random.default_rng(0)
+    words = ["customer", "order", "product", "price", "amount", "region", "store", "date",
+             "email", "name", "status", "quantity", "discount", "supplier", "city", "country",
+             "invoice", "payment", "shipping", "category", "rating", "employee", "department"]
+    index = SemanticIndex()
+    start = time.perf_counter()
+    for d in range(datasets):
+        names = [f"{rng.choice(words)}_{rng.choice(words)}_{c}" for c in range(columns)]
+        schema = {
+            "columns": names,
+            "data_types": {name: rng.choice(["int64", "float64", "str"]) for name in names},
+            "profile": {"columns": {name: {"top_values": [[str(rng.choice(words)).title(), 5]
+                                                          for _ in range(5)]}
+                                    for name in names}},
+        }
+        index.add_dataset(f"csv_{rng.choice(words)}_{d}", schema)
+    add_ms = (time.perf_counter() - start) / datasets * 1000
+    start = time.perf_counter()
+    index.search("warmup")
+    rebuild_ms = (time.perf_counter() - start) * 1000
+
+    latencies = []
+    for _ in range(queries):
+        question = " ".join(rng.choice(words, 4))
+        start = time.perf_counter()
+        index.search(question, k=10)
+        latencies.append(time.perf_counter() - start)
+    p50 = sorted(latencies)[len(latencies) // 2] * 1000
+    print(f"   add: {add_ms:.2f} ms per dataset, first search after changes: {rebuild_ms:.0f} ms")
+    print(f"   top-10 search over {len(index):,} columns: p50 {p50:.2f} ms")
+    return report("top-10 column search", p50, 5)
+
+
+def bench_quality_rules(rows=1_000_000):
+    """Data-quality rules: checking cost and early abort on a bad file"""
+    print(f"\n⏱️  Quality rules ({rows:,}-row CSV, a third of the amounts negative)")
+    print("-" * 40)
+
+    import contextlib
+    import io
+    import numpy as np
+    import pandas as pd
+    from data.csv_handler import CSVHandler
+
+    path = BENCH_DIR / f"quality_{rows}.csv"
+    if not path.exists():
+        BENCH_DIR.mkdir(parents=True, exist_ok=True)
+        rng = np.random.default_rng(0)
+        amounts = rng.random(rows) * 100
+        amounts[::3] = -1
+        pd.DataFrame({"id": np.arange(rows), "amount": amounts.round(2),
+                      "email": [f"user{i}@example.com" for i in range(rows)]}).to_csv(path, index=False)
+    rules = [{"rule": "not_null", "column": "id"}, {"rule": "unique", "column": "id"},
+             {"rule": "range", "column": "amount", "min": 0, "max": 100},
+             {"rule": "regex", "column": "email", "pattern": r"[^@\s]+@[^@\s]+"}]
+
+    timings = {}
+    for label, quality in (("no rules", None), ("4 rules", rules),
+                           ("abort at 5%", {"rules": rules, "max_error_rate": 0.05})):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            try:
+                CSVHandler().process_csv(str(path), quality=quality)
+            except ValueError:
+                pass  # the aborted read
+        timings[label] = time.perf_counter() - start
+        print(f"   {label:11}: {timings[label] * 1000:6.0f} ms")
+    return report("time to reject a bad file", timings["abort at 5%"] * 1000,
+                  round(timings["no rules"] * 1000 / 4))
+
+
+BENCHMARKS = {
+    "import_time": bench_import_time,
+    "cold_start": bench_small_csv_cold_start,
+    "parquet_vs_csv": bench_parquet_vs_csv,
+    "compressed": bench_compressed_csv,
+    "fanout": bench_shared_fanout,
+    "sqlite_bulk_load": bench_sqlite_bulk_load,
+    "datetime_inference": bench_datetime_inference,
+    "progressive_preview": bench_progressive_preview,
+    "dedup": bench_dedup,
+    "semantic_index": bench_semantic_index,
+    "quality_rules": bench_quality_rules,
+}
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--out" in args:
+        position = args.index("--out")
+        BENCH_DIR = Path(args[position + 1])
+        del args[position:position + 2]
+    selected = args or list(BENCHMARKS)
+    print("🚀 Ingestion Agent Benchmarks")
+    print("=" * 50)
+    results = {name: BENCHMARKS[name]() for name in selected}
+    print("\n" + "=" * 50)
+    passed = sum(1 for ok in results.values() if ok)
+    print(f"📊 {passed}/{len(results)} benchmarks met their targets")
@@ -0,0 +1,60 @@
+"""
+Offline stand-in for the Gemini chat model.
+
+FakeChatModel implements the small part of the ChatGoogleGenerativeAI
+interface the agents use (`invoke` returning an object with `.content`,
+and `get_num_tokens`), so caching and prompt-building code can be tested
+without an API key. It counts the tokens of every prompt and, like the real
+API, rejects prompts above its input limit.
+"""
+
+import re
+import threading
+
+
+class FakeMessage:
+    """Minimal AIMessage look-alike"""
+
+    type = "ai"
+
+    def __init__(self, content):
+        self.content = content
+        self.response_metadata = {"fake": True}
+
+    def __repr__(self):
+        return f"FakeMessage(content={self.content!r})"
+
+
+class FakeChatModel:
+    """Deterministic local model that records every call"""
+
+    def __init__(self, responder=None, model="fake-gemini", temperature=0.1,
+                 max_input_tokens=None):
+        self.model = model
+        self.temperature = temperature
+        self.responder = responder
+        self.max_input_tokens = max_input_tokens
+        self.calls = []
+        self.prompt_tokens = []
+        self._lock = threading.Lock()
+
+    def get_num_tokens(self, text):
+        """Approximate token count (whitespace/punctuation split)"""
+        return len(re.findall(r"\w+|[^\w\s]", text))
+
+    def invoke(self, prompt, **kwargs):
+        text = prompt if isinstance(prompt, str) else str(prompt)
+        tokens = self.get_num_tokens(text)
+        if self.max_input_tokens is not None and tokens > self.max_input_tokens:
+            raise ValueError(
+                f"Prompt has {tokens} tokens, limit is {self.max_input_tokens}")
+        with self._lock:
+            self.calls.append(prompt)
+            self.prompt_tokens.append(tokens)
+        if self.responder is not None:
+            return FakeMessage(self.responder(text))
+        return FakeMessage(f"[{self.model}] {text[:200]}")
+
+    @property
+    def call_count(self):
+        return len(self.calls)
@@ -1,12 +1,27 @@
-
 import os
-from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
+import threading
+
+_dotenv_loaded = False
+
+# One client per (model, temperature) for the whole process
+_model_cache = {}
+_model_cache_lock = threading.Lock()
+
+
+def _load_env():
+    """Load .env once, on the first model request rather than at import time"""
+    global _dotenv_loaded
+    if not _dotenv_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _dotenv_loaded = True
 
-load_dotenv()
 
+def create_gemini_model(api_key=None, model_name="gemini-pro", temperature=0.1):
+    # Imported lazily: langchain_google_genai takes seconds to import
+    from langchain_google_genai import ChatGoogleGenerativeAI
 
-def create_gemini_model(api_key=None, model_name="gemini-pro"):
+    _load_env()
     if not api_key:
         api_key = os.getenv("GOOGLE_API_KEY")
 
@@ -17,11 +32,31 @@ def create_gemini_model(api_key=None, model_name="gemini-pro"):
     model = ChatGoogleGenerativeAI(
         model=model_name,
         google_api_key=api_key,
-        temperature=0.1,
+        temperature=temperature,
         convert_system_message_to_human=True
     )
     return model
 
 
-def get_gemini_model():
-    return create_gemini_model()
+def get_gemini_model(model_name="gemini-pro", temperature=0.1):
+    """Return the shared client for this model/temperature, creating it once"""
+    key = (model_name, temperature)
+    with _model_cache_lock:
+        if key not in _model_cache:
+            _model_cache[key] = create_gemini_model(
+                model_name=model_name, temperature=temperature)
+        return _model_cache[key]
+
+
+def get_cached_gemini_model(model_name="gemini-pro", temperature=0.1, cache_path=None):
+    """Shared client wrapped with the persistent response cache"""
+    from config.llm_cache import CachedModel, get_response_cache
+
+    return CachedModel(get_gemini_model(model_name, temperature),
+                       cache=get_response_cache(cache_path))
+
+
+def clear_model_cache():
+    """Forget all cached clients (e.g. after rotating the API key)"""
+    with _model_cache_lock:
+        _model_cache.clear()
@@ -0,0 +1,162 @@
+"""
+Persistent response cache for LLM calls.
+
+Schema descriptions and column explanations are requested again and again
+for identical schemas. CachedModel wraps any chat model with an `invoke`
+method (the Gemini client or FakeChatModel) and stores each response in a
+small SQLite database keyed by a hash of model + prompt, so an identical
+request never reaches the API twice - not even across processes.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+DEFAULT_CACHE_PATH = Path("data") / "llm_cache.db"
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class CachedResponse:
+    """Response served from the cache (same .content shape as an AIMessage)"""
+
+    def __init__(self, content):
+        self.content = content
+        self.response_metadata = {"cached": True}
+
+    def __repr__(self):
+        return f"CachedResponse(content={self.content!r})"
+
+
+# =============================================
+# 1. RESPONSE CACHE (SQLite backed)
+# =============================================
+
+class ResponseCache:
+    """Prompt/response store shared by every CachedModel in the process"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        if self.path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, model TEXT, content TEXT, created_at REAL)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key, model, content):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, model, content, time.time()))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_response_cache(path=None):
+    """Return the process-wide cache for a path (one connection per file)"""
+    path = str(path or DEFAULT_CACHE_PATH)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = ResponseCache(path)
+        return _caches[path]
+
+
+# =============================================
+# 2. CACHED MODEL (Drop-in wrapper)
+# =============================================
+
+class CachedModel:
+    """Wrap a chat model so identical prompts are answered from the cache"""
+
+    def __init__(self, model, cache=None):
+        self.model = model
+        self.cache = cache or get_response_cache()
+        self.model_id = model_identity(model)
+
+    def invoke(self, prompt, **kwargs):
+        key = cache_key(self.model_id, prompt)
+        content = self.cache.get(key)
+        if content is not None:
+            return CachedResponse(content)
+
+        response = self.model.invoke(prompt, **kwargs)
+        self.cache.put(key, self.model_id, _content_text(response.content))
+        return response
+
+    def __getattr__(self, name):
+        # Everything else (get_num_tokens, model, ...) comes from the real model
+        return getattr(self.model, name)
+
+
+# =============================================
+# 3. HELPER METHODS (Keys and serialization)
+# =============================================
+
+def model_identity(model):
+    """Describe a model by name and temperature for cache keys"""
+    name = getattr(model, "model", None) or getattr(model, "model_name", None) \
+        or type(model).__name__
+    return f"{name}|temperature={getattr(model, 'temperature', None)}"
+
+
+def cache_key(model_id, prompt):
+    """Stable hash of model + prompt (strings or lists of chat messages)"""
+    payload = json.dumps([model_id, _serialize_prompt(prompt)], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _serialize_prompt(prompt):
+    if isinstance(prompt, str):
+        return prompt
+    if isinstance(prompt, (list, tuple)):
+        return [_serialize_prompt(item) for item in prompt]
+    if hasattr(prompt, "content"):
+        return [getattr(prompt, "type", type(prompt).__name__), _serialize_prompt(prompt.content)]
+    if hasattr(prompt, "to_messages"):
+        return _serialize_prompt(prompt.to_messages())
+    return str(prompt)
+
+
+def _content_text(content):
+    return content if isinstance(content, str) else json.dumps(content)
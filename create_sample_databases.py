@@ -3,11 +3,12 @@ Create simple sample databases for testing ingestion
 Max 3 tables, 1000 rows each - perfect for students
 """
 
-import sqlite3
 import pandas as pd
 import json
 from pathlib import Path
 
+from data.sqlite_bulk_loader import SQLiteBulkLoader
+
 
 def create_sample_sqlite():
     """Create a simple SQLite database with 2 tables"""
@@ -35,15 +36,12 @@ def create_sample_sqlite():
     }
 
     # Create SQLite database
-    conn = sqlite3.connect(db_path)
-
     products_df = pd.DataFrame(products_data)
     sales_df = pd.DataFrame(sales_data)
 
-    products_df.to_sql('products', conn, index=False, if_exists='replace')
-    sales_df.to_sql('sales', conn, index=False, if_exists='replace')
-
-    conn.close()
+    loader = SQLiteBulkLoader(db_path)
+    loader.load('products', products_df, if_exists='replace')
+    loader.load('sales', sales_df, if_exists='replace')
 
     print(f"✅ Created SQLite database: {db_path}")
     print(
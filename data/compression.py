@@ -0,0 +1,285 @@
+"""
+Transparent decompression of .gz, .bz2, .zst and .xz sources.
+
+Compression is recognized by magic bytes (so a gzipped file without a .gz
+suffix still works) and, for files that do not exist yet, by extension.
+open_decompressed() returns a binary stream that the existing readers
+(pandas, pyarrow, json) consume directly - nothing is written to a temp
+file. Arrow's C++ codecs are used where available, with the standard
+library (gzip, bz2, lzma) or the optional zstandard package as fallback.
+Decompression runs in a background thread, one chunk ahead of the parser,
+so both use a CPU core at the same time. bzip2 files made of many streams
+(as written by pbzip2/lbzip2) are decompressed stream by stream on several
+threads; the other codecs are inherently sequential.
+
+This module only imports the standard library at import time, so
+detect_data_source can use it without slowing down start-up.
+"""
+
+import io
+import queue
+import threading
+from pathlib import Path
+
+
+COMPRESSION_EXTENSIONS = {
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".bz2": "bz2",
+    ".zst": "zstd",
+    ".zstd": "zstd",
+    ".xz": "xz",
+}
+
+MAGIC_BYTES = [
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+    (b"\xfd7zXZ\x00", "xz"),
+]
+
+
+# =============================================
+# 1. DETECTION
+# =============================================
+
+def detect_compression(file_path):
+    """Codec name ("gzip", "bz2", "zstd", "xz") or None for plain files"""
+    file_path = str(file_path)
+    try:
+        with open(file_path, "rb") as f:
+            head = f.read(6)
+        for magic, codec in MAGIC_BYTES:
+            if head.startswith(magic):
+                return codec
+        return None
+    except OSError:
+        return COMPRESSION_EXTENSIONS.get(Path(file_path).suffix.lower())
+
+
+def strip_compression_suffix(file_path):
+    """'sales.csv.gz' -> 'sales.csv' (unchanged if there is no such suffix)"""
+    file_path = str(file_path)
+    suffix = Path(file_path).suffix.lower()
+    if suffix in COMPRESSION_EXTENSIONS:
+        return file_path[:-len(suffix)]
+    return file_path
+
+
+def estimate_uncompressed_size(file_path, probe_bytes=256 * 1024):
+    """Size of the decompressed content, extrapolated from the first probe_bytes
+
+    Exact for plain files; for compressed files the compression ratio of
+    the first block is assumed to hold for the rest.
+    """
+    import bz2
+    import lzma
+    import os
+    import zlib
+
+    size = os.path.getsize(file_path)
+    codec = detect_compression(file_path)
+    if codec is None:
+        return size
+    decompressors = {
+        "gzip": lambda: zlib.decompressobj(wbits=47),
+        "bz2": bz2.BZ2Decompressor,
+        "xz": lzma.LZMADecompressor,
+    }
+    if codec not in decompressors:
+        return size * 4  # zstd: typical ratio for text, no stdlib decoder to measure it
+    with open(file_path, "rb") as f:
+        raw = f.read(probe_bytes)
+    try:
+        content = decompressors[codec]().decompress(raw)
+    except (zlib.error, OSError, EOFError, lzma.LZMAError):
+        return size * 4
+    if len(raw) >= size:
+        return len(content)
+    if not content:  # bzip2 emits nothing before its first 900 KB block ends
+        return size * 4
+    return int(size * len(content) / len(raw))
+
+
+# =============================================
+# 2. STREAMING DECOMPRESSION
+# =============================================
+
+def open_decompressed(file_path, codec=None, read_ahead=True, chunk_size=1024 * 1024,
+                      workers=None, use_arrow=True):
+    """Open a (possibly compressed) file as a binary stream of its content
+
+    codec defaults to detect_compression(file_path). With read_ahead the
+    next chunk is decompressed in a background thread while the caller
+    parses the current one. workers limits the threads used for
+    multi-stream bzip2 files (default: CPU count; 1 skips looking for
+    streams, which needs a scan of the whole file). use_arrow=False
+    prefers the standard library codecs, which avoids importing pyarrow
+    for short reads.
+    """
+    codec = codec or detect_compression(file_path)
+    if codec is None:
+        return open(file_path, "rb")
+    stream = None
+    if codec == "bz2" and workers != 1:
+        offsets = bz2_stream_offsets(file_path)
+        if len(offsets) > 1:
+            stream = ParallelBz2Source(file_path, offsets, workers)
+    if stream is None:
+        stream = _open_codec(str(file_path), codec, use_arrow)
+    if read_ahead:
+        return io.BufferedReader(ReadAheadStream(stream, chunk_size=chunk_size),
+                                 buffer_size=chunk_size)
+    return stream
+
+
+def open_text(file_path, encoding="utf-8"):
+    """Text stream over a (possibly compressed) file"""
+    return io.TextIOWrapper(open_decompressed(file_path), encoding=encoding)
+
+
+def _open_codec(file_path, codec, use_arrow=True):
+    if codec == "zstd" or (use_arrow and codec != "xz"):
+        try:
+            import pyarrow as pa
+            if pa.Codec.is_available(codec):
+                return pa.input_stream(file_path, compression=codec)
+        except ImportError:
+            pass
+    if codec == "gzip":
+        import gzip
+        return gzip.open(file_path, "rb")
+    if codec == "bz2":
+        import bz2
+        return bz2.open(file_path, "rb")
+    if codec == "xz":
+        import lzma
+        return lzma.open(file_path, "rb")
+    if codec == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("Reading .zst files needs pyarrow with zstd or the zstandard package")
+        return zstandard.ZstdDecompressor().stream_reader(open(file_path, "rb"), closefd=True)
+    raise ValueError(f"Unsupported compression: {codec}")
+
+
+def bz2_stream_offsets(file_path):
+    """Byte offsets of the bzip2 streams concatenated in a file
+
+    Every stream starts with "BZh<level>" followed by the block magic
+    "1AY&SY", a 10-byte signature that is practically never found inside
+    compressed data by chance.
+    """
+    import mmap
+    import re
+
+    with open(file_path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return [match.start() for match in re.finditer(rb"BZh[1-9]1AY&SY", data)]
+
+
+class ParallelBz2Source:
+    """Decompress the streams of a multi-stream bzip2 file on a thread pool
+
+    read() returns the decompressed streams in order; at most 2 * workers
+    streams are in flight, which bounds memory use.
+    """
+
+    def __init__(self, file_path, offsets, workers=None):
+        import os
+        from concurrent.futures import ThreadPoolExecutor
+
+        self._file = open(file_path, "rb")
+        size = self._file.seek(0, 2)
+        self._ranges = list(zip(offsets, offsets[1:] + [size]))
+        self._workers = workers or os.cpu_count() or 1
+        self._pool = ThreadPoolExecutor(max_workers=self._workers)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._next = 0
+
+    def _decompress(self, start, end):
+        import bz2
+
+        with self._lock:
+            self._file.seek(start)
+            data = self._file.read(end - start)
+        return bz2.decompress(data)  # releases the GIL while decompressing
+
+    def read(self, size=-1):
+        while self._next < len(self._ranges) and len(self._pending) < 2 * self._workers:
+            self._pending.append(self._pool.submit(self._decompress, *self._ranges[self._next]))
+            self._next += 1
+        if not self._pending:
+            return b""
+        return self._pending.pop(0).result()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for future in self._pending:
+            future.cancel()
+        self._pool.shutdown(wait=True)
+        self._file.close()
+
+
+class ReadAheadStream(io.RawIOBase):
+    """Raw stream that reads (and so decompresses) chunks in a background thread"""
+
+    def __init__(self, source, chunk_size=1024 * 1024, depth=4):
+        super().__init__()
+        self._source = source
+        self._chunks = queue.Queue(maxsize=depth)
+        self._current = memoryview(b"")
+        self._done = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._fill, args=(chunk_size,), daemon=True)
+        self._thread.start()
+
+    def _fill(self, chunk_size):
+        try:
+            while not self._stop.is_set():
+                chunk = self._source.read(chunk_size)
+                self._put(chunk)
+                if not chunk:
+                    return
+        except Exception as e:
+            self._put(e)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._current and not self._done:
+            chunk = self._chunks.get()
+            if isinstance(chunk, Exception):
+                raise chunk
+            if not chunk:
+                self._done = True
+            self._current = memoryview(chunk)
+        size = min(len(buffer), len(self._current))
+        buffer[:size] = self._current[:size]
+        self._current = self._current[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self._source.close()
+        super().close()
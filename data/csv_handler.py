@@ -2,6 +2,14 @@ import pandas as pd
 import uuid
 from pathlib import Path
 
+from data.compression import (detect_compression, estimate_uncompressed_size, open_decompressed,
+                              strip_compression_suffix)
+from data.datetime_inference import dataset_fingerprint, known_formats, parse_datetime_columns
+from data.dedup import create_deduplicator, dedup_batches
+from data.quality_rules import check_batches, create_quality_checker
+from data.profiling import DatasetProfiler
+from data.sampling import create_sampler, estimate_from_probe, sample_batches
+
 
 class CSVHandler:
 
@@ -13,21 +21,27 @@ class CSVHandler:
     # 1. VALIDATION METHODS (Check before you do)
     # =============================================
 
-    def validate_csv_file(self, file_path):
-        """Check if the CSV file is valid before processing"""
+    def validate_csv_file(self, file_path, descriptor=None, max_size_mb=100):
+        """Check if the CSV file is valid before processing
+
+        A descriptor from data.sniffer that recognized CSV content lets files
+        with other extensions through. max_size_mb=None lifts the size limit
+        (for plans that stream or sample big files).
+        """
         try:
             if not Path(file_path).exists():
                 return False, "File does not exist"
 
-            if not file_path.lower().endswith('.csv'):
+            sniffed_csv = descriptor is not None and descriptor["source_type"] == "csv"
+            if not (sniffed_csv or strip_compression_suffix(file_path).lower().endswith('.csv')):
                 return False, "File must be a CSV"
 
             file_size = Path(file_path).stat().st_size
             if file_size == 0:
                 return False, "File is empty"
 
-            if file_size > 100 * 1024 * 1024:  # 100MB limit
-                return False, "File too large (max 100MB)"
+            if max_size_mb is not None and file_size > max_size_mb * 1024 * 1024:
+                return False, f"File too large (max {max_size_mb}MB)"
 
             return True, "File is valid"
 
@@ -38,39 +52,282 @@ class CSVHandler:
     # 2. PROCESSING METHODS (The main work)
     # =============================================
 
-    def process_csv(self, file_path, max_rows=10000):
-        """Process the CSV file and return data + schema"""
-        try:
-            df = pd.read_csv(
-                file_path,
-                engine='pyarrow',
-                parse_dates=True
-            )
+    def process_csv(self, file_path, max_rows=10000, sample_method="reservoir",
+                    stratify_by=None, seed=None, batch_size=50000, profile=True,
+                    dialect=None, parallel=False, progress=None, dedup=None, quality=None):
+        """Process the CSV file and return data + schema
 
-            if len(df) > max_rows:
-                print(f"Large dataset detected. Using first {max_rows} rows.")
-                df = df.head(max_rows)
+        Large files are read in batches and reduced to a representative
+        sample of max_rows rows (reservoir, stratified or head). With
+        profile=True the same batches also build column statistics.
+        dialect holds sniffed parse options (sep, quotechar, header, encoding).
+        parallel=True loads the whole file with Arrow's multi-threaded
+        reader instead (no sampling). progress is called with the rows
+        read so far. dedup drops repeated records before sampling: True
+        compares whole rows, a column name or list compares those keys.
+        quality (rules, see data/quality_rules.py) is checked on every
+        batch and may abort the read early.
+        """
+        try:
+            sampler = create_sampler(
+                sample_method, max_rows, stratify_by=stratify_by, seed=seed)
+            profiler = DatasetProfiler() if profile else None
+            deduplicator = create_deduplicator(dedup)
+            checker = create_quality_checker(quality)
+            if parallel:
+                df = self.read_csv_parallel(file_path, dialect)
+                if deduplicator is not None:
+                    df = deduplicator.filter_batch(df)
+                if checker is not None:
+                    checker.check_batch(df)
+                    checker.finish()
+                if profiler is not None:
+                    profiler.update(df)
+                if progress is not None:
+                    progress(len(df))
+                sampling = {"method": "full", "rows_seen": len(df), "sample_rows": len(df)}
+            else:
+                batches = self.iter_csv_batches(file_path, batch_size, dialect)
+                if deduplicator is not None:
+                    batches = dedup_batches(batches, deduplicator)
+                if checker is not None:
+                    batches = check_batches(batches, checker)
+                df = sample_batches(batches, sampler, profiler, progress)
+                sampling = sampler.summary()
+            if sampling["rows_seen"] > max_rows:
+                print(
+                    f"Large dataset detected. Using a {sampling['method']} sample of {len(df)} rows.")
 
             schema = self._get_basic_schema(df)
+            if dialect:
+                schema["dialect"] = dict(dialect)
+            schema["datetime_formats"] = known_formats(dataset_fingerprint(file_path))
+            schema["sampling"] = sampling
+            if deduplicator is not None:
+                schema["deduplication"] = deduplicator.summary()
+                deduplicator.close()
+            if checker is not None:
+                schema["quality"] = checker.summary()
+                checker.close()
+            if profiler is not None:
+                schema["profile"] = profiler.to_dict()
             return df, schema
 
         except Exception as e:
             raise ValueError(f"Failed to process CSV file: {str(e)}")
 
+    def iter_csv_batches(self, file_path, batch_size=50000, dialect=None, parse_dates=True):
+        """Read the CSV file as a stream of DataFrame batches
+
+        Compressed files (.gz, .bz2, .zst, .xz) are decompressed on the fly.
+        Files without a header row get columns column_1, column_2, ...
+        With parse_dates, date/time columns are detected (format inferred
+        once per file) and parsed to datetime64.
+        """
+        options = dict(dialect or {})
+        fingerprint = dataset_fingerprint(file_path)
+        if detect_compression(file_path) is None:
+            source = file_path
+        else:
+            source = open_decompressed(file_path)
+        try:
+            with pd.read_csv(source, chunksize=batch_size, **options) as reader:
+                for batch in reader:
+                    if options.get("header", 0) is None:
+                        batch.columns = [f"column_{i + 1}" for i in range(len(batch.columns))]
+                    if parse_dates:
+                        batch, _ = parse_datetime_columns(batch, fingerprint)
+                    yield batch
+        finally:
+            if source is not file_path:
+                source.close()
+
+    def read_csv_filtered(self, file_path, columns=None, filters=None, dialect=None):
+        """Read only the needed columns and rows of a CSV file
+
+        Filters ([column, op, value] conditions) are evaluated by the Arrow
+        scanner while the file streams in, so rows that do not match are
+        never materialized as pandas objects. dialect is the sniffed
+        parse_options (sep, quotechar, header, encoding).
+        """
+        import pyarrow.csv as pa_csv
+        import pyarrow.dataset as ds
+
+        options = dict(dialect or {})
+        has_header = options.get("header", 0) is not None
+        read_options = pa_csv.ReadOptions(
+            encoding=options.get("encoding", "utf8"),
+            column_names=None if has_header else self.get_csv_columns(file_path, dialect))
+        parse_options = pa_csv.ParseOptions(
+            delimiter=options.get("sep", ","), quote_char=options.get("quotechar", '"'))
+        if detect_compression(file_path) is None:
+            dataset = ds.dataset(file_path, format=ds.CsvFileFormat(
+                parse_options=parse_options, read_options=read_options))
+        else:
+            with open_decompressed(file_path) as stream:
+                dataset = ds.dataset(pa_csv.read_csv(stream, read_options, parse_options))
+        filters = cast_filter_values(filters, dataset.schema)
+        expression = None
+        for column, op, value in filters or []:
+            condition = self._filter_expression(ds.field(column), op, value)
+            expression = condition if expression is None else expression & condition
+
+        try:
+            table = dataset.to_table(columns=columns, filter=expression)
+        except Exception:
+            if expression is None:
+                raise
+            # Literal type does not match the column type: filter in pandas
+            from data.query_engine import _filter_mask
+            df = dataset.to_table(columns=columns).to_pandas()
+            return df[_filter_mask(df, filters)].reset_index(drop=True)
+        return table.to_pandas()
+
+    def read_csv_parallel(self, file_path, dialect=None):
+        """Read the whole file with Arrow's CSV reader on all CPU cores"""
+        import pyarrow.csv as pa_csv
+
+        options = dict(dialect or {})
+        has_header = options.get("header", 0) is not None
+        read_options = pa_csv.ReadOptions(
+            use_threads=True, encoding=options.get("encoding", "utf8"),
+            autogenerate_column_names=not has_header)
+        parse_options = pa_csv.ParseOptions(
+            delimiter=options.get("sep", ","), quote_char=options.get("quotechar", '"'))
+        if detect_compression(file_path) is None:
+            table = pa_csv.read_csv(file_path, read_options, parse_options)
+        else:
+            with open_decompressed(file_path) as stream:
+                table = pa_csv.read_csv(stream, read_options, parse_options)
+        df = table.to_pandas()
+        if not has_header:
+            df.columns = [f"column_{i + 1}" for i in range(len(df.columns))]
+        df, _ = parse_datetime_columns(df, dataset_fingerprint(file_path))
+        return df
+
+    def read_csv_range(self, file_path, start, end, columns=None, dialect=None):
+        """Parse the complete lines between two byte offsets
+
+        Used to load only the new tail of a growing file. start=0 reads the
+        header from the file; otherwise the known column names are used.
+        """
+        import io
+
+        options = {key: value for key, value in (dialect or {}).items()
+                   if key in ("sep", "quotechar", "encoding")}
+        has_header = (dialect or {}).get("header", 0) is not None
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+        if start == 0 and has_header:
+            df = pd.read_csv(io.BytesIO(data), **options)
+        elif not data.strip():
+            return pd.DataFrame(columns=columns)
+        else:
+            df = pd.read_csv(io.BytesIO(data), header=None, names=columns, **options)
+            if columns is None:
+                df.columns = [f"column_{i + 1}" for i in range(len(df.columns))]
+        df, _ = parse_datetime_columns(df, dataset_fingerprint(file_path))
+        return df
+
+    def get_csv_columns(self, file_path, dialect=None):
+        """Read the header of a CSV file (column_1, ... when it has none)"""
+        options = {key: value for key, value in (dialect or {}).items()
+                   if key in ("sep", "quotechar", "header", "encoding")}
+        with open_decompressed(file_path) as stream:
+            if options.get("header", 0) is None:
+                width = len(pd.read_csv(stream, nrows=1, **options).columns)
+                return [f"column_{i + 1}" for i in range(width)]
+            return list(pd.read_csv(stream, nrows=0, **options).columns)
+
+    def preview(self, file_path, descriptor=None, rows=100, chunk_bytes=64 * 1024):
+        """The first rows and an estimated schema, without reading the rest
+
+        Only the leading lines are read, so the cost does not grow with
+        the file; the total row count is extrapolated from their length.
+        """
+        import io
+
+        dialect = descriptor["parse_options"] if descriptor and descriptor["source_type"] == "csv" else {}
+        options = {k: v for k, v in dialect.items() if k in ("sep", "quotechar", "header", "encoding")}
+        has_header = options.get("header", 0) is not None
+        wanted = rows + has_header
+
+        head = b""
+        with open_decompressed(file_path, read_ahead=False, workers=1) as stream:
+            while head.count(b"\n") < wanted:
+                chunk = stream.read(chunk_bytes)
+                if not chunk:
+                    break
+                head += chunk
+        end = -1
+        for _ in range(wanted):
+            end = head.find(b"\n", end + 1)
+            if end < 0:
+                break
+        if end >= 0:
+            head = head[:end + 1]
+
+        df = pd.read_csv(io.BytesIO(head), **options) if head.strip() else pd.DataFrame()
+        if not has_header:
+            df.columns = [f"column_{i + 1}" for i in range(len(df.columns))]
+        # No fingerprint: a few rows must not decide the formats of the full load
+        df, formats = parse_datetime_columns(df)
+
+        estimate = estimate_from_probe(df, len(head), 0, estimate_uncompressed_size(file_path))
+        schema = self._get_basic_schema(df)
+        schema.update(preview=True, estimated_rows=max(estimate["rows"], len(df)),
+                      datetime_formats=formats)
+        if dialect:
+            schema["dialect"] = dict(dialect)
+        return df, schema
+
     # =============================================
     # 3. UTILITY METHODS (Smaller helpers)
     # =============================================
 
     def generate_dataset_id(self, file_path):
         """Generate a unique ID for this dataset"""
-        filename = Path(file_path).stem
+        filename = Path(strip_compression_suffix(file_path)).stem
         short_uuid = str(uuid.uuid4())[:8]
         return f"csv_{filename}_{short_uuid}"
 
+    def estimate_ingestion(self, file_path, descriptor=None, probe_bytes=1024 * 1024):
+        """Estimate rows, memory and read time by parsing the first probe_bytes
+
+        The probe goes through the same parsing, date inference and
+        profiling as a real load, so the measured rate includes them.
+        """
+        import io
+        import time
+
+        dialect = descriptor["parse_options"] if descriptor and descriptor["source_type"] == "csv" else {}
+        content_bytes = estimate_uncompressed_size(file_path)
+        with open_decompressed(file_path, read_ahead=False, workers=1) as stream:
+            head = stream.read(probe_bytes)
+        if len(head) >= probe_bytes:
+            head = head[:head.rfind(b"\n") + 1]  # complete lines only
+
+        start = time.perf_counter()
+        options = {k: v for k, v in dialect.items() if k in ("sep", "quotechar", "header", "encoding")}
+        probe = pd.read_csv(io.BytesIO(head), **options) if head.strip() else pd.DataFrame()
+        probe, _ = parse_datetime_columns(probe)
+        DatasetProfiler().update(probe)
+        seconds = time.perf_counter() - start
+
+        estimate = estimate_from_probe(probe, len(head), seconds, content_bytes)
+        estimate.update(bytes_on_disk=Path(file_path).stat().st_size,
+                        compression=detect_compression(file_path), by="probe")
+        return estimate
+
     # =============================================
     # 4. HELPER METHODS (Supporting functions)
     # =============================================
 
+    def _filter_expression(self, field, op, value):
+        """Arrow expression for one [column, op, value] condition"""
+        return arrow_filter_expression(field, op, value)
+
     def _get_basic_schema(self, df):
         """Extract basic information about the data structure"""
         schema = {
@@ -84,3 +341,57 @@ class CSVHandler:
             schema["data_types"][col] = str(df[col].dtype)
 
         return schema
+
+
+def cast_filter_values(filters, schema):
+    """Filters with string literals on date/time columns parsed to that type
+
+    Arrow has no kernel comparing date32 or timestamp with a string, and
+    pandas cannot compare datetime.date with one either. Literals that do
+    not parse are left as they are.
+    """
+    import pyarrow as pa
+
+    def cast(value, arrow_type):
+        if not isinstance(value, str):
+            return value
+        try:
+            return pa.scalar(value).cast(arrow_type).as_py()
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            return value
+
+    cast_filters = []
+    for column, op, value in filters or []:
+        if column in schema.names and pa.types.is_temporal(schema.field(column).type):
+            arrow_type = schema.field(column).type
+            if isinstance(value, (list, tuple)):
+                value = type(value)(cast(v, arrow_type) for v in value)
+            else:
+                value = cast(value, arrow_type)
+        cast_filters.append([column, op, value])
+    return cast_filters
+
+
+def arrow_filter_expression(field, op, value):
+    """Arrow expression for one [column, op, value] condition"""
+    if op == "=":
+        return field == value
+    if op == "!=":
+        return field != value
+    if op == "<":
+        return field < value
+    if op == "<=":
+        return field <= value
+    if op == ">":
+        return field > value
+    if op == ">=":
+        return field >= value
+    if op == "in":
+        return field.isin(list(value))
+    if op == "between":
+        return (field >= value[0]) & (field <= value[1])
+    if op == "is_null":
+        return field.is_null()
+    if op == "not_null":
+        return field.is_valid()
+    raise ValueError(f"Unsupported filter operator: {op}")
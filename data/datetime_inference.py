@@ -0,0 +1,182 @@
+"""
+Datetime inference: find date/time columns and their exact format.
+
+CSV cells, SQLite TEXT columns and JSON strings all reach pandas as text.
+Parsing them value by value (dateutil, or to_datetime(format="mixed"))
+costs tens of microseconds per cell. Here each text column is checked
+once, on a small sample: candidate formats are guessed from a few values
+(pandas' guess_datetime_format, both month-first and day-first) and the
+first format that parses the whole sample wins. The column is then
+converted with to_datetime(format=...), a vectorized fixed-format parser.
+
+Inferred formats (and "not a date" verdicts) are cached per dataset
+fingerprint, so the batches of one file, the tables of one database and
+re-ingestions of the same feed are only sampled once.
+"""
+
+import re
+import warnings
+from collections import OrderedDict
+
+import pandas as pd
+
+
+SAMPLE_SIZE = 200
+MAX_INVALID = 0.01  # share of values allowed to fail before a column stays text
+CACHE_SIZE = 256
+
+# Something date-like: digits next to a separator, or a month name
+_DATE_LIKE = re.compile(
+    r"\d[-/.:T ]\d|\d{8}|(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)", re.IGNORECASE)
+_HAS_YEAR = ("%Y", "%y")
+_HAS_DAY = ("%d", "%j")
+
+_format_cache = OrderedDict()  # fingerprint -> {column: format or None}
+
+
+# =============================================
+# 1. INFERENCE
+# =============================================
+
+def infer_datetime_format(values, sample_size=SAMPLE_SIZE, max_invalid=MAX_INVALID):
+    """strftime format that parses the sampled values, or None
+
+    values is a Series (or list) of strings; nulls are ignored. Up to
+    max_invalid of the sample may be junk ("N/A", "unknown", ...).
+    """
+    sample = _sample(values, sample_size, max_invalid)
+    if sample is None:
+        return None
+    for fmt in _candidate_formats(sample):
+        parsed = _parse(sample, fmt)
+        if parsed is not None and parsed.isna().sum() <= max_invalid * len(sample):
+            return fmt
+    return None
+
+
+def infer_datetime_columns(df, fingerprint=None, sample_size=SAMPLE_SIZE,
+                           max_invalid=MAX_INVALID):
+    """{column: format} for the text columns of df that hold datetimes
+
+    With a fingerprint, formats (and columns found not to be dates) are
+    remembered and reused for later batches of the same dataset.
+    """
+    cached = _format_cache.get(fingerprint, {}) if fingerprint is not None else {}
+    formats = {}
+    for col in df.columns:
+        if not _is_text(df[col]):
+            continue
+        if col not in cached:
+            cached[col] = infer_datetime_format(df[col], sample_size, max_invalid)
+        if cached[col] is not None:
+            formats[col] = cached[col]
+    if fingerprint is not None:
+        _format_cache[fingerprint] = cached
+        _format_cache.move_to_end(fingerprint)
+        while len(_format_cache) > CACHE_SIZE:
+            _format_cache.popitem(last=False)
+    return formats
+
+
+def known_formats(fingerprint):
+    """{column: format} already inferred for a dataset"""
+    return {col: fmt for col, fmt in _format_cache.get(fingerprint, {}).items() if fmt}
+
+
+def clear_format_cache():
+    _format_cache.clear()
+
+
+# =============================================
+# 2. PARSING
+# =============================================
+
+def parse_datetime_columns(df, fingerprint=None, max_invalid=MAX_INVALID):
+    """Convert the datetime text columns of df to datetime64 columns
+
+    Returns (df, formats) where formats maps the converted columns to
+    their format. A column where more than max_invalid of the values do
+    not match the inferred format is left as text (and the format is
+    inferred again next time).
+    """
+    formats = infer_datetime_columns(df, fingerprint, max_invalid=max_invalid)
+    if not formats:
+        return df, {}
+    converted, applied = {}, {}
+    for col, fmt in formats.items():
+        parsed = _parse(df[col], fmt)
+        if parsed is None:
+            continue
+        invalid = int(parsed.isna().sum() - df[col].isna().sum())
+        if invalid > max_invalid * max(int(df[col].notna().sum()), 1):
+            if fingerprint in _format_cache:
+                _format_cache[fingerprint].pop(col, None)
+            continue
+        converted[col] = parsed
+        applied[col] = fmt
+    if converted:
+        df = df.copy()  # lazy under copy-on-write; the caller's frame is not modified
+        for col, series in converted.items():
+            df[col] = series
+    return df, applied
+
+
+def dataset_fingerprint(source, *parts):
+    """Cache key for the formats of one dataset (e.g. a file name + table)"""
+    from data.compression import strip_compression_suffix
+
+    return "|".join([strip_compression_suffix(source)] + [str(part) for part in parts])
+
+
+# =============================================
+# HELPER METHODS (Supporting functions)
+# =============================================
+
+def _is_text(series):
+    return series.dtype == object or isinstance(series.dtype, pd.StringDtype)
+
+
+def _sample(values, sample_size, max_invalid):
+    """Up to sample_size distinct date-like strings, or None if too few are"""
+    values = pd.Series(values).dropna()
+    if values.empty:
+        return None
+    sample = values.head(sample_size * 5).drop_duplicates().head(sample_size)
+    if not all(isinstance(v, str) for v in sample):
+        return None
+    sample = sample.str.strip()
+    date_like = sample.map(lambda v: 6 <= len(v) <= 40 and bool(_DATE_LIKE.search(v))).astype(bool)
+    if (~date_like).sum() > max_invalid * len(sample):
+        return None
+    return sample[date_like]
+
+
+def _candidate_formats(sample):
+    from pandas.tseries.api import guess_datetime_format
+
+    candidates = []
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for value in sample.head(5):
+            for dayfirst in (False, True):
+                fmt = guess_datetime_format(value, dayfirst=dayfirst)
+                if fmt and fmt not in candidates and _is_date_format(fmt):
+                    candidates.append(fmt)
+    return candidates
+
+
+def _is_date_format(fmt):
+    """A usable date format names a year and a day (not just "%H:%M" or "%m.%d")"""
+    return any(code in fmt for code in _HAS_YEAR) and any(code in fmt for code in _HAS_DAY)
+
+
+def _parse(values, fmt):
+    """Vectorized parse with a fixed format; None if the format is unusable"""
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            # Mixed UTC offsets cannot share one column unless converted to UTC
+            return pd.to_datetime(pd.Series(values).str.strip(), format=fmt, errors="coerce",
+                                  utc="%z" in fmt)
+    except (ValueError, TypeError):
+        return None
@@ -0,0 +1,287 @@
+"""
+Duplicate record removal for streamed batches.
+
+JSON dumps and concatenated CSV partitions often repeat records, which
+inflates memory and double-counts in every aggregate. A Deduplicator sees
+the batches of one source in order and drops every row (or every row whose
+key columns) it has seen before:
+
+- Rows are hashed column by column with pandas' vectorized
+  hash_pandas_object and combined into one 64-bit value per row. Values
+  are normalized first, so 1 and 1.0 hash the same in every batch,
+  whatever dtype pandas inferred for that batch. Columns are combined in
+  sorted name order and missing values are skipped, so a field that is
+  absent from a batch (optional JSON fields) counts as null and the
+  column order of a batch does not matter
+- Seen hashes are kept as sorted numpy runs (merged like a log-structured
+  tree), so a batch is checked with searchsorted instead of a Python set
+- Memory is bounded: past max_memory_keys hashes the runs are written to
+  disk and memory-mapped, and a Bloom filter over the spilled hashes skips
+  the disk lookup for almost every new row
+
+Some two of n different rows share a 64-bit hash with probability
+~n^2 / 2^65 (about 1 in 370,000 for 10 million rows, 1 in 37 for 1
+billion), so an exact comparison is not made.
+"""
+
+import json
+import shutil
+import tempfile
+import zlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+MEMORY_KEYS = 4_000_000  # hashes kept in RAM (8 bytes each) before spilling to disk
+BLOOM_BITS_PER_KEY = 10  # ~1% false positives at the expected number of keys
+BLOOM_HASHES = 4
+_GOLDEN = 0x9E3779B97F4A7C15
+_FLOAT_TAG = np.uint64(0x5BD1E9955BD1E995)  # keeps fractional floats apart from integers
+_COMBINE = np.uint64(1000003)
+
+
+# =============================================
+# 1. DEDUPLICATOR (Hash rows, remember what was seen)
+# =============================================
+
+class Deduplicator:
+
+    def __init__(self, columns=None, max_memory_keys=MEMORY_KEYS, spill_dir=None,
+                 expected_keys=None):
+        """
+        columns:          key columns (a name or a list); None compares whole rows
+        max_memory_keys:  hashes kept in memory; older ones are spilled to disk
+        spill_dir:        where spilled runs go (default: a new temp directory)
+        expected_keys:    distinct rows expected, to size the Bloom filter
+                          (default: 8 x max_memory_keys)
+        """
+        if isinstance(columns, str):
+            columns = [columns]
+        self.columns = list(columns) if columns else None
+        self.max_memory_keys = max_memory_keys
+        self.expected_keys = expected_keys or 8 * max_memory_keys
+        self._spill_root = spill_dir
+        self._spill_dir = None
+        self._runs = []  # sorted uint64 arrays in memory, largest first
+        self._spilled = []  # memory-mapped sorted runs on disk
+        self._bloom = None
+        self.rows_seen = 0
+        self.duplicates = 0
+        self._columns_seen = set()
+
+    def hash_rows(self, df):
+        """One uint64 per row of df (over the key columns)
+
+        The hash does not depend on how the source was split into batches:
+        columns are taken in sorted order, and a key column missing from
+        the batch is the same as a null value.
+        """
+        self._columns_seen.update(df.columns)
+        columns = sorted(self.columns if self.columns is not None else df.columns, key=str)
+        combined = np.zeros(len(df), dtype=np.uint64)
+        for col in columns:
+            if col not in df.columns:
+                continue  # all null
+            series = df[col]
+            present = series.notna().to_numpy()
+            if not present.any():
+                continue
+            hashes = pd.util.hash_pandas_object(_normalized(series), index=False).to_numpy()
+            hashes = hashes ^ _column_salt(col)
+            # wraps around, like the hash itself
+            combined = np.where(present, combined * _COMBINE ^ hashes, combined)
+        return combined
+
+    def new_rows(self, df):
+        """Boolean mask of the rows not seen before (in this batch or earlier); records them"""
+        hashes = self.hash_rows(df)
+        mask = ~pd.Series(hashes).duplicated().to_numpy()  # first copy within the batch
+        candidates = np.flatnonzero(mask)
+        seen = self._contains(hashes[candidates])
+        mask[candidates[seen]] = False
+        self._add(np.sort(hashes[mask]))  # unique: duplicates were just masked out
+        self.rows_seen += len(df)
+        self.duplicates += int(len(df) - mask.sum())
+        return mask
+
+    def filter_batch(self, df):
+        """df without the rows seen before"""
+        mask = self.new_rows(df)
+        return df if mask.all() else df[mask]
+
+    def summary(self):
+        return {
+            "method": "key" if self.columns else "exact",
+            "columns": self.columns,
+            "columns_not_found": [col for col in self.columns or [] if col not in self._columns_seen],
+            "rows_seen": self.rows_seen,
+            "duplicates": self.duplicates,
+            "unique_rows": self.rows_seen - self.duplicates,
+            "keys_in_memory": sum(len(run) for run in self._runs),
+            "keys_spilled": sum(len(run) for run in self._spilled),
+        }
+
+    def close(self):
+        """Remove the spilled runs"""
+        self._spilled = []
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ----- seen hashes -----
+
+    def _contains(self, hashes):
+        # Sorted lookups walk each run in order, which is much kinder to the cache
+        order = np.argsort(hashes)
+        found = np.empty(len(hashes), dtype=bool)
+        found[order] = self._contains_sorted(hashes[order])
+        return found
+
+    def _contains_sorted(self, hashes):
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self._runs:
+            found |= _in_sorted(run, hashes)
+        if self._spilled and not found.all():
+            # Only Bloom-positive hashes can be on disk
+            maybe = np.flatnonzero(~found)
+            maybe = maybe[self._bloom.might_contain(hashes[maybe])]
+            for run in self._spilled:
+                found[maybe] |= _in_sorted(run, hashes[maybe])
+        return found
+
+    def _add(self, hashes):
+        if not len(hashes):
+            return
+        self._runs.append(hashes)
+        # Merge runs of similar size: each hash is merged O(log n) times
+        while len(self._runs) > 1 and len(self._runs[-2]) <= 2 * len(self._runs[-1]):
+            newest = self._runs.pop()
+            self._runs[-1] = _merge(self._runs[-1], newest)
+        if sum(len(run) for run in self._runs) > self.max_memory_keys:
+            self._spill()
+
+    def _spill(self):
+        run = self._runs[0]
+        for other in self._runs[1:]:
+            run = _merge(run, other)
+        self._runs = []
+        if self._spill_dir is None:
+            self._spill_dir = Path(tempfile.mkdtemp(prefix="dedup_", dir=self._spill_root))
+        if self._bloom is None:
+            self._bloom = BloomFilter(self.expected_keys * BLOOM_BITS_PER_KEY)
+        path = self._spill_dir / f"run_{len(self._spilled)}.npy"
+        np.save(path, run)
+        self._spilled.append(np.load(path, mmap_mode="r"))
+        self._bloom.add(run)
+
+
+class BloomFilter:
+    """Bit array answering "maybe seen" / "certainly not seen" for uint64 hashes"""
+
+    def __init__(self, bits, hashes=BLOOM_HASHES):
+        self.bits = max(int(bits), 64)
+        self.hashes = hashes
+        self._array = np.zeros((self.bits + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, values):
+        # Double hashing from the two 32-bit halves of each (already random) hash
+        values = np.asarray(values, dtype=np.uint64)
+        low = values & np.uint64(0xFFFFFFFF)
+        high = (values >> np.uint64(32)) | np.uint64(1)
+        for i in range(self.hashes):
+            yield (low + np.uint64(i) * high) % np.uint64(self.bits)
+
+    def add(self, values):
+        for positions in self._positions(values):
+            np.bitwise_or.at(self._array, positions >> np.uint64(3),
+                             (1 << (positions & np.uint64(7))).astype(np.uint8))
+
+    def might_contain(self, values):
+        result = np.ones(len(values), dtype=bool)
+        for positions in self._positions(values):
+            byte = self._array[positions >> np.uint64(3)]
+            result &= ((byte >> (positions & np.uint64(7)).astype(np.uint8)) & 1).astype(bool)
+        return result
+
+
+# =============================================
+# 2. HANDLER SUPPORT (Used by the ingestion handlers)
+# =============================================
+
+def create_deduplicator(dedup):
+    """Deduplicator from a handler's dedup option, or None
+
+    dedup may be None/False (off), True (whole rows), a column name or a
+    list of key columns, or a ready Deduplicator.
+    """
+    if dedup is None or dedup is False:
+        return None
+    if isinstance(dedup, Deduplicator):
+        return dedup
+    return Deduplicator(None if dedup is True else dedup)
+
+
+def dedup_batches(batches, deduplicator):
+    """Drop the rows of a stream of batches that were seen before"""
+    for batch in batches:
+        yield deduplicator.filter_batch(batch)
+
+
+# =============================================
+# HELPER METHODS (Supporting functions)
+# =============================================
+
+def _column_salt(col):
+    """Stable per-column uint64, so equal values in different columns differ"""
+    return np.uint64(zlib.crc32(str(col).encode("utf-8")) * _GOLDEN & 0xFFFFFFFFFFFFFFFF)
+
+
+def _numeric_keys(series):
+    """uint64 per number: the int64 value for whole numbers (1 == 1.0 == True),
+    tagged float64 bits for the rest, so large ids keep their precision"""
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        return series.to_numpy(dtype="int64", na_value=0).view(np.uint64)
+    values = series.to_numpy(dtype="float64", na_value=np.nan)
+    whole = np.isfinite(values) & (np.floor(values) == values) & (np.abs(values) < 2.0 ** 63)
+    keys = values.view(np.uint64) ^ _FLOAT_TAG
+    keys[whole] = values[whole].astype(np.int64).view(np.uint64)
+    return keys
+
+
+def _merge(a, b):
+    """Merge two sorted runs without common values (timsort merges them in linear time)"""
+    return np.sort(np.concatenate([a, b]), kind="stable")
+
+
+def _in_sorted(run, values):
+    """Vectorized membership of values in a sorted array"""
+    if not len(run) or not len(values):
+        return np.zeros(len(values), dtype=bool)
+    positions = np.searchsorted(run, values)
+    positions[positions == len(run)] = 0
+    return np.asarray(run[positions] == values)
+
+
+def _normalized(series):
+    """Same value -> same hash, whatever dtype a batch was read with
+
+    Depends only on the dtype and each value itself, never on the other
+    values of the batch. Missing values are left to the caller.
+    """
+    if pd.api.types.is_bool_dtype(series) or (pd.api.types.is_numeric_dtype(series)
+                                              and not pd.api.types.is_complex_dtype(series)):
+        return pd.Series(_numeric_keys(series), index=series.index)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    if series.dtype == object and series.map(lambda v: isinstance(v, (dict, list))).any():
+        series = series.map(lambda v: json.dumps(v, sort_keys=True, default=str)
+                            if isinstance(v, (dict, list)) else v)
+    return series.astype("str")
@@ -0,0 +1,142 @@
+"""
+Change detection for files that are re-ingested over and over.
+
+For every file we remember how far it has been parsed (a byte offset that
+always ends on a complete line), its size and mtime, a checksum of the
+first bytes and a checksum of the bytes just before the offset. On the
+next check a file is:
+
+- "new":       never seen before
+- "unchanged": same size and mtime, or nothing past the parsed offset
+- "appended":  both checksums still match, so only the bytes after the
+               offset are new and can be parsed on their own
+- "rewritten": shorter than the parsed offset or a checksum differs
+               (truncated, replaced or edited in place) - reload fully
+
+The records are kept in a small JSON file so detection survives restarts.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+
+CHANGE_STATUSES = ("new", "unchanged", "appended", "rewritten")
+
+
+class FileTracker:
+
+    def __init__(self, state_path="data/file_tracker.json", head_bytes=64 * 1024,
+                 boundary_bytes=4096):
+        self.state_path = Path(state_path) if state_path else None
+        self.head_bytes = head_bytes
+        self.boundary_bytes = boundary_bytes
+        self._records = {}
+        self._lock = threading.Lock()
+        if self.state_path is not None and self.state_path.exists():
+            try:
+                self._records = json.loads(self.state_path.read_text())
+            except (OSError, ValueError):
+                self._records = {}  # corrupt state only costs one full reload
+
+    def check(self, file_path):
+        """Return (status, record) for a file; record is None for new files"""
+        key = self._key(file_path)
+        with self._lock:
+            record = self._records.get(key)
+        if record is None:
+            return "new", None
+
+        stat = os.stat(file_path)
+        if stat.st_size == record["size"] and stat.st_mtime_ns == record["mtime_ns"]:
+            return "unchanged", record
+        if stat.st_size < record["offset"]:
+            return "rewritten", record
+
+        with open(file_path, "rb") as f:
+            head, boundary = self._checksums(f, record["offset"])
+        if head != record["head_checksum"] or boundary != record["boundary_checksum"]:
+            return "rewritten", record
+        if stat.st_size == record["offset"]:
+            return "unchanged", record
+        return "appended", record
+
+    def update(self, file_path, offset, **extra):
+        """Remember that file_path has been parsed up to byte offset
+
+        Extra keyword arguments (dataset_id, source_type, ...) are stored in
+        the record and returned by later checks.
+        """
+        stat = os.stat(file_path)
+        with open(file_path, "rb") as f:
+            head, boundary = self._checksums(f, offset)
+        key = self._key(file_path)
+        with self._lock:
+            record = dict(self._records.get(key, {}), **extra)
+            record.update({
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "offset": offset,
+                "head_checksum": head,
+                "boundary_checksum": boundary,
+            })
+            self._records[key] = record
+            self._save()
+        return record
+
+    def forget(self, file_path):
+        with self._lock:
+            self._records.pop(self._key(file_path), None)
+            self._save()
+
+    def record(self, file_path):
+        with self._lock:
+            return self._records.get(self._key(file_path))
+
+    # ----- helpers -----
+
+    def _key(self, file_path):
+        return str(Path(file_path).resolve())
+
+    def _checksums(self, f, offset):
+        """Checksums of the first bytes and of the bytes just before offset"""
+        head = _checksum(f.read(min(offset, self.head_bytes)))
+        start = max(0, offset - self.boundary_bytes)
+        f.seek(start)
+        boundary = _checksum(f.read(offset - start))
+        return head, boundary
+
+    def _save(self):
+        if self.state_path is None:
+            return
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+        tmp.write_text(json.dumps(self._records))
+        os.replace(tmp, self.state_path)
+
+
+def complete_lines_end(file_path, start=0):
+    """Byte offset just after the last newline at or after start
+
+    Anything after it is a partially written line and is left for the next
+    run. Returns start if there is no complete line yet.
+    """
+    with open(file_path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        chunk_size = 64 * 1024
+        while position > start:
+            read_from = max(start, position - chunk_size)
+            f.seek(read_from)
+            chunk = f.read(position - read_from)
+            newline = chunk.rfind(b"\n")
+            if newline >= 0:
+                return read_from + newline + 1
+            position = read_from
+    return start
+
+
+def _checksum(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
@@ -0,0 +1,319 @@
+"""
+Secondary indexes for fast point and range lookups on ingested datasets.
+
+- HashIndex:   point lookups (customer_id = 42, product_id IN (...))
+- SortedIndex: range lookups (date BETWEEN ... AND ...) and point lookups
+
+Both return row positions (sorted, so results keep the dataset order).
+Appends go into a small delta that is searched alongside the main index
+and folded in once it grows, so incremental loads never trigger a full
+rebuild per batch. Indexes are saved as plain .npy files next to the
+dataset and loaded back memory-mapped.
+"""
+
+import json
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+INDEX_KINDS = ("hash", "sorted")
+
+
+# =============================================
+# 1. INDEX TYPES
+# =============================================
+
+class HashIndex:
+    """Value -> row positions, backed by a pandas hash table"""
+
+    kind = "hash"
+
+    def __init__(self, values=None):
+        self.keys = pd.Index([])
+        self.order = np.empty(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.size = 0
+        self._delta_values = []
+        self._delta_positions = []
+        if values is not None:
+            self.build(values)
+
+    def build(self, values, start=0):
+        """Index a whole column (numpy array or Series)"""
+        codes, uniques = pd.factorize(_as_array(values), use_na_sentinel=True)
+        valid = codes >= 0
+        positions = np.flatnonzero(valid).astype(np.int64) + start
+        codes = codes[valid]
+        # Group row positions by key: positions of key i are order[offsets[i]:offsets[i+1]]
+        sort = np.argsort(codes, kind="stable")
+        self.order = positions[sort]
+        counts = np.bincount(codes, minlength=len(uniques))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.keys = pd.Index(uniques)
+        self.size = start + len(valid)
+        self._delta_values, self._delta_positions = [], []
+        return self
+
+    def lookup(self, value):
+        """Row positions where the column equals value"""
+        return self.lookup_many([value])
+
+    def lookup_many(self, values):
+        """Row positions where the column is any of values"""
+        values = [_naive_utc(value) for value in values]
+        locs = self.keys.get_indexer(values)
+        parts = [self.order[self.offsets[loc]:self.offsets[loc + 1]] for loc in locs if loc >= 0]
+        parts.extend(_delta_matches(self._delta_values, self._delta_positions,
+                                    lambda v: np.isin(v, list(values))))
+        return _merge_positions(parts)
+
+    def append(self, values, start):
+        """Index rows appended at positions start, start+1, ..."""
+        values = _as_array(values)
+        self._delta_values.append(values)
+        self._delta_positions.append(np.arange(start, start + len(values), dtype=np.int64))
+        self.size = start + len(values)
+
+    def delta_rows(self):
+        return sum(len(v) for v in self._delta_values)
+
+    def arrays(self):
+        return {"keys": np.asarray(self.keys, dtype=object if self.keys.dtype == object else None),
+                "order": self.order, "offsets": self.offsets}
+
+    @classmethod
+    def from_arrays(cls, arrays, size):
+        index = cls()
+        index.keys = pd.Index(arrays["keys"])
+        index.order = arrays["order"]
+        index.offsets = arrays["offsets"]
+        index.size = size
+        return index
+
+
+class SortedIndex:
+    """Sorted copy of the column with the row position of every value"""
+
+    kind = "sorted"
+
+    def __init__(self, values=None):
+        self.sorted_values = np.empty(0)
+        self.order = np.empty(0, dtype=np.int64)
+        self.size = 0
+        self._delta_values = []
+        self._delta_positions = []
+        if values is not None:
+            self.build(values)
+
+    def build(self, values, start=0):
+        values = _as_array(values)
+        valid = ~pd.isna(values)
+        positions = np.flatnonzero(valid).astype(np.int64) + start
+        values = values[valid]
+        sort = np.argsort(values, kind="stable")
+        self.sorted_values = values[sort]
+        self.order = positions[sort]
+        self.size = start + len(valid)
+        self._delta_values, self._delta_positions = [], []
+        return self
+
+    def lookup(self, value):
+        return self.range(value, value)
+
+    def lookup_many(self, values):
+        return _merge_positions([self.range(value, value) for value in values])
+
+    def range(self, low=None, high=None, include_low=True, include_high=True):
+        """Row positions with low <= value <= high (None = unbounded)"""
+        low, high = _search_key(low, self.sorted_values), _search_key(high, self.sorted_values)
+        start = 0 if low is None else np.searchsorted(
+            self.sorted_values, low, side="left" if include_low else "right")
+        stop = len(self.sorted_values) if high is None else np.searchsorted(
+            self.sorted_values, high, side="right" if include_high else "left")
+        parts = [self.order[start:stop]]
+
+        def in_range(values):
+            mask = np.ones(len(values), dtype=bool)
+            if low is not None:
+                mask &= (values >= low) if include_low else (values > low)
+            if high is not None:
+                mask &= (values <= high) if include_high else (values < high)
+            return mask
+
+        parts.extend(_delta_matches(self._delta_values, self._delta_positions, in_range))
+        return _merge_positions(parts)
+
+    def append(self, values, start):
+        values = _as_array(values)
+        valid = ~pd.isna(values)
+        self._delta_values.append(values[valid])
+        self._delta_positions.append(
+            np.arange(start, start + len(values), dtype=np.int64)[valid])
+        self.size = start + len(values)
+
+    def delta_rows(self):
+        return sum(len(v) for v in self._delta_values)
+
+    def arrays(self):
+        return {"sorted_values": self.sorted_values, "order": self.order}
+
+    @classmethod
+    def from_arrays(cls, arrays, size):
+        index = cls()
+        index.sorted_values = arrays["sorted_values"]
+        index.order = arrays["order"]
+        index.size = size
+        return index
+
+
+# =============================================
+# 2. INDEX MANAGER (Per-dataset indexes on disk)
+# =============================================
+
+class IndexManager:
+    """Build, maintain, persist and query the indexes of many datasets"""
+
+    def __init__(self, index_dir="data/indexes", merge_fraction=0.1):
+        self.index_dir = Path(index_dir)
+        self.merge_fraction = merge_fraction
+        self._indexes = {}  # (dataset_id, column) -> index
+
+    def create(self, dataset_id, df, column, kind="hash"):
+        """Build an index on one column and save it next to the dataset"""
+        if kind not in INDEX_KINDS:
+            raise ValueError(f"Unknown index kind '{kind}'. Use one of {INDEX_KINDS}")
+        if column not in df.columns:
+            raise KeyError(f"Column not found: {column}")
+        index = (HashIndex if kind == "hash" else SortedIndex)(df[column])
+        self._indexes[(dataset_id, column)] = index
+        self._save(dataset_id, column, index)
+        return index
+
+    def get(self, dataset_id, column):
+        """Return the index on a column (loading it from disk if needed) or None"""
+        key = (dataset_id, column)
+        if key not in self._indexes:
+            index = self._load(dataset_id, column)
+            if index is None:
+                return None
+            self._indexes[key] = index
+        return self._indexes[key]
+
+    def columns(self, dataset_id):
+        """Indexed columns of a dataset: {column: kind}"""
+        found = {column: index.kind for (ds, column), index in self._indexes.items()
+                 if ds == dataset_id}
+        folder = self.index_dir / dataset_id
+        if folder.exists():
+            for meta in folder.glob("*/meta.json"):
+                info = json.loads(meta.read_text())
+                found.setdefault(info["column"], info["kind"])
+        return found
+
+    def on_append(self, dataset_id, new_rows, start, full_df=None):
+        """Keep every index of a dataset current after rows were appended"""
+        for column in self.columns(dataset_id):
+            index = self.get(dataset_id, column)
+            if column not in new_rows.columns:
+                continue
+            index.append(new_rows[column], start)
+            if full_df is not None and index.delta_rows() > self.merge_fraction * max(index.size, 1):
+                # Fold the delta in with one rebuild (amortized over many appends)
+                index.build(full_df[column])
+                self._save(dataset_id, column, index)
+
+    def flush(self, dataset_id, df):
+        """Fold pending appends into the saved indexes of a dataset"""
+        for (ds, column), index in list(self._indexes.items()):
+            if ds == dataset_id and index.delta_rows():
+                index.build(df[column])
+                self._save(dataset_id, column, index)
+
+    def release(self, dataset_id):
+        """Drop in-memory copies (they stay on disk)"""
+        for key in [key for key in self._indexes if key[0] == dataset_id]:
+            index = self._indexes[key]
+            if index.delta_rows():
+                continue  # unsaved appends must stay in memory
+            del self._indexes[key]
+
+    def drop(self, dataset_id):
+        """Forget all indexes of a dataset, on disk too"""
+        for key in [key for key in self._indexes if key[0] == dataset_id]:
+            del self._indexes[key]
+        shutil.rmtree(self.index_dir / dataset_id, ignore_errors=True)
+
+    # ----- persistence -----
+
+    def _folder(self, dataset_id, column):
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(column))
+        return self.index_dir / dataset_id / safe
+
+    def _save(self, dataset_id, column, index):
+        folder = self._folder(dataset_id, column)
+        folder.mkdir(parents=True, exist_ok=True)
+        for name, array in index.arrays().items():
+            np.save(folder / f"{name}.npy", array, allow_pickle=array.dtype == object)
+        (folder / "meta.json").write_text(json.dumps(
+            {"column": str(column), "kind": index.kind, "size": index.size}))
+
+    def _load(self, dataset_id, column):
+        folder = self._folder(dataset_id, column)
+        meta_path = folder / "meta.json"
+        if not meta_path.exists():
+            return None
+        meta = json.loads(meta_path.read_text())
+        arrays = {}
+        for path in folder.glob("*.npy"):
+            try:
+                arrays[path.stem] = np.load(path, mmap_mode="r")
+            except ValueError:
+                arrays[path.stem] = np.load(path, allow_pickle=True)  # object arrays
+        cls = HashIndex if meta["kind"] == "hash" else SortedIndex
+        return cls.from_arrays(arrays, meta["size"])
+
+
+# =============================================
+# 3. HELPER METHODS (Supporting functions)
+# =============================================
+
+def _as_array(values):
+    if isinstance(values, pd.Series):
+        if isinstance(values.dtype, pd.DatetimeTZDtype):
+            return values.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy()
+        if values.dtype.kind in "biufcmM":
+            return values.to_numpy()
+        return values.to_numpy(dtype=object)
+    return np.asarray(values)
+
+
+def _search_key(value, sorted_values):
+    """Convert a lookup value to something comparable with the index values"""
+    if value is None:
+        return None
+    if sorted_values.dtype.kind == "M":
+        return np.datetime64(_naive_utc(pd.Timestamp(value)), "ns").astype(sorted_values.dtype)
+    return value
+
+
+def _naive_utc(value):
+    """A tz-aware timestamp as naive UTC, the way _as_array stores indexed values"""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return pd.Timestamp(value).tz_convert("UTC").tz_localize(None)
+    return value
+
+
+def _delta_matches(delta_values, delta_positions, predicate):
+    return [positions[predicate(values)]
+            for values, positions in zip(delta_values, delta_positions) if len(values)]
+
+
+def _merge_positions(parts):
+    parts = [np.asarray(part) for part in parts if len(part)]
+    if not parts:
+        return np.empty(0, dtype=np.int64)
+    return np.sort(np.concatenate(parts)) if len(parts) > 1 else np.sort(parts[0])
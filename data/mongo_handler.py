@@ -1,6 +1,21 @@
 import pandas as pd
 import uuid
+from datetime import date, datetime
 from pathlib import Path
+from urllib.parse import urlsplit
+
+from data.compression import (estimate_uncompressed_size, open_decompressed, open_text,
+                              strip_compression_suffix)
+from data.datetime_inference import dataset_fingerprint, known_formats, parse_datetime_columns
+from data.dedup import create_deduplicator, dedup_batches
+from data.sniffer import MONGO_SCHEMES
+from data.profiling import DatasetProfiler
+from data.quality_rules import check_batches, create_quality_checker
+from data.sampling import create_sampler, estimate_from_probe, sample_batches
+
+
+_SCALAR_TYPES = (str, int, float, bool, dict, list, date, datetime)
+_DONE = object()  # end of one parallel reader's batches
 
 
 class MongoHandler:
@@ -13,13 +28,19 @@ class MongoHandler:
     # 1. VALIDATION METHODS (Check before you do)
     # =============================================
 
-    def validate_json_file(self, file_path):
-        """Check if the JSON file is valid before processing"""
+    def validate_json_file(self, file_path, descriptor=None):
+        """Check if the JSON file is valid before processing
+
+        A descriptor from data.sniffer that recognized JSON content lets files
+        with other extensions through and says whether it is JSON Lines.
+        """
         try:
             if not Path(file_path).exists():
                 return False, "JSON file does not exist"
 
-            if not file_path.lower().endswith(('.json', '.jsonl')):
+            sniffed_json = descriptor is not None and descriptor["source_type"] == "json"
+            inner_path = strip_compression_suffix(file_path).lower()
+            if not (sniffed_json or inner_path.endswith(('.json', '.jsonl'))):
                 return False, "File must be a JSON file"
 
             file_size = Path(file_path).stat().st_size
@@ -28,7 +49,14 @@ class MongoHandler:
 
             # Test JSON parsing
             import json
-            with open(file_path, 'r') as f:
+            if self._is_json_lines(file_path, descriptor):
+                with open_text(file_path) as f:
+                    first_line = next((line for line in f if line.strip()), "")
+                if not isinstance(json.loads(first_line), dict):
+                    return False, "JSON Lines file must contain one object per line"
+                return True, "Valid JSON Lines file"
+
+            with open_text(file_path) as f:
                 data = json.load(f)
 
             if isinstance(data, (dict, list)):
@@ -40,68 +68,375 @@ class MongoHandler:
         except Exception as e:
             return False, f"JSON validation error: {str(e)}"
 
+    def validate_collection(self, source, client=None, collection=None):
+        """Check that a MongoDB URI names a reachable database.collection
+
+        source is a URI like "mongodb://localhost:27017/shop.orders";
+        client, if given, is used instead of connecting (e.g. mongomock)
+        and is left open.
+        """
+        own_client = None
+        try:
+            client_uri, database, collection = self.parse_source(source, collection)
+            if client is None:
+                client = own_client = self._connect(client_uri)
+            if collection not in client[database].list_collection_names():
+                return False, f"Collection {database}.{collection} does not exist"
+            return True, f"Valid MongoDB collection {database}.{collection}"
+        except Exception as e:
+            return False, f"MongoDB validation error: {str(e)}"
+        finally:
+            if own_client is not None:
+                own_client.close()
+
     # =============================================
     # 2. PROCESSING METHODS (The main work)
     # =============================================
 
-    def process_json_file(self, file_path):
-        """Process JSON file and convert to DataFrame"""
+    def process_json_file(self, file_path, max_docs=1000, sample_method="reservoir",
+                          stratify_by=None, seed=None, batch_size=10000, profile=True,
+                          descriptor=None, progress=None, dedup=None, quality=None):
+        """Process JSON file and convert to DataFrame
+
+        Documents are streamed in batches and reduced to a representative
+        sample of max_docs documents. With profile=True the same batches
+        also build field statistics. progress is called with the number
+        of documents read so far. dedup drops repeated documents (True) or
+        documents with repeated key fields (a name or list) before sampling.
+        quality rules (see data/quality_rules.py) are checked on every batch.
+        """
         try:
-            import json
+            # Step 1: Stream documents into the sampler (and profiler)
+            sampler = create_sampler(
+                sample_method, max_docs, stratify_by=stratify_by, seed=seed)
+            profiler = DatasetProfiler() if profile else None
+            deduplicator = create_deduplicator(dedup)
+            checker = create_quality_checker(quality)
+            batches = self.iter_json_batches(file_path, batch_size, descriptor)
+            if deduplicator is not None:
+                batches = dedup_batches(batches, deduplicator)
+            if checker is not None:
+                batches = check_batches(batches, checker)
+            df = sample_batches(batches, sampler, profiler, progress)
 
-            # Step 1: Read JSON file
-            with open(file_path, 'r') as f:
-                data = json.load(f)
+            sampling = sampler.summary()
+            if sampling["rows_seen"] > max_docs:
+                print(
+                    f"📋 Large JSON file detected, using a {sampling['method']} sample of {max_docs} documents")
+
+            print(f"📋 Processing {len(df)} documents from JSON file")
+
+            # Step 2: Convert complex nested objects to strings for simplicity
+            df = self._stringify_nested(df)
+
+            schema = self._get_basic_schema(df, file_path, max_docs)
+            schema["datetime_formats"] = known_formats(dataset_fingerprint(file_path))
+            schema["sampling"] = sampling
+            if deduplicator is not None:
+                schema["deduplication"] = deduplicator.summary()
+                deduplicator.close()
+            if checker is not None:
+                schema["quality"] = checker.summary()
+                checker.close()
+            if profiler is not None:
+                schema["profile"] = profiler.to_dict()
+
+            print(
+                f"✅ JSON processed: {len(df)} documents, {len(df.columns)} fields")
+            return df, schema
+
+        except Exception as e:
+            raise ValueError(f"Failed to process JSON file: {str(e)}")
 
-            # Step 2: Make sure data is a list of documents
-            if isinstance(data, dict):
-                data = [data]
-            elif not isinstance(data, list):
-                raise ValueError("JSON file must contain an object or array")
+    def iter_json_batches(self, file_path, batch_size=10000, descriptor=None):
+        """Read documents as a stream of DataFrame batches
 
-            # Step 3: Limit to max 1000 documents for simplicity
-            if len(data) > 1000:
-                data = data[:1000]
-                print(f"📋 Large JSON file detected, using first 1000 documents")
+        JSON Lines files are read line by line; regular JSON files must hold
+        an object or an array of documents. Compressed files are
+        decompressed on the fly. A sniffed descriptor decides which format
+        the content is in, whatever the extension. Timestamp strings are
+        parsed to datetime64 (format inferred once per file).
+        """
+        for batch in self._iter_documents(file_path, batch_size, descriptor):
+            batch, _ = parse_datetime_columns(batch, dataset_fingerprint(file_path))
+            yield batch
 
-            print(f"📋 Processing {len(data)} documents from JSON file")
+    def _iter_documents(self, file_path, batch_size, descriptor):
+        import json
 
-            # Step 4: Convert to DataFrame
-            df = pd.DataFrame(data)
+        if self._is_json_lines(file_path, descriptor):
+            docs = []
+            with open_text(file_path) as f:
+                for line in f:
+                    if line.strip():
+                        docs.append(json.loads(line))
+                    if len(docs) >= batch_size:
+                        yield pd.DataFrame(docs)
+                        docs = []
+            if docs:
+                yield pd.DataFrame(docs)
+            return
 
-            # Step 5: Convert complex nested objects to strings for simplicity
-            for col in df.columns:
-                if df[col].dtype == 'object':
-                    # Check if column contains dictionaries or lists
-                    sample_value = df[col].dropna(
-                    ).iloc[0] if not df[col].dropna().empty else None
-                    if isinstance(sample_value, (dict, list)):
-                        df[col] = df[col].astype(str)
+        with open_text(file_path) as f:
+            data = json.load(f)
 
-            schema = self._get_basic_schema(df, file_path)
+        # Make sure data is a list of documents
+        if isinstance(data, dict):
+            data = [data]
+        elif not isinstance(data, list):
+            raise ValueError("JSON file must contain an object or array")
+
+        for start in range(0, len(data), batch_size):
+            yield pd.DataFrame(data[start:start + batch_size])
+
+    def process_collection(self, source, client=None, collection=None, max_docs=1000,
+                           sample_method="reservoir", stratify_by=None, seed=None,
+                           batch_size=10000, projection=None, query=None, parallel=1,
+                           profile=True, progress=None, dedup=None, quality=None):
+        """Read a MongoDB collection and convert it to a DataFrame
+
+        The work is pushed to the server where possible: query filters the
+        documents and projection (a list of fields or a projection dict)
+        drops fields before they are sent. The cursor fetches batch_size
+        documents per round-trip and every batch becomes one DataFrame, so
+        the same sampling, profiling and dedup as for JSON files apply.
+        parallel > 1 splits the collection into _id ranges read by that
+        many threads (batches then arrive in no particular order).
+        dedup and quality work as in process_json_file. A client passed in
+        is left open; one connected here is closed.
+        """
+        own_client = None
+        try:
+            client_uri, database, collection = self.parse_source(source, collection)
+            if client is None:
+                client = own_client = self._connect(client_uri)
+            coll = client[database][collection]
+
+            # Step 1: Stream cursor batches into the sampler (and profiler)
+            sampler = create_sampler(
+                sample_method, max_docs, stratify_by=stratify_by, seed=seed)
+            profiler = DatasetProfiler() if profile else None
+            deduplicator = create_deduplicator(dedup)
+            checker = create_quality_checker(quality)
+            fingerprint = dataset_fingerprint(f"mongodb:{database}.{collection}")
+            batches = self.iter_collection_batches(coll, batch_size, projection, query,
+                                                   parallel, fingerprint)
+            if deduplicator is not None:
+                batches = dedup_batches(batches, deduplicator)
+            if checker is not None:
+                batches = check_batches(batches, checker)
+            df = sample_batches(batches, sampler, profiler, progress)
+
+            sampling = sampler.summary()
+            if sampling["rows_seen"] > max_docs:
+                print(
+                    f"📋 Large collection detected, using a {sampling['method']} sample of {max_docs} documents")
+
+            # Step 2: Schema, as for JSON files
+            schema = self._get_basic_schema(df, f"{database}.{collection}", max_docs)
+            schema.update(source_file=self._redacted(source, database, collection),
+                          database=database, collection=collection,
+                          query=query, projection=projection)
+            schema["datetime_formats"] = known_formats(fingerprint)
+            schema["sampling"] = sampling
+            if deduplicator is not None:
+                schema["deduplication"] = deduplicator.summary()
+                deduplicator.close()
+            if checker is not None:
+                schema["quality"] = checker.summary()
+                checker.close()
+            if profiler is not None:
+                schema["profile"] = profiler.to_dict()
 
             print(
-                f"✅ JSON processed: {len(df)} documents, {len(df.columns)} fields")
+                f"✅ Collection processed: {len(df)} documents, {len(df.columns)} fields")
             return df, schema
 
         except Exception as e:
-            raise ValueError(f"Failed to process JSON file: {str(e)}")
+            raise ValueError(f"Failed to process MongoDB collection: {str(e)}")
+        finally:
+            if own_client is not None:
+                own_client.close()
+
+    def iter_collection_batches(self, collection, batch_size=10000, projection=None,
+                                query=None, parallel=1, fingerprint=None):
+        """Read a collection as a stream of DataFrame batches
+
+        One batch per batch_size documents of the cursor. With parallel > 1
+        the _id range is split into parallel parts, each read by a thread.
+        """
+        if isinstance(projection, (list, tuple)):
+            projection = {field: 1 for field in projection}
+        ranges = self._id_ranges(collection, query, parallel) if parallel > 1 else [(None, None)]
+        if len(ranges) == 1:
+            batches = self._read_range(collection, query, projection, batch_size, ranges[0])
+        else:
+            batches = self._read_ranges_parallel(collection, query, projection, batch_size, ranges)
+        for batch in batches:
+            batch, _ = parse_datetime_columns(batch, fingerprint)
+            yield batch
+
+    def read_jsonl_range(self, file_path, start, end):
+        """Parse the JSON Lines documents between two byte offsets"""
+        import json
+
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+        docs = [json.loads(line) for line in data.splitlines() if line.strip()]
+        df, _ = parse_datetime_columns(pd.DataFrame(docs), dataset_fingerprint(file_path))
+        return self._stringify_nested(df)
+
+    def preview(self, file_path, descriptor=None, rows=100, chunk_bytes=64 * 1024):
+        """The first documents and an estimated schema, without reading the rest
+
+        JSON Lines are read line by line; for an array the leading
+        documents are decoded from the first chunks. The document count
+        is extrapolated from their size.
+        """
+        import json
+
+        docs, used = [], 0
+        if self._is_json_lines(file_path, descriptor):
+            with open_text(file_path) as f:
+                for line in f:
+                    used += len(line.encode("utf-8"))
+                    if line.strip():
+                        docs.append(json.loads(line))
+                    if len(docs) >= rows:
+                        break
+        else:
+            head = b""
+            with open_decompressed(file_path, read_ahead=False, workers=1) as stream:
+                while len(docs) < rows:
+                    chunk = stream.read(chunk_bytes)
+                    if not chunk:
+                        break
+                    head += chunk
+                    text = head.decode("utf-8", errors="ignore")
+                    docs, used = self._leading_documents(text)
+                    used = len(text[:used].encode("utf-8"))
+        decoded, docs = len(docs), docs[:rows]  # used covers every decoded document
+
+        df = self._stringify_nested(pd.DataFrame(docs))
+        df, formats = parse_datetime_columns(df)
+        estimated_rows = int(estimate_uncompressed_size(file_path) * decoded / max(used, 1))
+        schema = self._get_basic_schema(df, file_path)
+        schema.update(preview=True, estimated_rows=max(estimated_rows, len(df)),
+                      datetime_formats=formats)
+        return df, schema
 
     # =============================================
     # 3. UTILITY METHODS (Smaller helpers)
     # =============================================
 
-    def generate_dataset_id(self, file_path):
-        """Generate a unique ID for this dataset"""
-        filename = Path(file_path).stem
+    def generate_dataset_id(self, file_path, collection=None):
+        """Generate a unique ID for this dataset
+
+        collection names the MongoDB collection when the URI does not.
+        """
         short_uuid = str(uuid.uuid4())[:8]
+        if str(file_path).startswith(MONGO_SCHEMES):
+            _, database, collection = self.parse_source(file_path, collection)
+            return f"mongodb_{database}_{collection}_{short_uuid}"
+        filename = Path(strip_compression_suffix(file_path)).stem
         return f"json_{filename}_{short_uuid}"
 
+    def parse_source(self, source, collection=None):
+        """Split "mongodb://host/database.collection?options" into
+        (client URI, database, collection)
+
+        Database names cannot contain dots, so the first dot separates the
+        collection (which may). collection overrides the one in the URI.
+        """
+        parts = urlsplit(source)
+        if not source.startswith(MONGO_SCHEMES):
+            raise ValueError(f"Not a MongoDB URI: {source}")
+        namespace = parts.path.lstrip("/")
+        database, _, uri_collection = namespace.partition(".")
+        collection = collection or uri_collection
+        if not database or not collection:
+            raise ValueError("MongoDB URI must name the database and collection "
+                             "(mongodb://host/database.collection)")
+        client_uri = parts._replace(path=f"/{database}").geturl()
+        return client_uri, database, collection
+
+    def estimate_ingestion(self, file_path, descriptor=None, probe_bytes=1024 * 1024):
+        """Estimate documents, memory and read time from the first probe_bytes
+
+        JSON Lines are parsed line by line; for a JSON array the leading
+        documents are decoded one at a time, so a partial array works too.
+        """
+        import json
+        import time
+
+        content_bytes = estimate_uncompressed_size(file_path)
+        with open_decompressed(file_path, read_ahead=False, workers=1) as stream:
+            head = stream.read(probe_bytes)
+        text = head.decode("utf-8", errors="ignore")
+
+        start = time.perf_counter()
+        if self._is_json_lines(file_path, descriptor):
+            lines = text.splitlines()
+            if len(head) >= probe_bytes:
+                lines = lines[:-1]  # the last line may be cut off
+            docs = [json.loads(line) for line in lines if line.strip()]
+            used = sum(len(line) + 1 for line in lines)
+        else:
+            docs, used = self._leading_documents(text)
+        probe = self._stringify_nested(pd.DataFrame(docs))
+        probe, _ = parse_datetime_columns(probe)
+        DatasetProfiler().update(probe)
+        seconds = time.perf_counter() - start
+
+        estimate = estimate_from_probe(probe, max(used, 1), seconds, content_bytes)
+        estimate.update(bytes_on_disk=Path(file_path).stat().st_size, by="probe")
+        return estimate
+
     # =============================================
     # 4. HELPER METHODS (Supporting functions)
     # =============================================
 
-    def _get_basic_schema(self, df, file_path):
+    def _is_json_lines(self, file_path, descriptor=None):
+        """JSON Lines by sniffed content if known, else by extension"""
+        if descriptor is not None and descriptor["source_type"] == "json":
+            return descriptor["parse_options"]["lines"]
+        return strip_compression_suffix(file_path).lower().endswith('.jsonl')
+
+    def _leading_documents(self, text):
+        """Decode the complete documents at the start of a JSON array (or one object)"""
+        import json
+
+        decoder = json.JSONDecoder()
+        position = len(text) - len(text.lstrip())
+        if text[position:position + 1] != "[":
+            try:
+                doc, end = decoder.raw_decode(text, position)
+                return [doc], end
+            except ValueError:
+                return [], 0
+        docs, position = [], position + 1
+        while True:
+            while position < len(text) and text[position] in " \t\r\n,":
+                position += 1
+            try:
+                doc, position = decoder.raw_decode(text, position)
+            except ValueError:
+                return docs, position
+            docs.append(doc)
+
+    def _stringify_nested(self, df):
+        """Store nested objects and arrays as strings"""
+        for col in df.columns:
+            if df[col].dtype == 'object':
+                # Check if column contains dictionaries or lists
+                sample_value = df[col].dropna(
+                ).iloc[0] if not df[col].dropna().empty else None
+                if isinstance(sample_value, (dict, list)):
+                    df[col] = df[col].astype(str)
+        return df
+
+    def _get_basic_schema(self, df, file_path, max_docs=1000):
         """Extract basic information about the JSON data"""
         schema = {
             "columns": list(df.columns),
@@ -109,10 +444,129 @@ class MongoHandler:
             "total_columns": len(df.columns),
             "data_types": {},
             "source_file": Path(file_path).name,
-            "note": "JSON data processed as documents, max 1000 rows"
+            "note": f"JSON data processed as documents, max {max_docs} sampled rows"
         }
 
         for col in df.columns:
             schema["data_types"][col] = str(df[col].dtype)
 
         return schema
+
+    def _connect(self, client_uri):
+        try:
+            import pymongo
+        except ImportError:
+            raise ValueError("Reading MongoDB collections needs the pymongo package")
+        return pymongo.MongoClient(client_uri, serverSelectionTimeoutMS=5000)
+
+    def _redacted(self, source, database, collection):
+        """The source URI without credentials or options (safe to store)"""
+        parts = urlsplit(source)
+        host = parts.netloc.rpartition("@")[2]
+        return f"{parts.scheme}://{host}/{database}.{collection}"
+
+    def _read_range(self, collection, query, projection, batch_size, id_range):
+        """DataFrames of batch_size documents from one _id range"""
+        cursor = collection.find(self._range_query(query, id_range), projection,
+                                 batch_size=batch_size)
+        docs = []
+        for doc in cursor:
+            docs.append(doc)
+            if len(docs) >= batch_size:
+                yield self._documents_to_frame(docs)
+                docs = []
+        if docs:
+            yield self._documents_to_frame(docs)
+
+    def _read_ranges_parallel(self, collection, query, projection, batch_size, ranges):
+        """Batches of every range, read by one thread per range"""
+        import queue
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+
+        batches = queue.Queue(maxsize=2 * len(ranges))
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def read(id_range):
+            try:
+                for batch in self._read_range(collection, query, projection, batch_size, id_range):
+                    put(batch)
+                    if stop.is_set():
+                        return
+            except Exception as e:
+                put(e)
+            finally:
+                put(_DONE)
+
+        with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+            for id_range in ranges:
+                pool.submit(read, id_range)
+            try:
+                done = 0
+                while done < len(ranges):
+                    item = batches.get()
+                    if item is _DONE:
+                        done += 1
+                    elif isinstance(item, Exception):
+                        raise item
+                    else:
+                        yield item
+            finally:
+                stop.set()  # readers still running give up instead of blocking
+
+    def _id_ranges(self, collection, query, parts):
+        """Split the matching documents into parts (low, high) _id ranges of similar size
+
+        Split points are found by skipping along the _id index. Range
+        queries only match _ids of the bound's type, so collections with
+        mixed _id types are read as a single range.
+        """
+        query = query or {}
+        count = collection.count_documents(query)
+        if count < 2 * parts:
+            return [(None, None)]
+        if type(self._id_at(collection, query, 0)) is not type(self._id_at(collection, query, 0, -1)):
+            return [(None, None)]
+        bounds = [self._id_at(collection, query, count * i // parts) for i in range(1, parts)]
+        bounds = [None] + bounds + [None]
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def _id_at(self, collection, query, position, direction=1):
+        """The _id at a position of the matching documents in _id order"""
+        cursor = collection.find(query, {"_id": 1}).sort("_id", direction).skip(position).limit(1)
+        return next(iter(cursor))["_id"]
+
+    def _range_query(self, query, id_range):
+        low, high = id_range
+        condition = {}
+        if low is not None:
+            condition["$gte"] = low
+        if high is not None:
+            condition["$lt"] = high
+        if not condition:
+            return query or {}
+        if not query:
+            return {"_id": condition}
+        return {"$and": [query, {"_id": condition}]}
+
+    def _documents_to_frame(self, docs):
+        """One DataFrame from a batch of documents
+
+        BSON-only values (ObjectId, Decimal128, ...) become strings and
+        nested documents and arrays are stored as strings, as for JSON files.
+        """
+        df = pd.DataFrame(docs)
+        for col in df.columns:
+            if df[col].dtype == 'object':
+                values = df[col].dropna()
+                if not values.empty and not isinstance(values.iloc[0], _SCALAR_TYPES):
+                    df[col] = df[col].map(str).where(df[col].notna())
+        return self._stringify_nested(df)
@@ -0,0 +1,353 @@
+import uuid
+from pathlib import Path
+
+import pandas as pd
+
+from data.dedup import create_deduplicator, dedup_batches
+from data.quality_rules import check_batches, create_quality_checker
+from data.profiling import DatasetProfiler
+from data.sampling import create_sampler, estimate_from_probe, sample_batches
+
+
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+ARROW_EXTENSIONS = ('.feather', '.arrow', '.ipc')
+
+
+class ParquetHandler:
+    """Parquet and Arrow IPC (Feather v2) files
+
+    Both formats are columnar, so only the requested columns are read.
+    Parquet row groups whose min/max statistics cannot match the filters
+    are skipped without being read. Files are memory-mapped.
+    """
+
+    def __init__(self, data_dir="data"):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(exist_ok=True)
+
+    # =============================================
+    # 1. VALIDATION METHODS (Check before you do)
+    # =============================================
+
+    def validate_parquet_file(self, file_path, descriptor=None, max_size_mb=1024):
+        """Check if the Parquet / Arrow file is valid before processing
+
+        max_size_mb=None lifts the size limit.
+        """
+        try:
+            if not Path(file_path).exists():
+                return False, "File does not exist"
+
+            sniffed = descriptor is not None and descriptor["source_type"] in ("parquet", "arrow")
+            if not (sniffed or file_path.lower().endswith(PARQUET_EXTENSIONS + ARROW_EXTENSIONS)):
+                return False, "File must be a Parquet or Arrow/Feather file"
+
+            file_size = Path(file_path).stat().st_size
+            if file_size == 0:
+                return False, "File is empty"
+
+            # 1GB by default (columnar files are compact)
+            if max_size_mb is not None and file_size > max_size_mb * 1024 * 1024:
+                return False, f"File too large (max {max_size_mb}MB)"
+
+            with open(file_path, 'rb') as f:
+                magic = f.read(6)
+            if self.file_format(file_path) == "parquet" and magic[:4] != b"PAR1":
+                return False, "Not a Parquet file (bad magic bytes)"
+            if self.file_format(file_path) == "arrow" and magic != b"ARROW1":
+                return False, "Not an Arrow IPC / Feather v2 file (bad magic bytes)"
+
+            return True, "File is valid"
+
+        except Exception as e:
+            return False, f"Validation error: {str(e)}"
+
+    # =============================================
+    # 2. PROCESSING METHODS (The main work)
+    # =============================================
+
+    def process_parquet_file(self, file_path, max_rows=10000, sample_method="reservoir",
+                             stratify_by=None, seed=None, columns=None, filters=None,
+                             batch_size=65536, profile=True, progress=None, dedup=None,
+                             quality=None):
+        """Process a Parquet / Arrow file and return data + schema
+
+        columns and filters ([column, op, value] conditions) are applied
+        while reading; the rest works like CSVHandler.process_csv (batches
+        reduced to a max_rows sample, profiled on the way, progress
+        called with the rows read so far, repeated records dropped with
+        dedup, quality rules checked on every batch).
+        """
+        try:
+            sampler = create_sampler(
+                sample_method, max_rows, stratify_by=stratify_by, seed=seed)
+            profiler = DatasetProfiler() if profile else None
+            pruning = {}
+            deduplicator = create_deduplicator(dedup)
+            checker = create_quality_checker(quality)
+            batches = self.iter_batches(file_path, columns, filters, batch_size, pruning)
+            if deduplicator is not None:
+                batches = dedup_batches(batches, deduplicator)
+            if checker is not None:
+                batches = check_batches(batches, checker)
+            df = sample_batches(batches, sampler, profiler, progress)
+
+            sampling = sampler.summary()
+            if sampling["rows_seen"] > max_rows:
+                print(
+                    f"Large dataset detected. Using a {sampling['method']} sample of {len(df)} rows.")
+
+            schema = self._get_basic_schema(df, file_path)
+            schema["sampling"] = sampling
+            schema["pruning"] = pruning
+            if deduplicator is not None:
+                schema["deduplication"] = deduplicator.summary()
+                deduplicator.close()
+            if checker is not None:
+                schema["quality"] = checker.summary()
+                checker.close()
+            if profiler is not None:
+                schema["profile"] = profiler.to_dict()
+            return df, schema
+
+        except Exception as e:
+            raise ValueError(f"Failed to process Parquet/Arrow file: {str(e)}")
+
+    def iter_batches(self, file_path, columns=None, filters=None, batch_size=65536,
+                     pruning=None):
+        """Read the file as a stream of DataFrame batches
+
+        If a dict is passed as pruning it is filled with how many row groups
+        there were and how many had to be read.
+        """
+        import pyarrow as pa
+
+        expression = self._expression(filters)
+        read_columns = self._read_columns(columns, filters)
+        pruning = {} if pruning is None else pruning
+
+        if self.file_format(file_path) == "arrow":
+            source = pa.memory_map(file_path)
+            reader = pa.ipc.open_file(source)
+            pruning.update(format="arrow", row_groups_total=reader.num_record_batches,
+                           row_groups_read=reader.num_record_batches)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                if read_columns is not None:
+                    batch = batch.select(read_columns)
+                yield self._to_pandas(pa.Table.from_batches([batch]), filters, expression, columns)
+            return
+
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(file_path, memory_map=True)
+        row_groups = self.prune_row_groups(parquet_file.metadata, filters)
+        pruning.update(format="parquet", row_groups_total=parquet_file.metadata.num_row_groups,
+                       row_groups_read=len(row_groups))
+        if not row_groups:
+            return
+        for batch in parquet_file.iter_batches(batch_size=batch_size, row_groups=row_groups,
+                                               columns=read_columns):
+            yield self._to_pandas(pa.Table.from_batches([batch]), filters, expression, columns)
+
+    def read_parquet_filtered(self, file_path, columns=None, filters=None):
+        """Read only the needed columns and rows (used by the query engine)"""
+        parts = list(self.iter_batches(file_path, columns, filters))
+        if not parts:
+            return pd.DataFrame(columns=columns or self.get_columns(file_path))
+        return pd.concat(parts, ignore_index=True)
+
+    def preview(self, file_path, descriptor=None, rows=100):
+        """The first rows and the schema; the row count comes from the footer
+
+        Only the first record batch / row group is touched.
+        """
+        import pyarrow as pa
+
+        if self.file_format(file_path) == "arrow":
+            reader = pa.ipc.open_file(pa.memory_map(file_path))
+            total = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+            head = reader.get_batch(0).slice(0, rows) if reader.num_record_batches else None
+            table = pa.Table.from_batches([head]) if head is not None else reader.schema.empty_table()
+        else:
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(file_path, memory_map=True)
+            total = parquet_file.metadata.num_rows
+            head = next(parquet_file.iter_batches(batch_size=rows), None)
+            table = pa.Table.from_batches([head]) if head is not None else \
+                parquet_file.schema_arrow.empty_table()
+        df = table.to_pandas()
+        schema = self._get_basic_schema(df, file_path)
+        schema.update(preview=True, estimated_rows=total)
+        return df, schema
+
+    def get_columns(self, file_path):
+        """Column names from the file footer (no data is read)"""
+        import pyarrow as pa
+
+        if self.file_format(file_path) == "arrow":
+            return list(pa.ipc.open_file(pa.memory_map(file_path)).schema.names)
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(file_path).names)
+
+    def prune_row_groups(self, metadata, filters):
+        """Indexes of the row groups whose statistics might match all filters"""
+        positions = {metadata.schema.column(i).path: i for i in range(metadata.num_columns)}
+        keep = []
+        for rg in range(metadata.num_row_groups):
+            row_group = metadata.row_group(rg)
+            if all(self._may_match(row_group, positions.get(str(column)), op, value)
+                   for column, op, value in filters or []):
+                keep.append(rg)
+        return keep
+
+    # =============================================
+    # 3. UTILITY METHODS (Smaller helpers)
+    # =============================================
+
+    def file_format(self, file_path):
+        """"parquet" or "arrow", from the magic bytes (or the extension)"""
+        try:
+            with open(file_path, 'rb') as f:
+                magic = f.read(6)
+            if magic == b"ARROW1":
+                return "arrow"
+            if magic[:4] == b"PAR1":
+                return "parquet"
+        except OSError:
+            pass
+        return "arrow" if file_path.lower().endswith(ARROW_EXTENSIONS) else "parquet"
+
+    def generate_dataset_id(self, file_path):
+        """Generate a unique ID for this dataset"""
+        filename = Path(file_path).stem
+        short_uuid = str(uuid.uuid4())[:8]
+        return f"{self.file_format(file_path)}_{filename}_{short_uuid}"
+
+    def estimate_ingestion(self, file_path, descriptor=None):
+        """Estimate memory and read time; row counts come from the file footer
+
+        The first record batch / row group is read and profiled to measure
+        the width of a row and the read rate.
+        """
+        import time
+        import pyarrow as pa
+
+        if self.file_format(file_path) == "arrow":
+            reader = pa.ipc.open_file(pa.memory_map(file_path))
+            rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+            content_bytes = Path(file_path).stat().st_size
+        else:
+            import pyarrow.parquet as pq
+            metadata = pq.ParquetFile(file_path).metadata
+            rows = metadata.num_rows
+            content_bytes = sum(metadata.row_group(i).total_byte_size
+                                for i in range(metadata.num_row_groups))
+
+        start = time.perf_counter()
+        probe = next(self.iter_batches(file_path), pd.DataFrame())
+        DatasetProfiler().update(probe)
+        seconds = time.perf_counter() - start
+
+        estimate = estimate_from_probe(probe, 1, seconds, content_bytes, rows=rows)
+        estimate.update(bytes_on_disk=Path(file_path).stat().st_size, by="metadata")
+        return estimate
+
+    # =============================================
+    # 4. HELPER METHODS (Supporting functions)
+    # =============================================
+
+    def _may_match(self, row_group, position, op, value):
+        """False only if the statistics prove no row in the group matches"""
+        if position is None:
+            return True
+        column = row_group.column(position)
+        stats = column.statistics
+        if stats is None:
+            return True
+        if op == "is_null":
+            return stats.null_count is None or stats.null_count > 0
+        if op == "not_null":
+            return stats.null_count is None or stats.null_count < row_group.num_rows
+        if not stats.has_min_max:
+            return True
+
+        low, high = stats.min, stats.max
+        try:
+            if op == "=":
+                return low <= _like(low, value) <= high
+            if op == "!=":
+                return not (low == high == _like(low, value))
+            if op == "<":
+                return low < _like(low, value)
+            if op == "<=":
+                return low <= _like(low, value)
+            if op == ">":
+                return high > _like(high, value)
+            if op == ">=":
+                return high >= _like(high, value)
+            if op == "in":
+                return any(low <= _like(low, v) <= high for v in value)
+            if op == "between":
+                return high >= _like(high, value[0]) and low <= _like(low, value[1])
+        except (TypeError, ValueError):
+            pass  # statistics and literal are not comparable: read the group
+        return True
+
+    def _expression(self, filters):
+        import pyarrow.dataset as ds
+        from data.csv_handler import arrow_filter_expression
+
+        expression = None
+        for column, op, value in filters or []:
+            condition = arrow_filter_expression(ds.field(column), op, value)
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def _read_columns(self, columns, filters):
+        if columns is None:
+            return None
+        extra = [column for column, _, _ in filters or [] if column not in columns]
+        return list(columns) + list(dict.fromkeys(extra))
+
+    def _to_pandas(self, table, filters, expression, columns):
+        if expression is not None:
+            try:
+                table = table.filter(expression)
+            except Exception:
+                # Literal type does not match the column type: filter in pandas
+                from data.query_engine import _filter_mask
+                df = table.to_pandas()
+                df = df[_filter_mask(df, filters)]
+                return df[columns].reset_index(drop=True) if columns is not None else df
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas()
+
+    def _get_basic_schema(self, df, file_path):
+        """Extract basic information about the data structure"""
+        schema = {
+            "columns": list(df.columns),
+            "total_rows": len(df),
+            "total_columns": len(df.columns),
+            "data_types": {},
+            "source_file": Path(file_path).name
+        }
+
+        for col in df.columns:
+            schema["data_types"][col] = str(df[col].dtype)
+
+        return schema
+
+
+def _like(reference, value):
+    """Convert a filter literal to the Python type of a statistics value"""
+    import datetime
+
+    if isinstance(reference, datetime.datetime) and not isinstance(value, datetime.datetime):
+        value = pd.Timestamp(value).to_pydatetime()
+        if reference.tzinfo is None and value.tzinfo is not None:
+            value = value.replace(tzinfo=None)
+    elif isinstance(reference, datetime.date) and not isinstance(value, datetime.date):
+        value = pd.Timestamp(value).date()
+    return value
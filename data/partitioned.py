@@ -0,0 +1,207 @@
+"""
+One logical dataset made of many partition files (daily exports of the
+same feed, for example).
+
+Every partition is stored once, as it was ingested, and never rewritten.
+The dataset keeps a unified schema that evolves as partitions arrive:
+
+- added columns:      a column missing from earlier partitions is added
+- widened types:      int + float -> float, int + bool -> int, anything
+                      incompatible -> object
+- nullable promotion: a column missing from some partition (or holding
+                      nulls) becomes nullable; ints/bools then materialize
+                      as pandas' nullable Int64/boolean
+
+Each change of the unified schema is recorded as a new schema version in
+a JSON manifest. Materializing conforms each partition to the final schema
+and concatenates them once, so the cost is linear in the total size no
+matter how many partitions there are.
+"""
+
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from shared.workspace import _read_spill, _write_spill
+
+
+class PartitionedDataset:
+
+    def __init__(self, name, root="data/partitions"):
+        self.name = name
+        self.folder = Path(root) / name
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.folder / "manifest.json"
+        if self.manifest_path.exists():
+            self.manifest = json.loads(self.manifest_path.read_text())
+        else:
+            self.manifest = {"name": name, "columns": {}, "nullable": {},
+                             "schema_versions": [], "partitions": []}
+
+    # ----- appending -----
+
+    def add_partition(self, df, source=None):
+        """Store df as a new partition and evolve the unified schema
+
+        Returns the list of schema changes it caused (empty if none).
+        """
+        df = df.reset_index(drop=True)
+        df.columns = [str(c) for c in df.columns]
+        number = len(self.manifest["partitions"]) + 1
+        path = _write_spill(df, self.folder / f"part-{number:05d}")
+
+        changes = self._evolve_schema(df, number)
+        self.manifest["partitions"].append({
+            "file": path.name,
+            "rows": len(df),
+            "source": str(source) if source is not None else None,
+            "schema_version": self.version,
+            "data_types": {col: str(df[col].dtype) for col in df.columns},
+        })
+        self._save()
+        return changes
+
+    def _evolve_schema(self, df, number):
+        columns = self.manifest["columns"]
+        nullable = self.manifest["nullable"]
+        first = not self.manifest["partitions"]
+        changes = []
+
+        for col in df.columns:
+            dtype = str(df[col].dtype)
+            has_nulls = bool(df[col].isna().any())
+            if col not in columns:
+                columns[col] = dtype
+                nullable[col] = has_nulls or not first
+                if not first:
+                    changes.append(f"added column {col} ({dtype})")
+                continue
+            wider = widen_dtype(columns[col], dtype)
+            if wider != columns[col]:
+                changes.append(f"widened {col}: {columns[col]} -> {wider}")
+                columns[col] = wider
+            if has_nulls and not nullable[col]:
+                nullable[col] = True
+                changes.append(f"{col} became nullable")
+
+        for col in columns:
+            if col not in df.columns and not nullable[col]:
+                nullable[col] = True
+                changes.append(f"{col} became nullable (missing in partition {number})")
+
+        if first or changes:
+            self.manifest["schema_versions"].append({
+                "version": len(self.manifest["schema_versions"]) + 1,
+                "since_partition": number,
+                "columns": dict(columns),
+                "nullable": dict(nullable),
+                "changes": changes,
+            })
+        return changes
+
+    # ----- reading -----
+
+    @property
+    def version(self):
+        return len(self.manifest["schema_versions"])
+
+    def __len__(self):
+        return sum(p["rows"] for p in self.manifest["partitions"])
+
+    def dtypes(self):
+        """Unified {column: dtype} used when materializing"""
+        return {col: materialized_dtype(dtype, self.manifest["nullable"][col])
+                for col, dtype in self.manifest["columns"].items()}
+
+    def iter_partitions(self, columns=None):
+        """Yield every partition conformed to the unified schema"""
+        dtypes = self.dtypes()
+        if columns is not None:
+            dtypes = {col: dtypes[col] for col in columns}
+        for partition in self.manifest["partitions"]:
+            df = _read_spill(self.folder / partition["file"])
+            yield conform(df, dtypes)
+
+    def to_dataframe(self, columns=None):
+        """All partitions as one DataFrame (a single concat)"""
+        parts = list(self.iter_partitions(columns))
+        if not parts:
+            return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in self.dtypes().items()})
+        return pd.concat(parts, ignore_index=True)
+
+    def schema(self):
+        """Schema in the same shape as the handlers' _get_basic_schema"""
+        dtypes = self.dtypes()
+        return {
+            "columns": list(dtypes),
+            "total_rows": len(self),
+            "total_columns": len(dtypes),
+            "data_types": dtypes,
+            "nullable": dict(self.manifest["nullable"]),
+            "schema_version": self.version,
+            "schema_versions": self.manifest["schema_versions"],
+            "partitions": len(self.manifest["partitions"]),
+        }
+
+    def _save(self):
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.manifest, indent=2))
+        tmp.replace(self.manifest_path)
+
+
+# =============================================
+# HELPER METHODS (Type rules)
+# =============================================
+
+def widen_dtype(a, b):
+    """Smallest common dtype (as a string) that can hold values of a and b"""
+    if a == b:
+        return a
+    kind_a, kind_b = _kind(a), _kind(b)
+    if kind_a in "biu" and kind_b in "biu":
+        return "int64"
+    if kind_a in "biuf" and kind_b in "biuf":
+        return "float64"
+    if kind_a == "M" and kind_b == "M" and "," not in a + b:
+        return "datetime64[ns]"
+    return "object"  # includes naive + timezone-aware timestamps
+
+
+def materialized_dtype(dtype, nullable):
+    """dtype to use in pandas; nullable ints and bools need extension types"""
+    kind = _kind(dtype)
+    if nullable and kind in "iu":
+        return "Int64"
+    if nullable and kind == "b":
+        return "boolean"
+    return dtype
+
+
+def conform(df, dtypes):
+    """Add missing columns as nulls and cast the rest to the target dtypes"""
+    out = {}
+    for col, dtype in dtypes.items():
+        if col not in df.columns:
+            out[col] = pd.Series(pd.NA if dtype in ("Int64", "boolean") else None,
+                                 index=df.index, dtype=dtype)
+        elif str(df[col].dtype) != dtype:
+            out[col] = df[col].astype(dtype)
+        else:
+            out[col] = df[col]
+    return pd.DataFrame(out, index=df.index)
+
+
+def _kind(dtype):
+    if dtype in ("Int64", "Int32", "UInt64"):
+        return "i"
+    if dtype == "boolean":
+        return "b"
+    if re.match(r"datetime64\[\w+(, .+)?\]$", dtype):
+        return "M"
+    try:
+        return np.dtype(dtype).kind
+    except TypeError:
+        return "O"  # category, string and other extension types
@@ -0,0 +1,334 @@
+"""
+Column profiling for ingested data.
+
+A DatasetProfiler is fed DataFrame batches (the same batches the samplers
+see) and keeps one ColumnProfile per column. Every statistic is computed
+with vectorized numpy/pandas operations and stored in a mergeable form, so
+profiles of chunks, files or partitions can be combined later:
+
+- null counts, min/max, mean/stddev  (exact, merged with Chan's formulas)
+- top-k values                       (bounded frequency table)
+- distinct count                     (HyperLogLog)
+- quantiles                          (KLL sketch)
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# =============================================
+# 1. SKETCHES (Small, mergeable summaries)
+# =============================================
+
+_POWERS_OF_TWO = np.array([1 << i for i in range(64)], dtype=np.uint64)
+
+
+class HyperLogLog:
+    """Approximate distinct counter (about 1.6% error with p=12)"""
+
+    def __init__(self, p=12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update_hashes(self, hashes):
+        """Add 64-bit hashes (numpy uint64 array)"""
+        if len(hashes) == 0:
+            return
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # rank = position of the leftmost 1-bit in the remaining 64-p bits
+        bit_length = np.searchsorted(_POWERS_OF_TWO, rest, side="right")
+        rank = (64 - self.p - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(float)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * np.log(m / zeros)))  # linear counting for small sets
+        return int(round(raw))
+
+
+class KLLSketch:
+    """Approximate quantile sketch (KLL) over a stream of numbers"""
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        """Add a numpy array of finite floats"""
+        if len(values) == 0:
+            return
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.n += len(values)
+        self._compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        """Return the approximate value at each quantile in qs"""
+        if self.n == 0:
+            return [None for _ in qs]
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(level), 2.0 ** height) for height, level in enumerate(self.levels)
+        ])
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        targets = np.asarray(qs, dtype=float) * cumulative[-1]
+        positions = np.minimum(np.searchsorted(cumulative, targets, side="left"), len(items) - 1)
+        return items[positions].tolist()
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                leftover = items[:len(items) % 2]  # odd item stays behind
+                items = items[len(leftover):]
+                offset = int(self.rng.integers(0, 2))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[offset::2]])
+                self.levels[level] = leftover
+                level = 0  # capacities shift when a level is added
+                continue
+            level += 1
+
+
+class TopKCounter:
+    """Frequency table that keeps only the most common values"""
+
+    def __init__(self, k=10, capacity_factor=10):
+        self.k = k
+        self.capacity = k * capacity_factor
+        self.counts = pd.Series(dtype="int64")
+
+    def update(self, series):
+        counts = _value_counts(series)
+        if len(counts) > self.capacity:
+            counts = counts.nlargest(self.capacity)  # values below this cannot be heavy hitters
+        if len(counts):
+            self._add(counts)
+
+    def merge(self, other):
+        if len(other.counts):
+            self._add(other.counts)
+        return self
+
+    def top(self):
+        return [[_to_python(value), int(count)]
+                for value, count in self.counts.head(self.k).items()]
+
+    def _add(self, counts):
+        merged = self.counts.add(counts, fill_value=0) if len(self.counts) else counts
+        self.counts = merged.astype("int64").sort_values(ascending=False, kind="stable").head(self.capacity)
+
+
+# =============================================
+# 2. PROFILES (Per column and per dataset)
+# =============================================
+
+class ColumnProfile:
+    """Running statistics for a single column"""
+
+    quantile_points = (0.01, 0.25, 0.5, 0.75, 0.99)
+
+    def __init__(self, top_k=10, hll_precision=12, kll_k=200):
+        self.dtype = None
+        self.rows = 0
+        self.count = 0
+        self.numeric_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.distinct = HyperLogLog(hll_precision)
+        self.quantile_sketch = KLLSketch(kll_k, seed=0)
+        self.top_values = TopKCounter(top_k)
+
+    def update(self, series):
+        """Add one batch of values for this column"""
+        self.dtype = str(series.dtype) if self.dtype is None else self.dtype
+        self.rows += len(series)
+        values = series.dropna()
+        self.count += len(values)
+        if len(values) == 0:
+            return
+
+        self.distinct.update_hashes(_hash_values(values))
+        self.top_values.update(values)
+
+        if pd.api.types.is_bool_dtype(values.dtype):
+            values = values.astype(float)
+        if pd.api.types.is_numeric_dtype(values.dtype):
+            numbers = values.to_numpy(dtype=float)
+            numbers = numbers[np.isfinite(numbers)]
+            self._update_moments(numbers)
+            self.quantile_sketch.update(numbers)
+            self._update_min_max(numbers.min() if len(numbers) else None,
+                                 numbers.max() if len(numbers) else None)
+        elif pd.api.types.is_datetime64_any_dtype(values.dtype):
+            self._update_min_max(values.min(), values.max())
+
+    def add_missing(self, n):
+        """Record n rows where this column did not exist"""
+        self.rows += n
+
+    def merge(self, other):
+        """Combine with the profile of another chunk of the same column"""
+        self.dtype = self.dtype or other.dtype
+        self.rows += other.rows
+        self.count += other.count
+        if other.numeric_count:
+            total = self.numeric_count + other.numeric_count
+            delta = other.mean - self.mean
+            self.m2 += other.m2 + delta * delta * self.numeric_count * other.numeric_count / total
+            self.mean += delta * other.numeric_count / total
+            self.numeric_count = total
+        self._update_min_max(other.min, other.max)
+        self.distinct.merge(other.distinct)
+        self.quantile_sketch.merge(other.quantile_sketch)
+        self.top_values.merge(other.top_values)
+        return self
+
+    def to_dict(self):
+        profile = {
+            "dtype": self.dtype,
+            "count": self.count,
+            "null_count": self.rows - self.count,
+            "distinct_estimate": self.distinct.estimate() if self.count else 0,
+            "min": _to_python(self.min),
+            "max": _to_python(self.max),
+            "top_values": self.top_values.top(),
+        }
+        if self.numeric_count:
+            std = np.sqrt(self.m2 / (self.numeric_count - 1)) if self.numeric_count > 1 else 0.0
+            profile["mean"] = float(self.mean)
+            profile["std"] = float(std)
+            values = self.quantile_sketch.quantiles(self.quantile_points)
+            profile["quantiles"] = {f"p{int(q * 100)}": v for q, v in zip(self.quantile_points, values)}
+        return profile
+
+    def _update_moments(self, numbers):
+        n = len(numbers)
+        if n == 0:
+            return
+        batch_mean = numbers.mean()
+        batch_m2 = ((numbers - batch_mean) ** 2).sum()
+        total = self.numeric_count + n
+        delta = batch_mean - self.mean
+        self.m2 += batch_m2 + delta * delta * self.numeric_count * n / total
+        self.mean += delta * n / total
+        self.numeric_count = total
+
+    def _update_min_max(self, low, high):
+        if low is not None and (self.min is None or low < self.min):
+            self.min = low
+        if high is not None and (self.max is None or high > self.max):
+            self.max = high
+
+
+class DatasetProfiler:
+    """Profile every column of a dataset, batch by batch"""
+
+    def __init__(self, top_k=10):
+        self.top_k = top_k
+        self.rows = 0
+        self.columns = {}
+
+    def update(self, df):
+        """Add one DataFrame batch"""
+        n = len(df)
+        for col in df.columns:
+            profile = self._column(col)
+            profile.update(df[col])
+        for col, profile in self.columns.items():
+            if col not in df.columns:
+                profile.add_missing(n)
+        self.rows += n
+
+    def merge(self, other):
+        """Combine with the profile of another chunk/file of the same dataset"""
+        for col, profile in other.columns.items():
+            self._column(col).merge(profile)
+        for col, profile in self.columns.items():
+            if col not in other.columns:
+                profile.add_missing(other.rows)
+        self.rows += other.rows
+        return self
+
+    def to_dict(self):
+        return {
+            "rows_profiled": self.rows,
+            "columns": {str(col): profile.to_dict() for col, profile in self.columns.items()},
+        }
+
+    def _column(self, col):
+        if col not in self.columns:
+            profile = ColumnProfile(top_k=self.top_k)
+            profile.add_missing(self.rows)  # the column was absent so far
+            self.columns[col] = profile
+        return self.columns[col]
+
+
+def profile_dataframe(df, top_k=10):
+    """Profile a whole DataFrame in one pass and return the profile dict"""
+    profiler = DatasetProfiler(top_k=top_k)
+    profiler.update(df)
+    return profiler.to_dict()
+
+
+# =============================================
+# 3. HELPER METHODS (Supporting functions)
+# =============================================
+
+def _hash_values(values):
+    try:
+        return pd.util.hash_pandas_object(values, index=False).to_numpy()
+    except TypeError:
+        # Unhashable objects (nested JSON documents): hash their text form
+        return pd.util.hash_pandas_object(values.astype(str), index=False).to_numpy()
+
+
+def _value_counts(values):
+    try:
+        return values.value_counts(sort=False)
+    except TypeError:
+        return values.astype(str).value_counts(sort=False)
+
+
+def _to_python(value):
+    """Make numpy/pandas scalars JSON friendly"""
+    if value is None:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
@@ -0,0 +1,314 @@
+"""
+Declarative data-quality rules, checked while the data streams in.
+
+Validation before ingestion only looks at the file (exists, extension,
+size). Rules look at the values, batch by batch, as they are read:
+
+    rules = [
+        {"rule": "not_null", "column": "order_id"},
+        {"rule": "unique", "column": "order_id"},
+        {"rule": "range", "column": "amount", "min": 0, "max": 10_000},
+        {"rule": "regex", "column": "email", "pattern": r"[^@\\s]+@[^@\\s]+"},
+        {"rule": "referential", "column": "product_id", "table": "sales",
+         "ref_table": "products", "ref_column": "product_id"},
+    ]
+
+Every rule is one vectorized pandas expression per batch (isna,
+comparisons, str.fullmatch, isin; uniqueness uses the hashed Deduplicator,
+so it holds across batches with bounded memory). Null values only fail
+not_null.
+
+With max_error_rate (failing rows / rows checked) or max_errors the check
+raises QualityAbort as soon as the threshold is crossed, so a garbage file
+is rejected after its first batches instead of after a full load. SQLite
+tables are checked before they are sampled, reading only the rule columns.
+
+A batch without a rule's column (an optional JSON field that shows up
+later) is checked as if the column were all null, so only not_null fails.
+A column that never appears in the whole stream raises ValueError at the
+end (finish), as does a column missing from the SQLite table a rule is
+scoped to; unscoped rules apply to the tables that have the column. Rules
+that never saw a row are reported as "not evaluated", not as passed.
+"""
+
+import re
+import sqlite3
+
+import pandas as pd
+
+from data.dedup import Deduplicator, _normalized
+
+
+RULE_TYPES = ("not_null", "range", "regex", "unique", "referential")
+MIN_ROWS = 1000  # rows checked before max_error_rate can abort
+MAX_EXAMPLES = 5  # failing values kept per rule
+
+
+class QualityAbort(ValueError):
+    """Raised when the failing rows cross the error threshold"""
+
+
+# =============================================
+# 1. QUALITY CHECKER (Rules -> counts per batch)
+# =============================================
+
+class QualityChecker:
+
+    def __init__(self, rules, max_error_rate=None, max_errors=None, min_rows=MIN_ROWS):
+        """
+        rules:           list of rule dicts (see the module docstring); an
+                         optional "table" limits a rule to one SQLite table
+                         and "name" overrides its name in the results
+        max_error_rate:  abort once more than this fraction of rows fails
+                         (after min_rows rows have been checked)
+        max_errors:      abort once more than this many rows fail
+        """
+        self.rules = [self._parse(rule) for rule in rules]
+        self.max_error_rate = max_error_rate
+        self.max_errors = max_errors
+        self.min_rows = min_rows
+        self.rows_checked = 0
+        self.failing_rows = 0
+        self.aborted = False
+        self._results = [{"failures": 0, "checked": 0, "examples": []} for _ in self.rules]
+        self._unique = {}  # rule index -> Deduplicator
+        self._references = {}  # rule index -> normalized reference values
+        self._columns_seen = set()  # columns of the file batches checked so far
+
+    def check_batch(self, df, table=None, conn=None):
+        """Apply the rules to one batch; raises QualityAbort past the threshold
+
+        table selects the rules of a SQLite table; conn is the database the
+        referential rules without ref_db read their reference table from.
+        """
+        failing = pd.Series(False, index=df.index)
+        if table is None:
+            self._columns_seen.update(df.columns)
+        for i, rule in enumerate(self.rules):
+            if rule.get("table") not in (None, table):
+                continue
+            missing = [col for col in rule["columns"] if col not in df.columns]
+            if missing and table is not None:
+                continue  # unscoped rule, a table without the column
+            frame = df.assign(**{col: None for col in missing}) if missing else df
+            failed = self._failures(i, rule, frame, conn)
+            result = self._results[i]
+            result["checked"] += len(df)
+            count = int(failed.sum())
+            if count:
+                result["failures"] += count
+                failing |= failed
+                room = MAX_EXAMPLES - len(result["examples"])
+                if room > 0:
+                    values = frame.loc[failed, rule["columns"]].head(room)
+                    result["examples"].extend(_example(row) for row in values.itertuples(index=False))
+        self.rows_checked += len(df)
+        self.failing_rows += int(failing.sum())
+        self._check_threshold()
+
+    def finish(self):
+        """End of a file stream: raise for rule columns no batch contained"""
+        for rule in self.rules:
+            missing = [col for col in rule["columns"] if col not in self._columns_seen]
+            if rule.get("table") is None and missing and self.rows_checked:
+                raise ValueError(_missing_message(rule, self._columns_seen))
+
+    def check_sqlite_table(self, conn, table_name, batch_size=50000):
+        """Stream the rule columns of a whole SQLite table through the rules"""
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table_name)})")]
+        for rule in self.rules:
+            if rule.get("table") == table_name and not set(rule["columns"]) <= set(columns):
+                raise ValueError(_missing_message(rule, columns, table_name))
+        needed = [col for col in columns
+                  if any(col in rule["columns"] and rule.get("table") in (None, table_name)
+                         for rule in self.rules)]
+        if not needed:
+            return
+        query = f"SELECT {', '.join(_quote(c) for c in needed)} FROM {_quote(table_name)}"
+        for batch in pd.read_sql_query(query, conn, chunksize=batch_size):
+            self.check_batch(batch, table_name, conn)
+
+    def summary(self):
+        """Counts per rule and overall, for the schema and the state"""
+        rules = []
+        for rule, result in zip(self.rules, self._results):
+            status = ("not evaluated" if not result["checked"]
+                      else "failed" if result["failures"] else "passed")
+            rules.append({
+                "name": rule["name"],
+                "rule": rule["rule"],
+                "table": rule.get("table"),
+                "checked": result["checked"],
+                "failures": result["failures"],
+                "status": status,
+                "passed": status == "passed",
+                "examples": result["examples"],
+            })
+        return {
+            "passed": self.failing_rows == 0,
+            "aborted": self.aborted,
+            "rows_checked": self.rows_checked,
+            "failing_rows": self.failing_rows,
+            "error_rate": round(self.failing_rows / self.rows_checked, 6) if self.rows_checked else 0.0,
+            "max_error_rate": self.max_error_rate,
+            "max_errors": self.max_errors,
+            "rules": rules,
+        }
+
+    def close(self):
+        for deduplicator in self._unique.values():
+            deduplicator.close()
+        self._unique = {}
+
+    # ----- rules -----
+
+    def _parse(self, rule):
+        rule = dict(rule)
+        kind = rule.get("rule")
+        if kind not in RULE_TYPES:
+            raise ValueError(f"Unknown quality rule: {kind} (expected one of {RULE_TYPES})")
+        columns = rule.get("columns") or rule.get("column")
+        if not columns:
+            raise ValueError(f"Quality rule {kind} needs a column")
+        rule["columns"] = [columns] if isinstance(columns, str) else list(columns)
+        if kind != "unique" and len(rule["columns"]) != 1:
+            raise ValueError(f"Quality rule {kind} checks a single column")
+        if kind == "range" and rule.get("min") is None and rule.get("max") is None:
+            raise ValueError("Quality rule range needs min and/or max")
+        if kind == "regex":
+            rule["compiled"] = re.compile(rule["pattern"])
+        if kind == "referential" and "values" not in rule and not rule.get("ref_table"):
+            raise ValueError("Quality rule referential needs values or ref_table")
+        rule.setdefault("name", f"{kind}({', '.join(rule['columns'])})")
+        return rule
+
+    def _failures(self, i, rule, df, conn):
+        """Boolean Series: the rows of df that break the rule"""
+        kind = rule["rule"]
+        series = df[rule["columns"][0]]
+        if kind == "not_null":
+            return series.isna()
+        if kind == "unique":
+            keys = df[rule["columns"]]
+            present = keys.notna().all(axis=1)
+            if i not in self._unique:
+                self._unique[i] = Deduplicator(rule["columns"])
+            failed = pd.Series(False, index=df.index)
+            failed[present] = ~self._unique[i].new_rows(keys[present])
+            return failed
+        if kind == "range":
+            values = _comparable(series, rule)
+            failed = values.isna() & series.notna()  # not a number / date at all
+            if rule.get("min") is not None:
+                failed |= values < _bound(series, rule["min"])
+            if rule.get("max") is not None:
+                failed |= values > _bound(series, rule["max"])
+            return failed
+        if kind == "regex":
+            text = series.astype("str")
+            matched = text.str.fullmatch(rule["compiled"]).fillna(False).astype(bool)
+            return series.notna() & ~matched
+        if kind == "referential":
+            if i not in self._references:
+                self._references[i] = self._load_reference(rule, conn)
+            return series.notna() & ~_normalized(series).isin(self._references[i])
+        raise ValueError(f"Unknown quality rule: {kind}")
+
+    def _load_reference(self, rule, conn):
+        """The allowed values of a referential rule (read once)"""
+        if "values" in rule:
+            values = pd.Series(list(rule["values"]))
+        else:
+            own = conn is None or rule.get("ref_db")
+            ref_conn = sqlite3.connect(rule["ref_db"]) if own else conn
+            try:
+                ref_column = rule.get("ref_column", rule["columns"][0])
+                values = pd.read_sql_query(
+                    f"SELECT DISTINCT {_quote(ref_column)} FROM {_quote(rule['ref_table'])}",
+                    ref_conn).iloc[:, 0]
+            finally:
+                if own:
+                    ref_conn.close()
+        return pd.Index(_normalized(values.dropna()).unique())
+
+    def _check_threshold(self):
+        too_many = self.max_errors is not None and self.failing_rows > self.max_errors
+        too_often = (self.max_error_rate is not None and self.rows_checked >= self.min_rows
+                     and self.failing_rows > self.max_error_rate * self.rows_checked)
+        if too_many or too_often:
+            self.aborted = True
+            broken = ", ".join(f"{rule['name']}: {result['failures']}" + self._unseen_note(rule)
+                               for rule, result in zip(self.rules, self._results)
+                               if result["failures"])
+            raise QualityAbort(f"Data quality check failed after {self.rows_checked} rows: "
+                               f"{self.failing_rows} failing rows ({broken})")
+
+    def _unseen_note(self, rule):
+        """Why an abort may really be a misspelled column"""
+        missing = [col for col in rule["columns"] if col not in self._columns_seen]
+        if rule.get("table") is not None or not self._columns_seen or not missing:
+            return ""
+        return f" - column(s) {missing} not in the data so far"
+
+
+# =============================================
+# 2. HANDLER SUPPORT (Used by the ingestion handlers)
+# =============================================
+
+def create_quality_checker(quality):
+    """QualityChecker from a handler's quality option, or None
+
+    quality may be None, a list of rules, a dict with "rules" and the
+    QualityChecker thresholds, or a ready QualityChecker.
+    """
+    if quality is None or isinstance(quality, QualityChecker):
+        return quality
+    if isinstance(quality, dict):
+        return QualityChecker(**quality)
+    return QualityChecker(quality)
+
+
+def check_batches(batches, checker):
+    """Pass a stream of batches through the rules unchanged"""
+    for batch in batches:
+        checker.check_batch(batch)
+        yield batch
+    checker.finish()
+
+
+# =============================================
+# HELPER METHODS (Supporting functions)
+# =============================================
+
+def _comparable(series, rule):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    bound = rule.get("min") if rule.get("min") is not None else rule.get("max")
+    if isinstance(bound, str):
+        return pd.to_datetime(series, errors="coerce")
+    return pd.to_numeric(series, errors="coerce")
+
+
+def _bound(series, value):
+    if isinstance(value, str):
+        bound = pd.Timestamp(value)
+        tz = getattr(series.dtype, "tz", None)
+        return bound.tz_localize(tz) if tz is not None and bound.tz is None else bound
+    return value
+
+
+def _example(row):
+    """A failing value (or key) as plain JSON-friendly Python"""
+    values = [None if pd.isna(value) else value if isinstance(value, (int, float, str, bool))
+              else str(value) for value in row]
+    return values[0] if len(values) == 1 else values
+
+
+def _missing_message(rule, columns, table=None):
+    missing = [col for col in rule["columns"] if col not in columns]
+    where = f"table {table}" if table else "the data"
+    return f"Quality rule {rule['name']}: column(s) {missing} not in {where}"
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
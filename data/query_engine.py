@@ -0,0 +1,760 @@
+"""
+Query Engine - filter / group-by / aggregate / join over ingested data.
+
+Queries come in two equivalent forms:
+
+1. A small SQL subset
+       SELECT region, SUM(amount) AS total FROM sales
+       JOIN products ON product_id = product_id
+       WHERE amount > 10 AND region IN ('North', 'South')
+       GROUP BY region ORDER BY total DESC LIMIT 5
+
+2. A structured dict (easy for an LLM to emit)
+       {"from": "sales",
+        "select": ["region"],
+        "aggregates": [{"func": "sum", "column": "amount", "as": "total"}],
+        "join": {"table": "products", "on": ["product_id", "product_id"], "how": "inner"},
+        "where": [["amount", ">", 10], ["region", "in", ["North", "South"]]],
+        "group_by": ["region"],
+        "order_by": [["total", "desc"]],
+        "limit": 5}
+
+Everything runs vectorized with pandas. Datasets can be in-memory frames,
+workspace datasets, or lazy file sources (SQLite tables, CSV, Parquet and
+Arrow files) whose filters and column lists are pushed down into the
+handlers. Parsed plans
+are cached by query shape, so repeated questions that differ only in their
+literal values skip parsing and validation, and whole results are cached
+by dataset version (see data/result_cache.py).
+"""
+
+import json
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from data.compression import strip_compression_suffix
+
+
+AGGREGATES = {"sum", "avg", "mean", "min", "max", "count", "count_distinct"}
+OPERATORS = {"=", "!=", "<", "<=", ">", ">=", "in", "between", "like", "is_null", "not_null"}
+
+
+class QueryError(ValueError):
+    """Raised for queries the engine cannot parse or run"""
+
+
+# =============================================
+# 1. SQL PARSER (SQL subset -> query dict)
+# =============================================
+
+_TOKEN_RE = re.compile(r"""\s*(?:
+    (?P<number>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)
+  | (?P<string>'(?:[^']|'')*')
+  | (?P<op><=|>=|<>|!=|=|<|>|\(|\)|,|\*|;)
+  | (?P<name>[A-Za-z_][A-Za-z0-9_.]*|"(?:[^"]|"")+")
+)""", re.VERBOSE)
+
+_KEYWORDS = {"select", "from", "where", "and", "or", "group", "by", "order", "asc", "desc",
+             "limit", "join", "inner", "left", "right", "outer", "on", "as", "in",
+             "between", "like", "is", "not", "null", "distinct", "true", "false"}
+
+
+class _Param:
+    """Placeholder for a literal in a cached plan"""
+
+    def __init__(self, index):
+        self.index = index
+
+
+def tokenize_sql(sql):
+    """Split SQL into tokens; literals are replaced by numbered parameters.
+
+    Returns (tokens, params, shape) where shape is the query text with every
+    literal replaced by '?', used as the plan cache key.
+    """
+    tokens, params, pos = [], [], 0
+    sql = sql.strip()
+    while pos < len(sql):
+        match = _TOKEN_RE.match(sql, pos)
+        if not match or match.end() == pos:
+            raise QueryError(f"Unexpected text in query near: {sql[pos:pos + 20]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "number":
+            params.append(float(text) if any(c in text for c in ".eE") else int(text))
+            tokens.append(("param", len(params) - 1))
+        elif kind == "string":
+            params.append(text[1:-1].replace("''", "'"))
+            tokens.append(("param", len(params) - 1))
+        elif kind == "name" and text.lower() in ("true", "false"):
+            params.append(text.lower() == "true")
+            tokens.append(("param", len(params) - 1))
+        elif kind == "name" and text.lower() in _KEYWORDS:
+            tokens.append(("keyword", text.lower()))
+        elif kind == "name":
+            name = text[1:-1].replace('""', '"') if text.startswith('"') else text
+            tokens.append(("name", name))
+        elif text != ";":
+            tokens.append(("op", "!=" if text == "<>" else text))
+    shape = " ".join("?" if kind == "param" else str(value) for kind, value in tokens)
+    return tokens, params, shape
+
+
+class _SQLParser:
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def parse(self):
+        query = {"select": [], "aggregates": [], "where": [], "group_by": [], "order_by": []}
+        self._expect("keyword", "select")
+        self._parse_select_list(query)
+        self._expect("keyword", "from")
+        query["from"] = self._name()
+
+        if self._accept_keyword("inner") or self._peek_keyword("join"):
+            self._expect("keyword", "join")
+            query["join"] = self._parse_join("inner")
+        elif self._accept_keyword("left"):
+            self._accept_keyword("outer")
+            self._expect("keyword", "join")
+            query["join"] = self._parse_join("left")
+
+        if self._accept_keyword("where"):
+            query["where"].append(self._parse_condition())
+            while self._accept_keyword("and"):
+                query["where"].append(self._parse_condition())
+            if self._peek_keyword("or"):
+                raise QueryError("OR is not supported; use IN (...) instead")
+        if self._accept_keyword("group"):
+            self._expect("keyword", "by")
+            query["group_by"] = self._name_list()
+        if self._accept_keyword("order"):
+            self._expect("keyword", "by")
+            query["order_by"].append(self._parse_order_item())
+            while self._accept_op(","):
+                query["order_by"].append(self._parse_order_item())
+        if self._accept_keyword("limit"):
+            query["limit"] = self._literal()
+        if self.pos != len(self.tokens):
+            raise QueryError(f"Unexpected token: {self.tokens[self.pos][1]}")
+        return query
+
+    def _parse_select_list(self, query):
+        while True:
+            if self._accept_op("*"):
+                query["select"].append("*")
+            else:
+                name = self._name()
+                if self._accept_op("("):
+                    query["aggregates"].append(self._parse_aggregate(name.lower()))
+                else:
+                    query["select"].append(name)
+                    if self._peek_keyword("as"):
+                        raise QueryError("Aliases are only supported on aggregates")
+            if not self._accept_op(","):
+                return
+
+    def _parse_aggregate(self, func):
+        func = "avg" if func == "mean" else func
+        if self._accept_keyword("distinct"):
+            if func != "count":
+                raise QueryError("DISTINCT is only supported in COUNT(DISTINCT col)")
+            func = "count_distinct"
+        column = "*" if self._accept_op("*") else self._name()
+        self._expect("op", ")")
+        if func not in AGGREGATES:
+            raise QueryError(f"Unknown aggregate function: {func}")
+        alias = self._name() if self._accept_keyword("as") else None
+        return {"func": func, "column": column, "as": alias}
+
+    def _parse_join(self, how):
+        table = self._name()
+        self._expect("keyword", "on")
+        left = self._name()
+        self._expect("op", "=")
+        right = self._name()
+        return {"table": table, "on": [_strip_table(left), _strip_table(right)], "how": how}
+
+    def _parse_condition(self):
+        column = _strip_table(self._name())
+        if self._accept_keyword("is"):
+            negate = self._accept_keyword("not")
+            self._expect("keyword", "null")
+            return [column, "not_null" if negate else "is_null", None]
+        negate = self._accept_keyword("not")
+        if self._accept_keyword("in"):
+            self._expect("op", "(")
+            values = [self._literal()]
+            while self._accept_op(","):
+                values.append(self._literal())
+            self._expect("op", ")")
+            condition = [column, "in", values]
+        elif self._accept_keyword("between"):
+            low = self._literal()
+            self._expect("keyword", "and")
+            condition = [column, "between", [low, self._literal()]]
+        elif self._accept_keyword("like"):
+            condition = [column, "like", self._literal()]
+        else:
+            kind, op = self._next()
+            if kind != "op" or op not in OPERATORS:
+                raise QueryError(f"Expected a comparison after {column}")
+            condition = [column, op, self._literal()]
+        if negate:
+            raise QueryError("NOT IN / NOT LIKE / NOT BETWEEN are not supported")
+        return condition
+
+    def _parse_order_item(self):
+        column = self._name()
+        direction = "asc"
+        if self._accept_keyword("desc"):
+            direction = "desc"
+        else:
+            self._accept_keyword("asc")
+        return [column, direction]
+
+    def _name_list(self):
+        names = [self._name()]
+        while self._accept_op(","):
+            names.append(self._name())
+        return names
+
+    def _name(self):
+        kind, value = self._next()
+        if kind != "name":
+            raise QueryError(f"Expected a name, got {value!r}")
+        return value
+
+    def _literal(self):
+        kind, value = self._next()
+        if kind != "param":
+            raise QueryError(f"Expected a literal value, got {value!r}")
+        return _Param(value)
+
+    def _next(self):
+        if self.pos >= len(self.tokens):
+            raise QueryError("Query ended unexpectedly")
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def _peek_keyword(self, word):
+        return self.pos < len(self.tokens) and self.tokens[self.pos] == ("keyword", word)
+
+    def _accept_keyword(self, word):
+        if self._peek_keyword(word):
+            self.pos += 1
+            return True
+        return False
+
+    def _accept_op(self, op):
+        if self.pos < len(self.tokens) and self.tokens[self.pos] == ("op", op):
+            self.pos += 1
+            return True
+        return False
+
+    def _expect(self, kind, value):
+        token = self._next()
+        if token != (kind, value):
+            raise QueryError(f"Expected {value!r}, got {token[1]!r}")
+
+
+# =============================================
+# 2. PLANS (Validate, normalize and cache)
+# =============================================
+
+def normalize_query(query):
+    """Validate a query dict and fill in defaults"""
+    if "from" not in query:
+        raise QueryError("Query needs a 'from' dataset")
+    plan = {
+        "from": query["from"],
+        "select": list(query.get("select") or []),
+        "aggregates": [],
+        "where": [],
+        "group_by": list(query.get("group_by") or []),
+        "order_by": [],
+        "limit": query.get("limit"),
+        "join": None,
+    }
+    for agg in query.get("aggregates") or []:
+        func = str(agg["func"]).lower()
+        func = "avg" if func == "mean" else func
+        if func not in AGGREGATES:
+            raise QueryError(f"Unknown aggregate function: {func}")
+        column = agg.get("column", "*")
+        alias = agg.get("as") or ("count" if column == "*" else f"{func}_{column}")
+        plan["aggregates"].append({"func": func, "column": column, "as": alias})
+    for condition in query.get("where") or []:
+        column, op = condition[0], str(condition[1]).lower()
+        op = "!=" if op == "<>" else op
+        if op not in OPERATORS:
+            raise QueryError(f"Unknown operator: {op}")
+        plan["where"].append([column, op, condition[2] if len(condition) > 2 else None])
+    for item in query.get("order_by") or []:
+        if isinstance(item, str):
+            item = [item, "asc"]
+        plan["order_by"].append([item[0], str(item[1]).lower() if len(item) > 1 else "asc"])
+    if query.get("join"):
+        join = query["join"]
+        on = join["on"]
+        on = [on, on] if isinstance(on, str) else list(on)
+        plan["join"] = {"table": join["table"], "on": on, "how": join.get("how", "inner")}
+    if plan["group_by"] and not plan["aggregates"]:
+        raise QueryError("GROUP BY needs an aggregate, e.g. COUNT(*)")
+    if plan["select"] and plan["aggregates"]:
+        extra = [c for c in plan["select"] if c != "*" and c not in plan["group_by"]]
+        if extra:
+            raise QueryError(f"Columns {extra} must appear in GROUP BY")
+    if not plan["select"] and not plan["aggregates"]:
+        plan["select"] = ["*"]
+    return plan
+
+
+class PlanCache:
+    """LRU cache of normalized plans keyed by query shape (thread-safe)"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_plan(self, query):
+        """Return (plan, params) for a SQL string or a query dict"""
+        if isinstance(query, str):
+            tokens, params, shape = tokenize_sql(query)
+            key = "sql:" + shape
+            build = lambda: normalize_query(_SQLParser(tokens).parse())  # noqa: E731
+        else:
+            template, params = _extract_literals(query)
+            key = "dict:" + json.dumps(template, sort_keys=True, default=str)
+            build = lambda: normalize_query(template)  # noqa: E731
+
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self.hits += 1
+                self._plans.move_to_end(key)
+                return plan, params
+            self.misses += 1
+        plan = build()  # outside the lock: parsing errors leave the cache as it was
+        with self._lock:
+            self._plans[key] = plan
+            if len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+        return plan, params
+
+    def stats(self):
+        return {"entries": len(self._plans), "hits": self.hits, "misses": self.misses}
+
+
+def bind_plan(plan, params):
+    """Replace parameter placeholders in a cached plan with literal values"""
+    def bind(value):
+        if isinstance(value, _Param):
+            return params[value.index]
+        if isinstance(value, dict) and set(value) == {"__param__"}:
+            return params[value["__param__"]]
+        if isinstance(value, list):
+            return [bind(item) for item in value]
+        if isinstance(value, dict):
+            return {key: bind(item) for key, item in value.items()}
+        return value
+    return bind(plan)
+
+
+def _extract_literals(query):
+    """Replace where/limit literals of a query dict with placeholders"""
+    params = []
+
+    def placeholder(value):
+        params.append(value)
+        return {"__param__": len(params) - 1}
+
+    template = dict(query)
+    where = []
+    for condition in query.get("where") or []:
+        condition = list(condition)
+        if len(condition) > 2:
+            value = condition[2]
+            if isinstance(value, (list, tuple)):
+                condition[2] = [placeholder(v) for v in value]
+            else:
+                condition[2] = placeholder(value)
+        where.append(condition)
+    template["where"] = where
+    if query.get("limit") is not None:
+        template["limit"] = placeholder(query["limit"])
+    return template, params
+
+
+# =============================================
+# 3. QUERY ENGINE (Vectorized execution)
+# =============================================
+
+_default_plan_cache = None
+_default_result_cache = None
+
+
+def get_default_plan_cache():
+    """Plan cache shared by every engine that does not bring its own
+
+    run_query builds a new engine per call, so without it repeated query
+    shapes would be parsed again every time.
+    """
+    global _default_plan_cache
+    if _default_plan_cache is None:
+        _default_plan_cache = PlanCache()
+    return _default_plan_cache
+
+
+def get_default_result_cache():
+    """Result cache shared by every engine that does not bring its own"""
+    global _default_result_cache
+    if _default_result_cache is None:
+        from data.result_cache import QueryResultCache
+        _default_result_cache = QueryResultCache()
+    return _default_result_cache
+
+
+class QueryEngine:
+
+    def __init__(self, workspace=None, plan_cache=None, result_cache=None):
+        """plan_cache / result_cache: None for the shared one;
+        result_cache=False disables result caching
+        """
+        self.workspace = workspace
+        self.plan_cache = get_default_plan_cache() if plan_cache is None else plan_cache
+        self.result_cache = get_default_result_cache() if result_cache is None else result_cache
+        self._frames = {}
+        self._versions = {}
+        self._sources = {}
+        if workspace is not None and self.result_cache:
+            workspace.add_listener(self.result_cache.invalidate_dataset)
+
+    # ----- registration -----
+
+    def register(self, name, df, version=None):
+        """Make an in-memory DataFrame queryable under a name
+
+        version identifies this content for the result cache; pass a new
+        one (or re-register) after changing the frame in place.
+        """
+        self._frames[name] = df
+        if version is None:
+            version = f"{id(df)}:{len(df)}:{hash(tuple(map(str, df.columns)))}"
+        self._versions[name] = f"{name}@{version}"
+        if self.result_cache:
+            self.result_cache.invalidate_dataset(name)
+
+    def register_source(self, name, path, table=None, dialect=None):
+        """Register a file that is read lazily, with filters pushed down
+
+        dialect: sniffed CSV parse_options (sep, quotechar, header, encoding)
+        """
+        path = str(path)
+        if path.lower().endswith(('.db', '.sqlite', '.sqlite3')):
+            if not table:
+                raise QueryError("SQLite sources need a table name")
+            self._sources[name] = {"type": "sqlite", "path": path, "table": table}
+        elif strip_compression_suffix(path).lower().endswith('.csv'):
+            self._sources[name] = {"type": "csv", "path": path, "dialect": dialect}
+        elif path.lower().endswith(('.parquet', '.pq', '.feather', '.arrow', '.ipc')):
+            self._sources[name] = {"type": "parquet", "path": path}
+        else:
+            raise QueryError(f"Unsupported lazy source: {path}")
+
+    @classmethod
+    def from_state(cls, state):
+        """Engine over the state's workspace plus its current DataFrame
+
+        A lazily ingested dataset (execute_plan's "lazy" strategy) is
+        queried from its file; the DataFrame in state is only a preview.
+        """
+        engine = cls(workspace=state.get("workspace"))
+        lazy = (state.get("schema") or {}).get("lazy")
+        if lazy and lazy["tables"]:
+            for table in lazy["tables"]:
+                engine.register_source(table, lazy["path"], table)
+        elif lazy:
+            engine.register_source("data", lazy["path"], dialect=lazy.get("dialect"))
+            if state.get("dataset_id"):
+                engine.register_source(state["dataset_id"], lazy["path"], dialect=lazy.get("dialect"))
+        elif state.get("df") is not None:
+            # dataset_id is unique per ingestion, so re-ingesting changes the version
+            version = f"{state.get('dataset_id')}:{id(state['df'])}:{len(state['df'])}"
+            engine._frames["data"] = state["df"]
+            engine._versions["data"] = f"data@{version}"
+            if state.get("dataset_id"):
+                engine._frames[state["dataset_id"]] = state["df"]
+                engine._versions[state["dataset_id"]] = f"{state['dataset_id']}@{version}"
+        return engine
+
+    # ----- execution -----
+
+    def execute(self, query):
+        """Run a SQL string or query dict and return a DataFrame"""
+        plan, params = self.plan_cache.get_plan(query)
+        plan = bind_plan(plan, params)
+        if not self.result_cache:
+            return self._run(plan)
+
+        names = [plan["from"]] + ([plan["join"]["table"]] if plan["join"] else [])
+        key = self.result_cache.make_key(
+            {name: self._fingerprint(name) for name in names}, plan)
+        result = self.result_cache.get(key)
+        if result is None:
+            result = self._run(plan)
+            self.result_cache.put(key, result, names)
+        return result
+
+    def explain(self, query):
+        """Show the bound plan and which filters would be pushed down"""
+        plan, params = self.plan_cache.get_plan(query)
+        plan = bind_plan(plan, params)
+        pushed, remaining = self._split_filters(plan)
+        return {"plan": plan, "pushed_down": pushed, "in_engine": remaining}
+
+    def _run(self, plan):
+        pushed, remaining = self._split_filters(plan)
+        left = self._load(plan["from"], plan, pushed.get(plan["from"], []))
+        left, remaining = self._use_indexes(plan["from"], left, remaining)
+
+        if plan["join"]:
+            join = plan["join"]
+            right = self._load(join["table"], plan, pushed.get(join["table"], []))
+            left_key, right_key = join["on"]
+            left = left.merge(right, how=join["how"], left_on=left_key, right_on=right_key,
+                              suffixes=("", "_right"))
+
+        if remaining:
+            left = left[_filter_mask(left, remaining)]
+
+        if plan["aggregates"]:
+            result = _aggregate(left, plan["group_by"], plan["aggregates"])
+            result = _order(result, plan["order_by"])
+        else:
+            result = _order(left, plan["order_by"])
+            if plan["select"] != ["*"]:
+                _check_columns(result, plan["select"])
+                result = result[plan["select"]]
+
+        if plan["limit"] is not None:
+            result = result.head(int(plan["limit"]))
+        return result.reset_index(drop=True)
+
+    # ----- sources, indexes and pushdown -----
+
+    def _fingerprint(self, name):
+        """Version of a dataset for result caching"""
+        if name in self._frames:
+            return self._versions[name]
+        if self.workspace is not None and name in self.workspace:
+            return self.workspace.fingerprint(name)
+        if name in self._sources:
+            import os
+            source = self._sources[name]
+            stat = os.stat(source["path"])
+            return f"{source['path']}:{source.get('table')}:{stat.st_mtime_ns}:{stat.st_size}"
+        raise QueryError(f"Unknown dataset: {name}")
+
+    def _use_indexes(self, name, df, conditions):
+        """Answer indexed conditions on a workspace dataset by index lookups"""
+        if self.workspace is None or name in self._frames or name not in self.workspace:
+            return df, conditions
+        positions, remaining = None, []
+        for condition in conditions:
+            found = self.workspace.index_positions(name, condition) \
+                if condition[0] in df.columns else None
+            if found is None:
+                remaining.append(condition)
+            else:
+                positions = found if positions is None else np.intersect1d(positions, found)
+        if positions is None:
+            return df, conditions
+        return df.take(positions), remaining
+
+    def _load(self, name, plan, filters):
+        if name in self._frames:
+            return self._frames[name]
+        if self.workspace is not None and name in self.workspace:
+            return self.workspace.get(name)
+        if name in self._sources:
+            return self._load_source(self._sources[name], plan, filters)
+        raise QueryError(f"Unknown dataset: {name}")
+
+    def _load_source(self, source, plan, filters):
+        columns = self._needed_columns(source, plan)
+        if source["type"] == "sqlite":
+            from data.sql_handler import SQLHandler
+            return SQLHandler().read_table(source["path"], source["table"], columns, filters)
+        if source["type"] == "parquet":
+            from data.parquet_handler import ParquetHandler
+            return ParquetHandler().read_parquet_filtered(source["path"], columns, filters)
+        from data.csv_handler import CSVHandler
+        return CSVHandler().read_csv_filtered(source["path"], columns, filters, source["dialect"])
+
+    def _split_filters(self, plan):
+        """Decide which WHERE conditions each lazy source can evaluate itself"""
+        names = [plan["from"]] + ([plan["join"]["table"]] if plan["join"] else [])
+        columns = {name: self._source_columns(name) for name in names}
+        pushed, remaining = {}, []
+        for condition in plan["where"]:
+            # A dataset with unknown columns might own the column too
+            owners = [name for name in names
+                      if columns[name] is None or condition[0] in columns[name]]
+            if len(owners) == 1 and self._can_push(owners[0], condition[1]):
+                pushed.setdefault(owners[0], []).append(condition)
+            else:
+                remaining.append(condition)
+        return pushed, remaining
+
+    def _can_push(self, name, op):
+        source = self._sources.get(name)
+        if source is None or name in self._frames:
+            return False
+        return source["type"] == "sqlite" or op != "like"
+
+    def _source_columns(self, name):
+        """Column names of a dataset, or None when unknown without loading it"""
+        if name in self._frames:
+            return list(self._frames[name].columns)
+        if self.workspace is not None and name in self.workspace:
+            schema = self.workspace.get_schema(name) or {}
+            return schema.get("columns")
+        source = self._sources.get(name)
+        if source is None:
+            return None
+        if "columns" not in source:
+            if source["type"] == "sqlite":
+                from data.sql_handler import SQLHandler
+                source["columns"] = SQLHandler().get_table_columns(source["path"], source["table"])
+            elif source["type"] == "parquet":
+                from data.parquet_handler import ParquetHandler
+                source["columns"] = ParquetHandler().get_columns(source["path"])
+            else:
+                from data.csv_handler import CSVHandler
+                source["columns"] = CSVHandler().get_csv_columns(source["path"], source["dialect"])
+        return source["columns"]
+
+    def _needed_columns(self, source, plan):
+        if "*" in plan["select"]:
+            return None
+        wanted = set(plan["select"]) | set(plan["group_by"])
+        wanted |= {agg["column"] for agg in plan["aggregates"] if agg["column"] != "*"}
+        wanted |= {condition[0] for condition in plan["where"]}
+        wanted |= {column for column, _ in plan["order_by"]}
+        if plan["join"]:
+            wanted |= set(plan["join"]["on"])
+        available = source["columns"] if "columns" in source else None
+        if available is None:
+            return None
+        # COUNT(*) alone needs no column, but one is needed to count the rows
+        return [column for column in available if column in wanted] or available[:1]
+
+
+def run_query(state, query):
+    """Run a query against the data held in an ingestion state"""
+    return QueryEngine.from_state(state).execute(query)
+
+
+# =============================================
+# 4. HELPER METHODS (Vectorized operators)
+# =============================================
+
+def _filter_mask(df, conditions):
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in conditions:
+        _check_columns(df, [column])
+        try:
+            mask &= condition_mask(df[column], op, value)
+        except TypeError:
+            raise QueryError(f"Cannot compare column {column} ({df[column].dtype}) "
+                             f"with {value!r}")
+    return mask
+
+
+def condition_mask(series, op, value):
+    """Boolean mask for one WHERE condition (vectorized)"""
+    if op == "=":
+        return series == value
+    if op == "!=":
+        return series != value
+    if op == "<":
+        return series < value
+    if op == "<=":
+        return series <= value
+    if op == ">":
+        return series > value
+    if op == ">=":
+        return series >= value
+    if op == "in":
+        return series.isin(list(value))
+    if op == "between":
+        return series.between(value[0], value[1])
+    if op == "like":
+        return series.astype(str).str.fullmatch(like_to_regex(value), na=False)
+    if op == "is_null":
+        return series.isna()
+    if op == "not_null":
+        return series.notna()
+    raise QueryError(f"Unknown operator: {op}")
+
+
+def like_to_regex(pattern):
+    regex = ""
+    for char in str(pattern):
+        regex += ".*" if char == "%" else "." if char == "_" else re.escape(char)
+    return regex
+
+
+def _aggregate(df, group_by, aggregates):
+    _check_columns(df, group_by + [a["column"] for a in aggregates if a["column"] != "*"])
+    named = {}
+    for agg in aggregates:
+        column = agg["column"]
+        if agg["func"] == "count" and column == "*":
+            column = group_by[0] if group_by else df.columns[0]
+            named[agg["as"]] = pd.NamedAgg(column=column, aggfunc="size")
+        else:
+            func = {"avg": "mean", "count_distinct": "nunique"}.get(agg["func"], agg["func"])
+            named[agg["as"]] = pd.NamedAgg(column=column, aggfunc=func)
+
+    if group_by:
+        return df.groupby(group_by, sort=False, dropna=False).agg(**named).reset_index()
+
+    row = {}
+    for alias, spec in named.items():
+        if spec.aggfunc == "size":
+            row[alias] = len(df)
+        else:
+            row[alias] = df[spec.column].agg(spec.aggfunc)
+    return pd.DataFrame([row])
+
+
+def _order(df, order_by):
+    if not order_by:
+        return df
+    _check_columns(df, [column for column, _ in order_by])
+    return df.sort_values([column for column, _ in order_by],
+                          ascending=[direction != "desc" for _, direction in order_by],
+                          kind="stable")
+
+
+def _check_columns(df, columns):
+    missing = [column for column in columns if column not in df.columns]
+    if missing:
+        raise QueryError(f"Unknown column(s): {missing}")
+
+
+def _strip_table(name):
+    return name.split(".", 1)[1] if "." in name else name
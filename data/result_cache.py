@@ -0,0 +1,97 @@
+"""
+Query result cache.
+
+Results are keyed by (fingerprints of the datasets a query reads, normalized
+query). A fingerprint changes whenever its dataset is re-ingested or
+appended to, so stale results can never be served; entries of a changed
+dataset are also dropped right away when the workspace reports the change.
+Eviction is LRU, bounded both by entry count and by total result size.
+Hit/miss/eviction counts go to shared.metrics under "query_cache.*".
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+from shared.metrics import metrics as default_metrics
+
+
+class QueryResultCache:
+
+    def __init__(self, max_entries=256, max_bytes=256 * 1024 * 1024, metrics=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.metrics = metrics or default_metrics
+        self._entries = OrderedDict()  # key -> (result, bytes, dataset names)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(fingerprints, plan):
+        """fingerprints: {dataset name: version string}; plan: bound query plan"""
+        return json.dumps([sorted(fingerprints.items()), plan], sort_keys=True, default=str)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                self.metrics.increment("query_cache.misses")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.metrics.increment("query_cache.hits")
+        # Shallow copy: with copy-on-write, callers cannot modify the cached frame
+        return entry[0].copy(deep=False)
+
+    def put(self, key, result, datasets):
+        size = int(result.memory_usage(deep=True, index=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (result.copy(deep=False), size, set(datasets))
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+                self.metrics.increment("query_cache.evictions")
+            self._update_gauges()
+
+    def invalidate_dataset(self, dataset_id):
+        """Drop every cached result that read this dataset"""
+        with self._lock:
+            stale = [key for key, (_, _, datasets) in self._entries.items()
+                     if dataset_id in datasets]
+            for key in stale:
+                self._bytes -= self._entries.pop(key)[1]
+            if stale:
+                self.metrics.increment("query_cache.invalidations", len(stale))
+            self._update_gauges()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._update_gauges()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _update_gauges(self):
+        self.metrics.set_gauge("query_cache.entries", len(self._entries))
+        self.metrics.set_gauge("query_cache.bytes", self._bytes)
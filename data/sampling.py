@@ -0,0 +1,455 @@
+"""
+Sampling helpers for the ingestion handlers.
+
+Instead of keeping the first N rows of a source, the samplers below look at
+every batch exactly once and keep a representative sample in bounded memory:
+
+- ReservoirSampler:  uniform random sample of k rows from a stream of batches
+- StratifiedSampler: per-value reservoirs on one column, allocated proportionally
+- HeadSampler:       the old "first N rows" behaviour (kept for comparison)
+- sample_sqlite_table: random rowid-range sampling directly inside SQLite
+"""
+
+import numpy as np
+import pandas as pd
+
+
+SAMPLING_METHODS = ("reservoir", "stratified", "head")
+STRATUM_HEADROOM = 2  # stratum reservoirs hold up to 2 x their current allocation
+MAX_STRATA = 1000  # distinct values before stratified sampling falls back to uniform
+
+
+# =============================================
+# 1. STREAMING SAMPLERS (One pass, bounded memory)
+# =============================================
+
+class ReservoirSampler:
+    """Uniform reservoir sample over a stream of DataFrame batches.
+
+    Every row gets a random key and the sampler keeps the k rows with the
+    smallest keys, which is a uniform sample without replacement. Memory
+    never exceeds k rows plus the current batch.
+    """
+
+    method = "reservoir"
+
+    def __init__(self, k, seed=None):
+        self.k = k
+        self.rng = np.random.default_rng(seed)
+        self.rows_seen = 0
+        self._sample = None
+        self._keys = np.empty(0)
+        self._positions = np.empty(0, dtype=np.int64)
+
+    def add_batch(self, batch):
+        """Feed the next batch of rows into the reservoir"""
+        n = len(batch)
+        if n == 0:
+            if self._sample is None:
+                self._sample = batch.reset_index(drop=True)  # keep the columns
+            return
+
+        keys = self.rng.random(n)
+        positions = np.arange(self.rows_seen, self.rows_seen + n, dtype=np.int64)
+        self.rows_seen += n
+
+        # Fast path: cheaply drop batch rows that can never enter a full reservoir
+        if self._sample is not None and len(self._keys) >= self.k:
+            threshold = self._keys.max()
+            keep = keys < threshold
+            if not keep.any():
+                return
+            batch, keys, positions = batch[keep], keys[keep], positions[keep]
+
+        batch = batch.reset_index(drop=True)
+        if self._sample is None:
+            combined = batch
+        else:
+            combined = pd.concat([self._sample, batch], ignore_index=True)
+        all_keys = np.concatenate([self._keys, keys])
+        all_positions = np.concatenate([self._positions, positions])
+
+        if len(all_keys) > self.k:
+            chosen = np.argpartition(all_keys, self.k - 1)[:self.k]
+            combined = combined.iloc[chosen].reset_index(drop=True)
+            all_keys = all_keys[chosen]
+            all_positions = all_positions[chosen]
+
+        self._sample = combined
+        self._keys = all_keys
+        self._positions = all_positions
+
+    def resize(self, k):
+        """Change the sample size; shrinking keeps the k smallest keys (still uniform)"""
+        self.k = k
+        if len(self._keys) > k:
+            chosen = np.argpartition(self._keys, k - 1)[:k]
+            self._sample = self._sample.iloc[chosen].reset_index(drop=True)
+            self._keys = self._keys[chosen]
+            self._positions = self._positions[chosen]
+
+    def result(self):
+        """Return the sample in original row order"""
+        if self._sample is None:
+            return pd.DataFrame()
+        order = np.argsort(self._positions, kind="stable")
+        return self._sample.iloc[order].reset_index(drop=True)
+
+    def summary(self):
+        return {
+            "method": self.method,
+            "rows_seen": self.rows_seen,
+            "sample_rows": 0 if self._sample is None else len(self._sample),
+        }
+
+
+class StratifiedSampler:
+    """Stratified sample on one column using one reservoir per stratum.
+
+    The k slots are split proportionally to the stratum sizes, with every
+    non-empty stratum getting at least one row while there are no more
+    strata than slots (beyond that the largest k strata get one row each),
+    so the sample never exceeds k rows. After every batch each reservoir
+    is shrunk to STRATUM_HEADROOM times its current allocation. The sample
+    stays exactly proportional unless a stratum's share of the rows more
+    than doubles after it was shrunk.
+
+    A column with more than max_strata distinct values (an id, a
+    timestamp) cannot be stratified usefully; a uniform reservoir that has
+    seen every row then takes over and the strata are dropped. Memory is
+    therefore bounded by 3k + max_strata rows whatever the column holds.
+    """
+
+    method = "stratified"
+
+    def __init__(self, k, column, seed=None, max_strata=MAX_STRATA):
+        self.k = k
+        self.column = column
+        self.seed = seed
+        self.max_strata = max_strata
+        self.rows_seen = 0
+        self.strata_capped = False
+        self._reservoirs = {}
+        self._counts = {}
+        self._uniform = ReservoirSampler(k, seed=seed)
+        self._empty = pd.DataFrame()
+
+    def add_batch(self, batch):
+        """Route each row of the batch to the reservoir of its stratum"""
+        if len(batch) == 0:
+            self._empty = batch.iloc[0:0]
+            return
+        if self.column not in batch.columns:
+            raise ValueError(f"Stratify column '{self.column}' not found")
+
+        self.rows_seen += len(batch)
+        self._uniform.add_batch(batch)
+        if self.strata_capped:
+            return
+        groups = batch.groupby(batch[self.column], dropna=False, sort=False)
+        for value, rows in groups:
+            key = _stratum_key(value)
+            if key not in self._reservoirs:
+                if len(self._reservoirs) >= self.max_strata:
+                    self.strata_capped = True  # the uniform reservoir has every row
+                    self._reservoirs, self._counts = {}, {}
+                    return
+                seed = None if self.seed is None else self.seed + len(self._reservoirs) + 1
+                self._reservoirs[key] = ReservoirSampler(self.k, seed=seed)
+                self._counts[key] = 0
+            self._reservoirs[key].add_batch(rows)
+            self._counts[key] += len(rows)
+
+        allocation = _allocate(self._counts, self.k)
+        for key, sampler in self._reservoirs.items():
+            sampler.resize(min(self.k, STRATUM_HEADROOM * allocation[key] + 1))
+
+    def result(self):
+        """Return the proportionally allocated sample in original row order"""
+        if self.strata_capped:
+            return self._uniform.result()
+        if not self._reservoirs:
+            return self._empty
+
+        allocation = _allocate(self._counts, self.k)
+        parts = []
+        for key, sampler in self._reservoirs.items():
+            take = allocation[key]
+            if take == 0:
+                continue
+            # Reservoir keys are uniform, so the smallest keys are a uniform subsample
+            chosen = np.argsort(sampler._keys, kind="stable")[:take]
+            part = sampler._sample.iloc[chosen].copy()
+            part["__position__"] = sampler._positions[chosen]
+            parts.append(part)
+
+        sample = pd.concat(parts, ignore_index=True)
+        sample = sample.sort_values("__position__", kind="stable")
+        return sample.drop(columns="__position__").reset_index(drop=True)
+
+    def rows_held(self):
+        """Rows currently kept in memory by all reservoirs"""
+        return len(self._uniform._keys) + sum(len(r._keys) for r in self._reservoirs.values())
+
+    def summary(self):
+        if self.strata_capped:
+            return dict(self._uniform.summary(), stratify_by=self.column,
+                        strata=f"more than {self.max_strata}")
+        return {
+            "method": self.method,
+            "rows_seen": self.rows_seen,
+            "sample_rows": sum(_allocate(self._counts, self.k).values()) if self._counts else 0,
+            "stratify_by": self.column,
+            "strata": len(self._counts),
+        }
+
+
+class HeadSampler:
+    """Keep the first k rows (the original truncation behaviour)"""
+
+    method = "head"
+
+    def __init__(self, k):
+        self.k = k
+        self.rows_seen = 0
+        self._parts = []
+        self._kept = 0
+
+    def add_batch(self, batch):
+        self.rows_seen += len(batch)
+        if self._kept < self.k:
+            part = batch.head(self.k - self._kept)
+            self._parts.append(part)
+            self._kept += len(part)
+
+    def is_full(self):
+        return self._kept >= self.k
+
+    def result(self):
+        if not self._parts:
+            return pd.DataFrame()
+        return pd.concat(self._parts, ignore_index=True)
+
+    def summary(self):
+        return {
+            "method": self.method,
+            "rows_seen": self.rows_seen,
+            "sample_rows": self._kept,
+        }
+
+
+def create_sampler(method, max_rows, stratify_by=None, seed=None):
+    """Build the sampler used by the handlers"""
+    if method not in SAMPLING_METHODS:
+        raise ValueError(
+            f"Unknown sampling method '{method}'. Use one of {SAMPLING_METHODS}")
+
+    if method == "stratified":
+        if not stratify_by:
+            raise ValueError("Stratified sampling needs a stratify_by column")
+        return StratifiedSampler(max_rows, stratify_by, seed=seed)
+    if method == "head":
+        return HeadSampler(max_rows)
+    return ReservoirSampler(max_rows, seed=seed)
+
+
+def sample_batches(batches, sampler, profiler=None, progress=None):
+    """Feed an iterator of batches into a sampler and return the sample
+
+    If a profiler is given it sees every batch too, so the profile covers
+    the whole source and not just the sample. progress, if given, is
+    called with the number of rows read so far after every batch.
+    """
+    rows_seen = 0
+    for batch in batches:
+        if profiler is not None:
+            profiler.update(batch)
+        sampler.add_batch(batch)
+        rows_seen += len(batch)
+        if progress is not None:
+            progress(rows_seen)
+        if isinstance(sampler, HeadSampler) and sampler.is_full():
+            break
+    return sampler.result()
+
+
+# =============================================
+# 2. SQLITE SAMPLING (Random rowid ranges)
+# =============================================
+
+def sample_sqlite_table(conn, table_name, k, seed=None, method="reservoir",
+                        stratify_by=None, batch_size=10000):
+    """Sample k rows from a SQLite table without reading the whole table.
+
+    Uniform sampling probes random rowids between min(rowid) and max(rowid)
+    and keeps the rows that exist, so only about k rows are read. Tables
+    without rowids (or stratified requests) fall back to a streaming sampler.
+
+    Returns (df, summary) where summary describes how the sample was taken.
+    """
+    quoted = _quote_identifier(table_name)
+
+    if method == "head":
+        df = pd.read_sql_query(f"SELECT * FROM {quoted} LIMIT {int(k)}", conn)
+        return df, {"method": "head", "rows_seen": len(df), "sample_rows": len(df)}
+
+    if method == "reservoir":
+        try:
+            low, high, total = conn.execute(
+                f"SELECT MIN(rowid), MAX(rowid), COUNT(*) FROM {quoted}").fetchone()
+        except Exception:
+            low = None  # WITHOUT ROWID table
+
+        if low is not None:
+            if total <= k:
+                df = pd.read_sql_query(f"SELECT * FROM {quoted}", conn)
+            else:
+                df = _sample_rowid_range(conn, quoted, low, high, total, k, seed)
+            return df, {"method": "rowid_range", "rows_seen": int(total),
+                        "sample_rows": len(df)}
+
+    sampler = create_sampler(method, k, stratify_by=stratify_by, seed=seed)
+    batches = pd.read_sql_query(
+        f"SELECT * FROM {quoted}", conn, chunksize=batch_size)
+    df = sample_batches(batches, sampler)
+    return df, sampler.summary()
+
+
+def _sample_rowid_range(conn, quoted, low, high, total, k, seed):
+    """Probe random rowids until k distinct existing rows are found"""
+    rng = np.random.default_rng(seed)
+    found = np.empty(0, dtype=np.int64)
+    density = total / (high - low + 1)
+
+    for _ in range(20):
+        missing = k - len(found)
+        if missing <= 0:
+            break
+        # Oversample to make up for gaps left by deleted rows
+        probes = int(missing / density * 1.2) + 16
+        candidates = rng.integers(low, high + 1, size=probes)
+        candidates = np.setdiff1d(candidates, found)
+        if len(candidates) == 0:
+            continue
+        existing = _existing_rowids(conn, quoted, candidates)
+        if len(existing) > missing:
+            existing = rng.choice(existing, size=missing, replace=False)
+        found = np.union1d(found, existing)
+
+    if len(found) < k:
+        # Very sparse rowids: let SQLite finish the job
+        extra = pd.read_sql_query(
+            f"SELECT rowid AS __rowid__ FROM {quoted} ORDER BY random() LIMIT {int(k)}", conn)
+        pool = np.setdiff1d(extra["__rowid__"].to_numpy(), found)
+        found = np.union1d(found, pool[:k - len(found)])
+
+    return _read_rowids(conn, quoted, found)
+
+
+def _existing_rowids(conn, quoted, candidates, chunk=900):
+    existing = []
+    for start in range(0, len(candidates), chunk):
+        ids = candidates[start:start + chunk].tolist()
+        placeholders = ",".join("?" * len(ids))
+        rows = conn.execute(
+            f"SELECT rowid FROM {quoted} WHERE rowid IN ({placeholders})", ids).fetchall()
+        existing.extend(row[0] for row in rows)
+    return np.array(existing, dtype=np.int64)
+
+
+def _read_rowids(conn, quoted, rowids, chunk=900):
+    parts = []
+    for start in range(0, len(rowids), chunk):
+        ids = rowids[start:start + chunk].tolist()
+        placeholders = ",".join("?" * len(ids))
+        parts.append(pd.read_sql_query(
+            f"SELECT * FROM {quoted} WHERE rowid IN ({placeholders}) ORDER BY rowid",
+            conn, params=ids))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+
+# =============================================
+# 3. COST ESTIMATES (Extrapolate from a probe)
+# =============================================
+
+def estimate_from_probe(probe_df, probe_bytes, probe_seconds, content_bytes, rows=None):
+    """Extrapolate rows, memory and read time of a source from a parsed probe
+
+    probe_df was parsed from the first probe_bytes of content_bytes in
+    probe_seconds. rows, if known exactly (file metadata), replaces the
+    estimate.
+    """
+    probe_rows = max(len(probe_df), 1)
+    if rows is None:
+        rows = int(content_bytes * probe_rows / max(probe_bytes, 1))
+    bytes_per_row = int(probe_df.memory_usage(deep=True, index=False).sum() / probe_rows) \
+        if len(probe_df) else 0
+    rows_per_second = probe_rows / max(probe_seconds, 1e-6)
+    return {
+        "rows": int(rows),
+        "content_bytes": int(content_bytes),
+        "bytes_per_row": bytes_per_row,
+        "memory_bytes": int(rows * bytes_per_row),
+        "rows_per_second": int(rows_per_second),
+        "parse_seconds": round(rows / rows_per_second, 3),
+        "probe_rows": len(probe_df),
+    }
+
+
+# =============================================
+# 4. HELPER METHODS (Supporting functions)
+# =============================================
+
+def _stratum_key(value):
+    """Make NaN/None usable as a dict key for its own stratum"""
+    try:
+        if pd.isna(value):
+            return "__null__"
+    except (TypeError, ValueError):
+        pass
+    return value
+
+
+def _allocate(counts, k):
+    """Split k slots proportionally to stratum sizes (largest remainder)
+
+    Every stratum gets at least one slot while there are at most k strata;
+    with more strata only the k largest get a slot. The total is never
+    more than k.
+    """
+    total = sum(counts.values())
+    if total <= k:
+        return dict(counts)
+
+    keys = list(counts)
+    sizes = np.array([counts[key] for key in keys], dtype=float)
+    if len(keys) >= k:
+        alloc = np.zeros(len(keys), dtype=int)
+        alloc[np.argsort(-sizes, kind="stable")[:k]] = 1
+        return dict(zip(keys, alloc.tolist()))
+
+    exact = sizes / total * k
+    alloc = np.minimum(np.maximum(np.floor(exact), 1), sizes).astype(int)
+
+    # Hand out (or take back) leftover slots by largest remainder. Both
+    # loops end: total > k leaves room to add, and fewer strata than k
+    # means some stratum has more than one slot to take back.
+    remainder = exact - np.floor(exact)
+    diff = k - int(alloc.sum())
+    order = np.argsort(-remainder, kind="stable")
+    while diff > 0:
+        for j in order:
+            if diff > 0 and alloc[j] < sizes[j]:
+                alloc[j] += 1
+                diff -= 1
+    while diff < 0:
+        for j in order[::-1]:
+            if diff < 0 and alloc[j] > 1:
+                alloc[j] -= 1
+                diff += 1
+
+    return dict(zip(keys, alloc.tolist()))
+
+
+def _quote_identifier(name):
+    return '"' + str(name).replace('"', '""') + '"'
@@ -0,0 +1,318 @@
+"""
+Semantic index over ingested datasets and their columns.
+
+With hundreds of datasets an agent cannot put every schema in its prompt.
+The index finds the columns (or datasets) that match a question, so only
+those few schemas need to be sent to the model:
+
+- Every column becomes a small document: its name split into words
+  ("CustomerEmail", "customer_email" -> customer, email), the dataset and
+  table names, a word for its type and sample values from the profile
+- Words and character trigrams (so "cust" still finds "customer") are
+  hashed with crc32, which keeps the index compact and stable across
+  processes, and weighted with TF-IDF
+- A search scores only the documents that share a term with the question
+  (an inverted index), so it takes milliseconds even for many thousands
+  of columns, and the scores are exact cosine similarities
+
+Everything is computed locally (numpy only) - no model, no network.
+Adding a dataset only tokenizes that dataset; the postings are rebuilt
+lazily on the next search. With a path the index is kept in an .npz file
+and survives restarts.
+"""
+
+import json
+import os
+import re
+import threading
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+
+NAME_WEIGHT = 3.0  # words of the column name count most
+TRIGRAM_WEIGHT = 0.5
+CONTEXT_WEIGHT = 1.0  # dataset, table and type words
+VALUE_WEIGHT = 0.5
+MAX_VALUES = 20  # sample values per column
+MAX_VALUE_CHARS = 60
+
+_WORD = re.compile(r"[a-z]+|\d+")
+_CAMEL = re.compile(r"([a-z0-9])([A-Z])")
+_TYPE_WORDS = (("int", "numeric number integer"), ("float", "numeric number decimal"),
+               ("datetime", "date time timestamp"), ("bool", "boolean flag"),
+               ("", "text string"))
+
+
+# =============================================
+# 1. SEMANTIC INDEX (Documents, postings, search)
+# =============================================
+
+class SemanticIndex:
+
+    def __init__(self, path=None):
+        """path: .npz file the index is loaded from and saved to (None: memory only)"""
+        self.path = Path(path) if path else None
+        self._docs = []
+        self._lock = threading.Lock()
+        self._postings = None  # rebuilt lazily after a change
+        if self.path is not None and self.path.exists():
+            try:
+                self._load()
+            except (OSError, ValueError, KeyError):
+                self._docs = []  # a corrupt index is rebuilt by the next ingestions
+
+    def add_dataset(self, dataset_id, schema, df=None, source_file=None):
+        """Index a dataset and its columns; replaces an earlier version of the same source
+
+        Sample values come from the schema's profile, or from df when there is none.
+        Re-ingesting source_file (a new dataset id) replaces its old entries.
+        """
+        source_file = _source_key(source_file or schema.get("source_file"))
+        tables = schema.get("tables_found") or []
+        profile = (schema.get("profile") or {}).get("columns", {})
+        dtypes = schema.get("data_types", {})
+        columns = [str(col) for col in schema.get("columns", [])]
+
+        context = _words(dataset_id) + [word for table in tables for word in _words(table)]
+        docs = [_document("dataset", dataset_id, None, None, source_file,
+                          [(context, NAME_WEIGHT),
+                           ([word for col in columns for word in _words(col)], CONTEXT_WEIGHT)])]
+        for col in columns:
+            dtype = str(dtypes.get(col, profile.get(col, {}).get("dtype", "")))
+            values = _sample_values(profile.get(col), df, col)
+            docs.append(_document("column", dataset_id, col, dtype, source_file, [
+                (_words(col), NAME_WEIGHT),
+                (_trigrams(_words(col)), TRIGRAM_WEIGHT),
+                (context + _type_words(dtype), CONTEXT_WEIGHT),
+                ([word for value in values for word in _words(value)], VALUE_WEIGHT),
+            ]))
+
+        with self._lock:
+            self._docs = [doc for doc in self._docs
+                          if doc["dataset_id"] != dataset_id
+                          and (source_file is None or doc["source_file"] != source_file)]
+            self._docs.extend(docs)
+            self._postings = None
+            self._save()
+        return len(docs) - 1
+
+    def remove_dataset(self, dataset_id):
+        with self._lock:
+            self._docs = [doc for doc in self._docs if doc["dataset_id"] != dataset_id]
+            self._postings = None
+            self._save()
+
+    def search(self, query, k=10, kind="column", dataset_ids=None):
+        """The k documents most similar to query, best first
+
+        kind:         "column", "dataset" or None for both
+        dataset_ids:  only search these datasets
+        Each result is a dict with kind, dataset_id, column, dtype,
+        source_file and score (cosine similarity, 0..1).
+        """
+        with self._lock:
+            if self._postings is None:
+                self._postings = _build_postings(self._docs)
+            docs, postings = self._docs, self._postings
+        if not docs:
+            return []
+
+        features, weights = _vector([(_words(query), NAME_WEIGHT),
+                                     (_trigrams(_words(query)), TRIGRAM_WEIGHT)])
+        if not len(features):
+            return []
+        idf = postings["idf_default"] * np.ones(len(features))
+        slots = np.searchsorted(postings["features"], features)
+        slots[slots == len(postings["features"])] = 0
+        known = postings["features"][slots] == features
+        idf[known] = postings["idf"][slots[known]]
+        query_weights = weights * idf
+
+        # Accumulate dot products from the postings of the query terms only
+        doc_ids, contributions = [], []
+        for slot, weight in zip(slots[known], query_weights[known]):
+            start, end = postings["starts"][slot], postings["starts"][slot + 1]
+            doc_ids.append(postings["docs"][start:end])
+            contributions.append(postings["weights"][start:end] * weight)
+        if not doc_ids:
+            return []
+        scores = np.bincount(np.concatenate(doc_ids), np.concatenate(contributions),
+                             minlength=len(docs))
+        scores /= postings["norms"] * np.sqrt(np.dot(query_weights, query_weights))
+
+        allowed = scores > 0
+        if kind is not None:
+            allowed &= postings["kinds"] == (kind == "column")
+        if dataset_ids is not None:
+            allowed &= np.isin(postings["dataset_ids"], list(dataset_ids))
+        candidates = np.flatnonzero(allowed)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [dict(docs[i]["meta"], score=round(float(scores[i]), 4)) for i in candidates]
+
+    def datasets(self):
+        """Indexed dataset ids"""
+        with self._lock:
+            return [doc["dataset_id"] for doc in self._docs if doc["meta"]["kind"] == "dataset"]
+
+    def __len__(self):
+        """Number of indexed columns"""
+        with self._lock:
+            return sum(1 for doc in self._docs if doc["meta"]["kind"] == "column")
+
+    # ----- persistence -----
+
+    def _save(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lengths = [len(doc["features"]) for doc in self._docs]
+        tmp = self.path.with_name(self.path.name + ".tmp.npz")
+        np.savez(tmp,
+                 features=_concat([doc["features"] for doc in self._docs], np.uint32),
+                 weights=_concat([doc["weights"] for doc in self._docs], np.float32),
+                 lengths=np.array(lengths, dtype=np.int64),
+                 meta=np.array(json.dumps([doc["meta"] for doc in self._docs])))
+        os.replace(tmp, self.path)
+
+    def _load(self):
+        with np.load(self.path, allow_pickle=False) as data:
+            metas = json.loads(str(data["meta"]))
+            bounds = np.concatenate([[0], np.cumsum(data["lengths"])])
+            features, weights = data["features"], data["weights"]
+        self._docs = [{"meta": meta, "dataset_id": meta["dataset_id"],
+                       "source_file": meta["source_file"],
+                       "features": features[bounds[i]:bounds[i + 1]],
+                       "weights": weights[bounds[i]:bounds[i + 1]]}
+                      for i, meta in enumerate(metas)]
+
+
+# =============================================
+# 2. AGENT SUPPORT (Matches -> prompt context)
+# =============================================
+
+def format_matches(matches):
+    """Compact lines describing search results, for an LLM prompt"""
+    lines = []
+    for match in matches:
+        if match["kind"] == "column":
+            dtype = f" ({match['dtype']})" if match["dtype"] else ""
+            lines.append(f"- {match['dataset_id']}.{match['column']}{dtype}")
+        else:
+            lines.append(f"- dataset {match['dataset_id']}"
+                         + (f" from {match['source_file']}" if match["source_file"] else ""))
+    return "\n".join(lines)
+
+
+# =============================================
+# HELPER METHODS (Supporting functions)
+# =============================================
+
+def _document(kind, dataset_id, column, dtype, source_file, fields):
+    features, weights = _vector(fields)
+    return {"meta": {"kind": kind, "dataset_id": dataset_id, "column": column,
+                     "dtype": dtype, "source_file": source_file},
+            "dataset_id": dataset_id, "source_file": source_file,
+            "features": features, "weights": weights}
+
+
+def _vector(fields):
+    """Hashed term weights of [(words, weight), ...]; features sorted and unique"""
+    totals = {}
+    for words, weight in fields:
+        for word in words:
+            feature = zlib.crc32(word.encode("utf-8"))
+            totals[feature] = totals.get(feature, 0.0) + weight
+    features = np.array(sorted(totals), dtype=np.uint32)
+    weights = np.array([totals[f] for f in features.tolist()], dtype=np.float32)
+    return features, weights
+
+
+def _build_postings(docs):
+    """Inverted index: for every feature, the documents containing it"""
+    lengths = np.array([len(doc["features"]) for doc in docs], dtype=np.int64)
+    features = _concat([doc["features"] for doc in docs], np.uint32)
+    weights = _concat([doc["weights"] for doc in docs], np.float32).astype(np.float64)
+    doc_ids = np.repeat(np.arange(len(docs)), lengths)
+
+    order = np.argsort(features, kind="stable")
+    unique, starts, counts = np.unique(features[order], return_index=True, return_counts=True)
+    idf = np.log((1 + len(docs)) / (1 + counts)) + 1.0
+
+    # Document norms with the current idf (features are unique within a document)
+    entry_idf = np.repeat(idf, counts)
+    sorted_weights = weights[order] * entry_idf
+    norms = np.sqrt(np.bincount(doc_ids[order], sorted_weights ** 2, minlength=len(docs)))
+    norms[norms == 0] = 1.0
+    return {
+        "features": unique,
+        "starts": np.append(starts, len(features)),
+        "docs": doc_ids[order],
+        "weights": sorted_weights,
+        "idf": idf,
+        "idf_default": np.log(1 + len(docs)) + 1.0,  # a term no document has
+        "norms": norms,
+        "kinds": np.array([doc["meta"]["kind"] == "column" for doc in docs], dtype=bool),
+        "dataset_ids": np.array([doc["dataset_id"] for doc in docs], dtype=object),
+    }
+
+
+def _words(text):
+    """Lowercase words of a name or value: CustomerEmail / customer_emails -> customer, email"""
+    text = _CAMEL.sub(r"\1 \2", str(text)).lower()
+    words = []
+    for word in _WORD.findall(text):
+        if word.isdigit():
+            continue
+        if len(word) > 4 and word.endswith("ies"):
+            word = word[:-3] + "y"
+        elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def _trigrams(words):
+    grams = []
+    for word in words:
+        padded = f"#{word}#"
+        grams.extend("#3" + padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _type_words(dtype):
+    dtype = dtype.lower()
+    for marker, words in _TYPE_WORDS:
+        if marker in dtype:
+            return words.split()
+    return []
+
+
+def _sample_values(column_profile, df, col):
+    """A few text values of a column (numbers carry no meaning by themselves)"""
+    if column_profile and column_profile.get("top_values"):
+        values = [value for value, _ in column_profile["top_values"]]
+    elif df is not None and col in df.columns and not _is_numeric(df[col]):
+        values = df[col].head(1000).dropna().drop_duplicates().head(MAX_VALUES).tolist()
+    else:
+        return []
+    return [str(value)[:MAX_VALUE_CHARS] for value in values[:MAX_VALUES]
+            if isinstance(value, str)]
+
+
+def _is_numeric(series):
+    import pandas as pd
+    return pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)
+
+
+def _source_key(source_file):
+    if not source_file:
+        return None
+    return str(Path(source_file).resolve()) if os.path.exists(str(source_file)) else str(source_file)
+
+
+def _concat(arrays, dtype):
+    return np.concatenate(arrays).astype(dtype, copy=False) if arrays else np.zeros(0, dtype=dtype)
@@ -0,0 +1,192 @@
+"""
+Content sniffing: work out what a file is from its first few KB.
+
+sniff_source() looks at magic bytes (SQLite, Parquet, Arrow, compressed
+streams), tells JSON documents from JSON Lines, and infers the CSV dialect
+(delimiter, quote character, header row, encoding). It returns a source
+descriptor with the parse options the handler should use, so mislabeled
+files are routed to the right handler and parsed correctly the first time.
+Only sample_bytes are ever read (decompressed, for compressed files), so
+sniffing costs the same for a 1 KB and a 10 GB file.
+
+Only the standard library is used, to keep detection cheap to import.
+"""
+
+import csv
+import json
+
+from data.compression import (MAGIC_BYTES, detect_compression, open_decompressed,
+                              strip_compression_suffix)
+
+
+SAMPLE_BYTES = 8192
+
+BINARY_MAGIC = [
+    (b"SQLite format 3\x00", "sqlite"),
+    (b"PAR1", "parquet"),
+    (b"ARROW1", "arrow"),
+]
+
+CSV_DELIMITERS = ",;\t|"
+
+MONGO_SCHEMES = ("mongodb://", "mongodb+srv://")
+
+
+def source_type_from_extension(file_path):
+    """Source type implied by the file name alone"""
+    inner_path = strip_compression_suffix(file_path).lower()
+    compressed = inner_path != str(file_path).lower()
+    if inner_path.endswith('.csv'):
+        return "csv"
+    if inner_path.endswith(('.json', '.jsonl')):
+        return "json"
+    if compressed:
+        return "unknown"  # databases and columnar files need random access
+    if inner_path.endswith(('.db', '.sqlite', '.sqlite3')):
+        return "sqlite"
+    if inner_path.endswith(('.parquet', '.pq')):
+        return "parquet"
+    if inner_path.endswith(('.feather', '.arrow', '.ipc')):
+        return "arrow"
+    return "unknown"
+
+
+def sniff_source(file_path, sample_bytes=SAMPLE_BYTES):
+    """Describe a file: source type, compression and parse options
+
+    Returns a dict like
+        {"source_type": "csv", "compression": "gzip", "detected_by": "content",
+         "parse_options": {"sep": ";", "quotechar": '"', "header": 0, "encoding": "utf-8"}}
+    Files that do not exist (or whose content says nothing) fall back to the
+    extension, with detected_by "extension". MongoDB connection URIs are
+    recognized by their scheme (source type "mongodb", detected_by "uri").
+    """
+    file_path = str(file_path)
+    descriptor = {
+        "source_type": source_type_from_extension(file_path),
+        "compression": None,
+        "detected_by": "extension",
+        "parse_options": {},
+    }
+    if file_path.lower().startswith(MONGO_SCHEMES):
+        descriptor.update(source_type="mongodb", detected_by="uri")
+        return descriptor
+    try:
+        with open(file_path, "rb") as f:
+            head = f.read(sample_bytes)
+    except OSError:
+        return descriptor
+    if not head:
+        return descriptor
+
+    for magic, source_type in BINARY_MAGIC:
+        if head.startswith(magic):
+            descriptor.update(source_type=source_type, detected_by="content")
+            return descriptor
+
+    if any(head.startswith(magic) for magic, _ in MAGIC_BYTES):
+        descriptor["compression"] = detect_compression(file_path)
+        with open_decompressed(file_path, read_ahead=False, workers=1, use_arrow=False) as stream:
+            head = stream.read(sample_bytes)
+        if not head:
+            return descriptor
+
+    text, encoding = _decode(head)
+    if text is None:
+        return descriptor  # binary we do not know: let the extension decide
+
+    stripped = text.lstrip()
+    if stripped[:1] in ("{", "["):
+        lines = stripped[:1] == "{" and _first_line_is_json(stripped)
+        descriptor.update(source_type="json", detected_by="content",
+                          parse_options={"lines": lines, "encoding": encoding})
+        return descriptor
+
+    options = _sniff_csv(text, truncated=len(head) >= sample_bytes)
+    if options is not None:
+        options["encoding"] = encoding
+        descriptor.update(source_type="csv", detected_by="content", parse_options=options)
+    return descriptor
+
+
+# =============================================
+# HELPER METHODS (Supporting functions)
+# =============================================
+
+def _decode(head):
+    """(text, encoding) of a sample, or (None, None) if it looks binary"""
+    if head.startswith(b"\xef\xbb\xbf"):
+        return head[3:].decode("utf-8", errors="ignore"), "utf-8-sig"
+    if head.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return head.decode("utf-16", errors="ignore").lstrip("\ufeff"), "utf-16"
+    if b"\x00" in head:
+        return None, None
+    # The sample may end in the middle of a multi-byte character
+    for cut in range(4):
+        try:
+            return head[:len(head) - cut].decode("utf-8"), "utf-8"
+        except UnicodeDecodeError:
+            continue
+    return head.decode("latin-1"), "latin-1"
+
+
+def _first_line_is_json(text):
+    first_line = text.split("\n", 1)[0].strip()
+    try:
+        return isinstance(json.loads(first_line), dict)
+    except ValueError:
+        return False
+
+
+def _sniff_csv(text, truncated):
+    """CSV parse options, or None if the text does not look like a table"""
+    lines = text.splitlines()
+    if truncated and len(lines) > 1:
+        lines = lines[:-1]  # the last line may be cut off
+    lines = [line for line in lines if line.strip()]
+    if not lines:
+        return None
+    sample = "\n".join(lines[:50])
+
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS)
+        delimiter, quotechar = dialect.delimiter, dialect.quotechar or '"'
+    except csv.Error:
+        # Too few rows to be sure: take the delimiter every line has equally often
+        counts = {d: [line.count(d) for line in lines[:50]] for d in CSV_DELIMITERS}
+        consistent = [d for d, c in counts.items() if c[0] > 0 and len(set(c)) == 1]
+        if not consistent:
+            return None  # plain text (or a one-column CSV, left to the extension)
+        delimiter, quotechar = consistent[0], '"'
+
+    rows = list(csv.reader(lines[:50], delimiter=delimiter, quotechar=quotechar))
+    return {
+        "sep": delimiter,
+        "quotechar": quotechar,
+        "header": 0 if _has_header(rows, sample) else None,
+    }
+
+
+def _has_header(rows, sample):
+    if len(rows) < 2:
+        return True
+    first, rest = rows[0], rows[1:]
+    # A header cell is a non-numeric name; a column of numbers under it is telling
+    if any(_is_number(cell) for cell in first if cell.strip()):
+        return False
+    if any(all(_is_number(row[i]) for row in rest if len(row) > i and row[i].strip())
+           and any(len(row) > i and row[i].strip() for row in rest)
+           for i in range(len(first))):
+        return True
+    try:
+        return csv.Sniffer().has_header(sample)
+    except csv.Error:
+        return True
+
+
+def _is_number(cell):
+    try:
+        float(cell)
+        return True
+    except ValueError:
+        return False
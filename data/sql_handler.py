@@ -3,6 +3,12 @@ import sqlite3
 import uuid
 from pathlib import Path
 
+from data.datetime_inference import dataset_fingerprint, parse_datetime_columns
+from data.dedup import Deduplicator
+from data.profiling import DatasetProfiler
+from data.quality_rules import create_quality_checker
+from data.sampling import estimate_from_probe, sample_sqlite_table
+
 
 class SQLHandler:
 
@@ -14,13 +20,14 @@ class SQLHandler:
     # 1. VALIDATION METHODS (Check before you do)
     # =============================================
 
-    def validate_sqlite_file(self, db_path):
+    def validate_sqlite_file(self, db_path, descriptor=None):
         """Check if the SQLite database is valid before processing"""
         try:
             if not Path(db_path).exists():
                 return False, "Database file does not exist"
 
-            if not db_path.lower().endswith(('.db', '.sqlite', '.sqlite3')):
+            sniffed_sqlite = descriptor is not None and descriptor["source_type"] == "sqlite"
+            if not (sniffed_sqlite or db_path.lower().endswith(('.db', '.sqlite', '.sqlite3'))):
                 return False, "File must be a SQLite database"
 
             file_size = Path(db_path).stat().st_size
@@ -45,8 +52,23 @@ class SQLHandler:
     # 2. PROCESSING METHODS (The main work)
     # =============================================
 
-    def process_sqlite_file(self, db_path):
-        """Process SQLite file - find tables and read data"""
+    def process_sqlite_file(self, db_path, max_rows_per_table=1000,
+                            sample_method="reservoir", stratify_by=None, seed=None,
+                            profile=True, max_tables=3, progress=None, dedup=None,
+                            quality=None):
+        """Process SQLite file - find tables and read a sample of each one
+
+        Tables are sampled inside SQLite (random rowid ranges) so only about
+        max_rows_per_table rows are read, whatever the table size. With
+        profile=True each table sample is profiled on its own (so shorter
+        tables are not padded with nulls). max_tables=None reads every table.
+        progress is called after each table with the rows the tables
+        sampled so far hold. dedup (True, or key column names) counts the
+        duplicates of each table in SQL and drops them from its sample;
+        tables without the key columns are left alone. quality rules are
+        checked on the rule columns of each whole table before it is
+        sampled; referential rules can name another table of the database.
+        """
         try:
             conn = sqlite3.connect(db_path)
 
@@ -60,24 +82,50 @@ class SQLHandler:
             table_names = tables_df['name'].tolist()
 
             # Step 2: Limit to max 3 tables for simplicity
-            if len(table_names) > 3:
-                table_names = table_names[:3]
+            if max_tables is not None and len(table_names) > max_tables:
+                table_names = table_names[:max_tables]
                 print(
-                    f"📋 Found {len(tables_df)} tables, using first 3: {table_names}")
+                    f"📋 Found {len(tables_df)} tables, using first {max_tables}: {table_names}")
             else:
                 print(f"📋 Found {len(table_names)} tables: {table_names}")
 
             # Step 3: Read tables and combine simply
             all_dataframes = []
+            sampling = {}
+            profiles = {}
+            datetime_formats = {}
+            deduplication = {}
+            rows_seen = 0
+            checker = create_quality_checker(quality)
 
             for table_name in table_names:
-                # Read max 1000 rows per table
-                query = f"SELECT * FROM {table_name} LIMIT 1000"
-                df = pd.read_sql_query(query, conn)
+                if checker is not None:
+                    checker.check_sqlite_table(conn, table_name)
+
+                # Sample max_rows_per_table rows per table
+                method = sample_method
+                if method == "stratified" and stratify_by not in self._table_columns(conn, table_name):
+                    method = "reservoir"
+                df, sampling[table_name] = sample_sqlite_table(
+                    conn, table_name, max_rows_per_table, seed=seed,
+                    method=method, stratify_by=stratify_by)
+                rows_seen += sampling[table_name]["rows_seen"]
+                if progress is not None:
+                    progress(rows_seen)
+                if dedup:
+                    df, deduplication[table_name] = self._deduplicate(conn, table_name, df, dedup)
+
+                # Date/time TEXT columns become datetime64
+                df, formats = parse_datetime_columns(df, dataset_fingerprint(db_path, table_name))
+                datetime_formats.update({f"{table_name}_{col}": fmt for col, fmt in formats.items()})
 
                 # Add table name as prefix to columns
                 df = df.add_prefix(f"{table_name}_")
                 all_dataframes.append(df)
+                if profile:
+                    profiler = DatasetProfiler()
+                    profiler.update(df)
+                    profiles.update(profiler.to_dict()["columns"])
 
                 print(
                     f"   📊 {table_name}: {len(df)} rows, {len(df.columns)} columns")
@@ -88,7 +136,20 @@ class SQLHandler:
             else:
                 combined_df = pd.concat(all_dataframes, axis=1, sort=False)
 
-            schema = self._get_basic_schema(combined_df, table_names)
+            schema = self._get_basic_schema(
+                combined_df, table_names, max_rows_per_table)
+            schema["sampling"] = sampling
+            schema["datetime_formats"] = datetime_formats
+            if dedup:
+                schema["deduplication"] = deduplication
+            if checker is not None:
+                schema["quality"] = checker.summary()
+                checker.close()
+            if profile:
+                schema["profile"] = {
+                    "rows_profiled": sum(len(df) for df in all_dataframes),
+                    "columns": profiles,
+                }
             conn.close()
 
             print(
@@ -98,6 +159,63 @@ class SQLHandler:
         except Exception as e:
             raise ValueError(f"Failed to process SQLite file: {str(e)}")
 
+    def read_table(self, db_path, table_name, columns=None, filters=None):
+        """Read one table, letting SQLite do the column selection and filtering
+
+        filters is a list of [column, op, value] conditions (see
+        data/query_engine.py); they are turned into a parameterized WHERE.
+        """
+        select = ", ".join(self._quote(c) for c in columns) if columns else "*"
+        query = f"SELECT {select} FROM {self._quote(table_name)}"
+        where, params = self._build_where(filters or [])
+        if where:
+            query += f" WHERE {where}"
+
+        conn = sqlite3.connect(db_path)
+        try:
+            return pd.read_sql_query(query, conn, params=params)
+        finally:
+            conn.close()
+
+    def preview(self, db_path, descriptor=None, rows=100, max_tables=3):
+        """The first rows of each table and an estimated schema
+
+        Reads rows rows per table (LIMIT, no sampling) and takes the row
+        counts from the rowid range, so the cost does not depend on the
+        size of the tables.
+        """
+        conn = sqlite3.connect(db_path)
+        try:
+            table_names = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")]
+            if not table_names:
+                raise ValueError("No tables found in SQLite database")
+            if max_tables is not None:
+                table_names = table_names[:max_tables]
+            frames, formats, estimated_rows = [], {}, 0
+            for table_name in table_names:
+                df = pd.read_sql_query(
+                    f"SELECT * FROM {self._quote(table_name)} LIMIT {int(rows)}", conn)
+                df, table_formats = parse_datetime_columns(df)
+                formats.update({f"{table_name}_{col}": fmt for col, fmt in table_formats.items()})
+                frames.append(df.add_prefix(f"{table_name}_"))
+                estimated_rows += self._estimated_rows(conn, table_name)
+        finally:
+            conn.close()
+
+        df = frames[0] if len(frames) == 1 else pd.concat(frames, axis=1, sort=False)
+        schema = self._get_basic_schema(df, table_names, rows)
+        schema.update(preview=True, estimated_rows=estimated_rows, datetime_formats=formats)
+        return df, schema
+
+    def get_table_columns(self, db_path, table_name):
+        """List the columns of a table without reading any rows"""
+        conn = sqlite3.connect(db_path)
+        try:
+            return self._table_columns(conn, table_name)
+        finally:
+            conn.close()
+
     # =============================================
     # 3. UTILITY METHODS (Smaller helpers)
     # =============================================
@@ -108,11 +226,117 @@ class SQLHandler:
         short_uuid = str(uuid.uuid4())[:8]
         return f"sqlite_{filename}_{short_uuid}"
 
+    def estimate_ingestion(self, db_path, descriptor=None, probe_rows=5000):
+        """Estimate rows, memory and read time per table from the catalog
+
+        Row counts come from sqlite_stat1 (after ANALYZE) or the rowid
+        range, both without scanning the table; the first probe_rows rows
+        of each table give the width and read rate.
+        """
+        import time
+
+        conn = sqlite3.connect(db_path)
+        try:
+            names = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")]
+            stats = {}
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name='sqlite_stat1'").fetchone():
+                for table, stat in conn.execute("SELECT tbl, stat FROM sqlite_stat1"):
+                    stats.setdefault(table, int(str(stat).split()[0]))
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+
+            tables = {}
+            for name in names:
+                quoted = self._quote(name)
+                rows = stats.get(name)
+                if rows is None:
+                    rows = self._estimated_rows(conn, name)
+                start = time.perf_counter()
+                probe = pd.read_sql_query(f"SELECT * FROM {quoted} LIMIT {int(probe_rows)}", conn)
+                probe, _ = parse_datetime_columns(probe)
+                seconds = time.perf_counter() - start
+                tables[name] = estimate_from_probe(probe, 1, seconds, 0, rows=rows)
+        finally:
+            conn.close()
+
+        total_rows = sum(t["rows"] for t in tables.values())
+        parse_seconds = sum(t["parse_seconds"] for t in tables.values())
+        return {
+            "rows": total_rows,
+            "content_bytes": page_size * page_count,
+            "bytes_per_row": int(sum(t["memory_bytes"] for t in tables.values()) / max(total_rows, 1)),
+            "memory_bytes": sum(t["memory_bytes"] for t in tables.values()),
+            "rows_per_second": int(total_rows / parse_seconds) if parse_seconds else 0,
+            "parse_seconds": round(parse_seconds, 3),
+            "bytes_on_disk": Path(db_path).stat().st_size,
+            "tables": tables,
+            "by": "sqlite_stat1" if stats else "catalog",
+        }
+
     # =============================================
     # 4. HELPER METHODS (Supporting functions)
     # =============================================
 
-    def _get_basic_schema(self, df, table_names):
+    def _table_columns(self, conn, table_name):
+        """List the column names of a table"""
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({self._quote(table_name)})")]
+
+    def _quote(self, name):
+        return '"' + str(name).replace('"', '""') + '"'
+
+    def _build_where(self, filters):
+        """Turn [column, op, value] conditions into SQL and parameters"""
+        clauses, params = [], []
+        for column, op, value in filters:
+            column = self._quote(column)
+            if op in ("=", "!=", "<", "<=", ">", ">="):
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+            elif op == "in":
+                clauses.append(f"{column} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            elif op == "between":
+                clauses.append(f"{column} BETWEEN ? AND ?")
+                params.extend(value)
+            elif op == "like":
+                clauses.append(f"{column} LIKE ?")
+                params.append(value)
+            elif op == "is_null":
+                clauses.append(f"{column} IS NULL")
+            elif op == "not_null":
+                clauses.append(f"{column} IS NOT NULL")
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+        return " AND ".join(clauses), params
+
+    def _deduplicate(self, conn, table_name, df, dedup):
+        """Count a table's duplicate rows in SQL and drop them from its sample"""
+        keys = None if dedup is True else [dedup] if isinstance(dedup, str) else list(dedup)
+        columns = self._table_columns(conn, table_name)
+        if keys is not None and not set(keys) <= set(columns):
+            return df, {"skipped": f"no key columns {keys}"}
+        select = ", ".join(self._quote(c) for c in (keys or columns))
+        quoted = self._quote(table_name)
+        total, distinct = conn.execute(
+            f"SELECT (SELECT COUNT(*) FROM {quoted}), "
+            f"(SELECT COUNT(*) FROM (SELECT DISTINCT {select} FROM {quoted}))").fetchone()
+        deduplicator = Deduplicator(keys)
+        df = deduplicator.filter_batch(df)
+        summary = deduplicator.summary()
+        summary.update(table_rows=total, table_duplicates=total - distinct)
+        return df, summary
+
+    def _estimated_rows(self, conn, table_name):
+        """Row count from the rowid range (an index lookup, not a scan)"""
+        quoted = self._quote(table_name)
+        try:
+            low, high = conn.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {quoted}").fetchone()
+            return 0 if low is None else high - low + 1
+        except sqlite3.OperationalError:  # WITHOUT ROWID table
+            return conn.execute(f"SELECT COUNT(*) FROM {quoted}").fetchone()[0]
+
+    def _get_basic_schema(self, df, table_names, max_rows_per_table=1000):
         """Extract basic information about the combined data"""
         schema = {
             "columns": list(df.columns),
@@ -120,7 +344,7 @@ class SQLHandler:
             "total_columns": len(df.columns),
             "data_types": {},
             "tables_found": table_names,
-            "note": f"Data from {len(table_names)} tables, max 1000 rows each"
+            "note": f"Data from {len(table_names)} tables, max {max_rows_per_table} sampled rows each"
         }
 
         for col in df.columns:
@@ -0,0 +1,157 @@
+"""
+Load test for the local ingestion service (agents/ingestion_service.py).
+
+Clients send POST /ingest at increasing concurrency; every level reports
+p50/p99 latency, throughput and how many requests were turned away with
+503 (backpressure). For comparison the same file is also ingested the old
+way: a fresh Python process per request.
+
+    python load_test_service.py                       # starts a service in-process
+    python load_test_service.py --no-cache            # every request really ingests
+    python load_test_service.py --url http://127.0.0.1:8765 --file data/sales.csv
+
+The generated CSV goes to the system temp directory (or --out DIR), not
+into the repo; a separately started service must be allowed to read it
+(its --root), or be given --file.
+"""
+
+import argparse
+import http.client
+import json
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+ROOT = Path(__file__).parent
+BENCH_DIR = Path(tempfile.gettempdir()) / "ingestion_bench"
+
+
+def make_test_file(rows, out_dir=BENCH_DIR):
+    """A sales CSV with a date column (reused if it exists)"""
+    import numpy as np
+    import pandas as pd
+
+    path = Path(out_dir) / f"service_sales_{rows}.csv"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        rng = np.random.default_rng(0)
+        pd.DataFrame({
+            "id": np.arange(rows),
+            "amount": rng.random(rows) * 100,
+            "region": rng.choice(["North", "South", "East", "West"], rows),
+            "sold": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 10**7, rows), unit="s"),
+        }).to_csv(path, index=False)
+    return path
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+def cold_process_latency(file_path, runs):
+    """Seconds per request when every request starts a new Python process"""
+    code = ("import contextlib, io, sys\n"
+            "from agents.ingestion import ingest_data_file\n"
+            "from shared.state import create_initial_state\n"
+            "with contextlib.redirect_stdout(io.StringIO()):\n"
+            f"    state = ingest_data_file({str(file_path)!r}, create_initial_state())\n"
+            "sys.exit(state['status'] != 'completed')\n")
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run_level(url, file_path, concurrency, requests_per_client, cache):
+    """Run one concurrency level; returns latencies (s), status counts and wall time"""
+    target = urlparse(url)
+    body = json.dumps({"file_path": str(file_path), "cache": cache}).encode("utf-8")
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+
+    def client():
+        conn = http.client.HTTPConnection(target.hostname, target.port, timeout=300)
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            try:
+                conn.request("POST", "/ingest", body, {"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except OSError:
+                status = "connection error"
+                conn.close()  # reconnects on the next request
+            elapsed = time.perf_counter() - start
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+                if status == 200:
+                    latencies.append(elapsed)
+        conn.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the local ingestion service")
+    parser.add_argument("--url", help="running service (default: start one in-process)")
+    parser.add_argument("--file", help="file to ingest (default: a generated sales CSV)")
+    parser.add_argument("--rows", type=int, default=100_000, help="rows of the generated CSV")
+    parser.add_argument("--out", default=BENCH_DIR, help="directory of the generated CSV")
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32")
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--no-cache", action="store_true", help="ingest the file on every request")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--queue-size", type=int, default=16)
+    parser.add_argument("--cold-runs", type=int, default=3,
+                        help="process-per-request baseline runs (0 to skip)")
+    args = parser.parse_args(argv)
+
+    file_path = Path(args.file) if args.file else make_test_file(args.rows, args.out)
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    service = None
+    url = args.url
+    if url is None:
+        from agents.ingestion_service import IngestionService
+        service = IngestionService(port=0, workers=args.workers, queue_size=args.queue_size,
+                                   root=file_path.resolve().parent, quiet=True).start()
+        url = service.url
+
+    print(f"🛰️  Load test: {url}, {file_path} ({'no cache' if args.no_cache else 'cache on'})")
+    if args.cold_runs:
+        cold = cold_process_latency(file_path, args.cold_runs)
+        print(f"   Process per request: p50 {percentile(cold, 50) * 1000:.0f} ms "
+              f"({args.cold_runs} runs, sequential)")
+
+    print(f"   {'clients':>7} {'ok':>6} {'503':>5} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+    try:
+        for concurrency in levels:
+            latencies, statuses, wall = run_level(url, file_path, concurrency, args.requests,
+                                                  not args.no_cache)
+            ok = statuses.get(200, 0)
+            p50 = f"{percentile(latencies, 50) * 1000:8.1f}" if latencies else f"{'-':>8}"
+            p99 = f"{percentile(latencies, 99) * 1000:8.1f}" if latencies else f"{'-':>8}"
+            other = sum(count for status, count in statuses.items() if status not in (200, 503))
+            print(f"   {concurrency:>7} {ok:>6} {statuses.get(503, 0):>5} {p50} {p99} "
+                  f"{ok / wall:8.1f}" + (f"  ({other} errors)" if other else ""))
+    finally:
+        if service is not None:
+            service.stop()
+
+
+if __name__ == "__main__":
+    main()
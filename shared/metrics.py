@@ -0,0 +1,76 @@
+"""
+Simple in-process metrics for the Agentic AI DB system.
+
+Counters (things that happened), gauges (current values) and timings
+(count/sum/min/max of observed values). Components report into the shared
+`metrics` registry and anyone can read a snapshot:
+
+    from shared.metrics import metrics
+    metrics.snapshot()["counters"]["query_cache.hits"]
+"""
+
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class Metrics:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._gauges = {}
+        self._observations = {}
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name, value):
+        """Record one value (e.g. a latency in seconds)"""
+        with self._lock:
+            stats = self._observations.get(name)
+            if stats is None:
+                self._observations[name] = {"count": 1, "sum": value, "min": value, "max": value}
+            else:
+                stats["count"] += 1
+                stats["sum"] += value
+                stats["min"] = min(stats["min"], value)
+                stats["max"] = max(stats["max"], value)
+
+    @contextmanager
+    def timer(self, name):
+        """Observe how long the with-block takes"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def counter(self, name):
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "observations": {name: dict(stats, mean=stats["sum"] / stats["count"])
+                                 for name, stats in self._observations.items()},
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._observations.clear()
+
+
+# Process-wide registry
+metrics = Metrics()
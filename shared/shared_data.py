@@ -0,0 +1,130 @@
+"""
+Zero-copy sharing of ingested datasets across worker processes.
+
+Passing state["df"] to a multiprocessing worker pickles the whole
+DataFrame into every task. publish_dataset() instead writes the dataset
+once, as an uncompressed Arrow IPC file, into shared memory (/dev/shm on
+Linux - the same tmpfs multiprocessing.shared_memory uses - or the temp
+directory elsewhere). Workers receive a SharedDataset handle, which
+pickles to a few hundred bytes, and attach() memory-maps the file: numeric
+and Arrow-backed string columns point straight at the shared pages, so
+8 workers reading a 1 GB dataset still use about 1 GB of RAM in total.
+
+The process that published a dataset owns it and removes it with
+release() (or when it exits); attached copies only close their mapping.
+"""
+
+import os
+import tempfile
+import uuid
+import weakref
+from pathlib import Path
+
+
+SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+class SharedDataset:
+    """Picklable handle to a dataset published in shared memory"""
+
+    def __init__(self, path, rows, columns, nbytes, dataset_id=None):
+        self.path = str(path)
+        self.rows = rows
+        self.columns = list(columns)
+        self.nbytes = nbytes
+        self.dataset_id = dataset_id
+        self._finalizer = None  # only set in the owning process
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_finalizer"] = None  # workers never remove the file
+        return state
+
+    def __repr__(self):
+        return (f"SharedDataset({self.dataset_id or Path(self.path).name}: "
+                f"{self.rows} rows, {self.nbytes / 1024 / 1024:.1f} MB)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    # ----- attaching -----
+
+    def table(self, columns=None):
+        """The dataset as a pyarrow Table backed by the shared pages"""
+        import pyarrow as pa
+
+        table = pa.ipc.open_file(pa.memory_map(self.path)).read_all()
+        return table.select(columns) if columns is not None else table
+
+    def attach(self, columns=None):
+        """The dataset as a DataFrame, zero-copy wherever the dtype allows
+
+        Numeric columns without nulls and Arrow-backed string columns share
+        memory with the publisher; the rest are converted.
+        The DataFrame is read-only where it is shared (pandas copies on write).
+        """
+        return self.table(columns).to_pandas(split_blocks=True)
+
+    # ----- lifetime -----
+
+    @property
+    def owner(self):
+        return self._finalizer is not None
+
+    def release(self):
+        """Remove the shared copy (publisher only; workers keep their mappings)"""
+        if self._finalizer is not None:
+            self._finalizer()
+
+
+def publish_dataset(df, dataset_id=None, directory=SHARED_DIR):
+    """Write df once into shared memory and return a SharedDataset handle"""
+    import pyarrow as pa
+
+    try:
+        table = pa.Table.from_pandas(df)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        raise ValueError(f"Failed to publish dataset: {e}")
+
+    path = Path(directory) / f"agentic_db_{os.getpid()}_{uuid.uuid4().hex[:12]}.arrow"
+    try:
+        with pa.OSFile(str(path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    except OSError as e:
+        path.unlink(missing_ok=True)
+        raise ValueError(f"Failed to publish dataset: {e}")
+
+    handle = SharedDataset(path, table.num_rows, table.column_names,
+                           path.stat().st_size, dataset_id)
+    handle._finalizer = weakref.finalize(handle, _remove, str(path))
+    return handle
+
+
+def share_state(state, dataset_id=None):
+    """Copy of state that is cheap to send to workers
+
+    state["df"] is published and replaced by its SharedDataset handle; the
+    workspace (which holds every dataset in memory) is left out.
+    """
+    shared = {key: value for key, value in state.items() if key not in ("df", "workspace")}
+    shared["workspace"] = None
+    df = state.get("df")
+    shared["df"] = None if df is None else publish_dataset(
+        df, dataset_id or state.get("dataset_id"))
+    return shared
+
+
+def attach_state(shared_state, columns=None):
+    """In a worker: turn a share_state() copy back into a normal state"""
+    state = dict(shared_state)
+    if isinstance(state.get("df"), SharedDataset):
+        state["df"] = state["df"].attach(columns)
+    return state
+
+
+def _remove(path):
+    Path(path).unlink(missing_ok=True)
@@ -4,14 +4,18 @@ Only essential fields, simple dict-based state.
 """
 
 
-def create_initial_state():
+def create_initial_state(workspace=None):
+    """Create a new state; pass a Workspace to keep every ingested dataset"""
     return {
         "status": "initialized",
         "source_type": None,
         "dataset_id": None,
         "df": None,
         "schema": None,
-        "error": None
+        "error": None,
+        "progress": None,
+        "quality": None,
+        "workspace": workspace
     }
 
 
@@ -27,7 +31,9 @@ def get_status_summary(state):
 
     status_parts = []
 
-    if state.get('status'):
+    if state.get('status') == 'loading' and state.get('progress') is not None:
+        status_parts.append(f"Status: loading ({state['progress']:.0%})")
+    elif state.get('status'):
         status_parts.append(f"Status: {state['status']}")
     if state.get('source_type'):
         status_parts.append(f"Source: {state['source_type']}")
@@ -36,4 +42,29 @@ def get_status_summary(state):
     if state.get('df') is not None:
         status_parts.append(f"Data: {state['df'].shape[0]} rows")
 
-    return " | ".join(status_parts) if status_parts else "No data loaded"
+    summary = " | ".join(status_parts) if status_parts else "No data loaded"
+
+    quality = state.get('quality')
+    if quality:
+        failed = [rule['name'] for rule in quality['rules'] if rule['status'] == 'failed']
+        unchecked = [rule['name'] for rule in quality['rules'] if rule['status'] == 'not evaluated']
+        summary += (f"\nQuality: {quality['failing_rows']}/{quality['rows_checked']} rows failing"
+                    + (f" ({', '.join(failed)})" if failed else "")
+                    + (f", not evaluated: {', '.join(unchecked)}" if unchecked else "")
+                    + (" - aborted" if quality['aborted'] else ""))
+
+    workspace = state.get('workspace')
+    if workspace is not None and len(workspace):
+        info = workspace.summary()
+        resident = sum(1 for d in info['datasets'] if d['resident'])
+        lines = [
+            f"Workspace: {len(info['datasets'])} datasets ({resident} in memory), "
+            f"{info['memory_used_mb']:.1f}/{info['memory_budget_mb']:.0f} MB "
+            f"({info['budget_used']:.0%} of budget)"
+        ]
+        for d in info['datasets']:
+            where = f"in memory ({d['memory_mb']:.1f} MB)" if d['resident'] else "spilled to disk"
+            lines.append(f"  - {d['dataset_id']}: {d['rows']} rows, {where}")
+        summary += "\n" + "\n".join(lines)
+
+    return summary
@@ -0,0 +1,299 @@
+"""
+Workspace - many datasets in one agent session, within a memory budget.
+
+Datasets are registered by dataset_id. The workspace tracks how much memory
+each DataFrame uses and, when the total goes over the budget, spills the
+least recently used ones to Arrow IPC (Feather) files on disk. Accessing a
+spilled dataset reloads it transparently through a memory map.
+
+Datasets can also carry secondary indexes (see data/indexes.py), built at
+registration for the columns in index_columns or on demand with
+create_index(), kept current by append(), and stored next to the spill files.
+"""
+
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+class Workspace:
+
+    def __init__(self, memory_budget_mb=1024, spill_dir="data/spill", index_columns=None):
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.spill_dir = Path(spill_dir)
+        self.index_columns = dict(index_columns or {})  # column -> "hash" / "sorted"
+        self._datasets = OrderedDict()  # least recently used first
+        self._lock = threading.RLock()
+        self._indexes = None
+        self._listeners = set()
+        self._versions = {}
+        self.spills = 0
+        self.reloads = 0
+
+    # =============================================
+    # 1. REGISTRATION & ACCESS
+    # =============================================
+
+    def register(self, dataset_id, df, schema=None, source_type=None):
+        """Add (or replace) a dataset and evict others if over budget"""
+        with self._lock:
+            if dataset_id in self._datasets:
+                self._delete_spill_file(self._datasets[dataset_id])
+                self.indexes.drop(dataset_id)
+            self._datasets[dataset_id] = {
+                "df": df,
+                "bytes": _frame_bytes(df),
+                "rows": len(df),
+                "columns": len(df.columns),
+                "schema": schema,
+                "source_type": source_type,
+                "spill_path": None,
+                "spill_is_current": False,
+                "last_access": time.time(),
+            }
+            self._datasets.move_to_end(dataset_id)
+            for column, kind in self.index_columns.items():
+                if column in df.columns:
+                    self.indexes.create(dataset_id, df, column, kind)
+            self._changed(dataset_id)
+            self._enforce_budget(keep=dataset_id)
+
+    def append(self, dataset_id, new_rows):
+        """Append rows to a dataset and update its indexes incrementally"""
+        import pandas as pd
+
+        with self._lock:
+            current = self.get(dataset_id)
+            start = len(current)
+            combined = pd.concat([current, new_rows], ignore_index=True)
+            entry = self._entry(dataset_id)
+            self._delete_spill_file(entry)
+            entry.update({
+                "df": combined,
+                "bytes": _frame_bytes(combined),
+                "rows": len(combined),
+                "columns": len(combined.columns),
+                "spill_path": None,
+                "spill_is_current": False,
+            })
+            self.indexes.on_append(dataset_id, new_rows, start, full_df=combined)
+            self._changed(dataset_id)
+            self._enforce_budget(keep=dataset_id)
+            return combined
+
+    def get(self, dataset_id):
+        """Return the DataFrame, reloading it from disk if it was spilled"""
+        with self._lock:
+            entry = self._entry(dataset_id)
+            if entry["df"] is None:
+                entry["df"] = _read_spill(entry["spill_path"])
+                entry["bytes"] = _frame_bytes(entry["df"])
+                self.reloads += 1
+            entry["last_access"] = time.time()
+            self._datasets.move_to_end(dataset_id)
+            self._enforce_budget(keep=dataset_id)
+            return entry["df"]
+
+    def get_schema(self, dataset_id):
+        with self._lock:
+            return self._entry(dataset_id)["schema"]
+
+    def set_schema(self, dataset_id, schema):
+        with self._lock:
+            self._entry(dataset_id)["schema"] = schema
+
+    def replace(self, dataset_id, df, schema=None):
+        """Store a new version of an existing dataset (keeps its metadata)"""
+        with self._lock:
+            entry = self._entry(dataset_id)
+            self.register(dataset_id, df, schema or entry["schema"], entry["source_type"])
+
+    def remove(self, dataset_id):
+        with self._lock:
+            entry = self._datasets.pop(dataset_id, None)
+            if entry is not None:
+                self._delete_spill_file(entry)
+                self.indexes.drop(dataset_id)
+                self._changed(dataset_id)
+
+    def clear(self):
+        with self._lock:
+            for dataset_id in list(self._datasets):
+                self.remove(dataset_id)
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    # =============================================
+    # 2. INDEXES & LOOKUPS
+    # =============================================
+
+    @property
+    def indexes(self):
+        if self._indexes is None:
+            from data.indexes import IndexManager
+            self._indexes = IndexManager(self.spill_dir / "indexes")
+        return self._indexes
+
+    def create_index(self, dataset_id, column, kind="hash"):
+        """Build (or rebuild) an index on a dataset column"""
+        with self._lock:
+            return self.indexes.create(dataset_id, self.get(dataset_id), column, kind)
+
+    def lookup(self, dataset_id, column, value):
+        """Rows where column == value (uses an index when there is one)"""
+        return self._rows(dataset_id, [column, "=", value])
+
+    def range_lookup(self, dataset_id, column, low=None, high=None):
+        """Rows where low <= column <= high"""
+        return self._rows(dataset_id, [column, "between", [low, high]])
+
+    def index_positions(self, dataset_id, condition):
+        """Row positions matching [column, op, value] from an index, or None"""
+        column, op, value = condition
+        index = self.indexes.get(dataset_id, column)
+        if index is None:
+            return None
+        if op == "=":
+            return index.lookup(value)
+        if op == "in":
+            return index.lookup_many(value)
+        if index.kind != "sorted":
+            return None
+        if op == "between":
+            return index.range(value[0], value[1])
+        if op in (">", ">="):
+            return index.range(value, None, include_low=op == ">=")
+        if op in ("<", "<="):
+            return index.range(None, value, include_high=op == "<=")
+        return None
+
+    def _rows(self, dataset_id, condition):
+        with self._lock:
+            df = self.get(dataset_id)
+            positions = self.index_positions(dataset_id, condition)
+        if positions is None:
+            from data.query_engine import condition_mask
+            return df[condition_mask(df[condition[0]], condition[1], condition[2])]
+        return df.take(positions)
+
+    def fingerprint(self, dataset_id):
+        """Version string that changes whenever the dataset changes"""
+        return f"{dataset_id}@{self._versions.get(dataset_id, 0)}"
+
+    def add_listener(self, callback):
+        """Call callback(dataset_id) whenever a dataset is replaced, appended or removed"""
+        self._listeners.add(callback)
+
+    def __contains__(self, dataset_id):
+        return dataset_id in self._datasets
+
+    def __len__(self):
+        return len(self._datasets)
+
+    def dataset_ids(self):
+        return list(self._datasets)
+
+    # =============================================
+    # 3. MEMORY ACCOUNTING
+    # =============================================
+
+    def memory_usage(self):
+        """Bytes used by datasets currently held in memory"""
+        with self._lock:
+            return sum(entry["bytes"] for entry in self._datasets.values()
+                       if entry["df"] is not None)
+
+    def summary(self):
+        """Per-dataset residency and the budget usage"""
+        with self._lock:
+            datasets = [{
+                "dataset_id": dataset_id,
+                "resident": entry["df"] is not None,
+                "memory_mb": round(entry["bytes"] / 1024 / 1024, 2),
+                "rows": entry["rows"],
+                "columns": entry["columns"],
+                "source_type": entry["source_type"],
+                "spill_path": str(entry["spill_path"]) if entry["spill_path"] else None,
+            } for dataset_id, entry in self._datasets.items()]
+            used = self.memory_usage()
+            return {
+                "datasets": datasets,
+                "memory_used_mb": round(used / 1024 / 1024, 2),
+                "memory_budget_mb": round(self.memory_budget / 1024 / 1024, 2),
+                "budget_used": used / self.memory_budget if self.memory_budget else 0.0,
+                "spills": self.spills,
+                "reloads": self.reloads,
+            }
+
+    # =============================================
+    # 4. HELPER METHODS (Eviction and spill files)
+    # =============================================
+
+    def _entry(self, dataset_id):
+        if dataset_id not in self._datasets:
+            raise KeyError(f"Dataset not in workspace: {dataset_id}")
+        return self._datasets[dataset_id]
+
+    def _changed(self, dataset_id):
+        self._versions[dataset_id] = self._versions.get(dataset_id, 0) + 1
+        for callback in list(self._listeners):
+            callback(dataset_id)
+
+    def _enforce_budget(self, keep=None):
+        """Spill least recently used datasets until the budget is met"""
+        for dataset_id, entry in list(self._datasets.items()):
+            if self.memory_usage() <= self.memory_budget:
+                break
+            if dataset_id == keep or entry["df"] is None:
+                continue
+            self._spill(dataset_id, entry)
+
+    def _spill(self, dataset_id, entry):
+        if not entry["spill_is_current"]:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            entry["spill_path"] = _write_spill(entry["df"], self.spill_dir / dataset_id)
+            entry["spill_is_current"] = True
+        if self._indexes is not None:
+            # Indexes follow their dataset to disk and come back memory-mapped
+            self._indexes.flush(dataset_id, entry["df"])
+            self._indexes.release(dataset_id)
+        entry["df"] = None
+        self.spills += 1
+
+    def _delete_spill_file(self, entry):
+        if entry["spill_path"] is not None:
+            Path(entry["spill_path"]).unlink(missing_ok=True)
+
+
+def _frame_bytes(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def _write_spill(df, base_path):
+    """Write an uncompressed Arrow IPC file (memory-mappable); pickle as fallback"""
+    import pandas as pd
+
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        path = Path(f"{base_path}.arrow")
+        table = pa.Table.from_pandas(df)
+        feather.write_feather(table, path, compression="uncompressed")
+        return path
+    except Exception:
+        # Mixed-type object columns cannot be stored as Arrow
+        path = Path(f"{base_path}.pkl")
+        pd.to_pickle(df, path)
+        return path
+
+
+def _read_spill(path):
+    import pandas as pd
+
+    path = Path(path)
+    if path.suffix == ".arrow":
+        import pyarrow.feather as feather
+        return feather.read_table(path, memory_map=True).to_pandas()
+    return pd.read_pickle(path)
@@ -0,0 +1,149 @@
+"""
+Tests for the LLM configuration helpers
+Runs fully offline with the local FakeChatModel
+"""
+
+from config.fake_model import FakeChatModel
+from config.llm_cache import CachedModel, ResponseCache
+import config.gemini_config as gemini_config
+from pathlib import Path
+
+
+def test_client_cache():
+    """Test that clients are created once per model/temperature"""
+    print("🔍 Testing Client Cache")
+    print("-" * 30)
+
+    created = []
+    original = gemini_config.create_gemini_model
+
+    def fake_create(api_key=None, model_name="gemini-pro", temperature=0.1):
+        created.append((model_name, temperature))
+        return FakeChatModel(model=model_name, temperature=temperature)
+
+    gemini_config.clear_model_cache()
+    gemini_config.create_gemini_model = fake_create
+    try:
+        first = gemini_config.get_gemini_model()
+        second = gemini_config.get_gemini_model()
+        warm = gemini_config.get_gemini_model(temperature=0.7)
+    finally:
+        gemini_config.create_gemini_model = original
+        gemini_config.clear_model_cache()
+
+    assert first is second, "Same model/temperature should reuse the client"
+    assert warm is not first, "A different temperature needs its own client"
+    assert created == [("gemini-pro", 0.1), ("gemini-pro", 0.7)]
+
+    print("✅ Client cache test passed!")
+    return True
+
+
+def test_response_cache():
+    """Test that identical prompts never reach the model twice"""
+    print("🔍 Testing Response Cache")
+    print("-" * 30)
+
+    Path("data").mkdir(exist_ok=True)
+    cache_path = Path("data/test_llm_cache.db")
+    for suffix in ("", "-wal", "-shm"):
+        Path(str(cache_path) + suffix).unlink(missing_ok=True)
+
+    fake = FakeChatModel(responder=lambda prompt: f"Described: {len(prompt)} chars")
+    model = CachedModel(fake, cache=ResponseCache(cache_path))
+
+    prompt = "Describe this schema: id int64, name str, value float64"
+    first = model.invoke(prompt)
+    second = model.invoke(prompt)
+    assert first.content == second.content
+    assert fake.call_count == 1, f"Expected 1 model call, got {fake.call_count}"
+    assert second.response_metadata.get("cached") is True
+
+    # A different model with the same prompt is a different cache entry
+    other = CachedModel(FakeChatModel(model="fake-other"), cache=model.cache)
+    other.invoke(prompt)
+    assert other.model.call_count == 1
+
+    # The cache survives a restart (new connection to the same file)
+    model.cache.close()
+    restarted = CachedModel(fake, cache=ResponseCache(cache_path))
+    assert restarted.invoke(prompt).content == first.content
+    assert fake.call_count == 1
+    restarted.cache.close()
+
+    print("✅ Response cache test passed!")
+    return True
+
+
+def test_schema_summarizer():
+    """Test token-budgeted schema summaries and batched prompts"""
+    print("🔍 Testing Schema Summarizer")
+    print("-" * 30)
+
+    from agents.schema_summarizer import SchemaBatcher, summarize_schema
+
+    def wide_schema(prefix, n):
+        columns = [f"{prefix}_id"] + [f"{prefix}_metric_{i}" for i in range(n)]
+        types = {col: "float64" for col in columns}
+        types[f"{prefix}_id"] = "int64"
+        return {"columns": columns, "total_rows": 1000,
+                "total_columns": len(columns), "data_types": types}
+
+    stub = FakeChatModel(max_input_tokens=800)
+    schema = wide_schema("sales", 300)
+
+    summary = summarize_schema(schema, token_budget=200, dataset_id="sales",
+                               count_tokens=stub.get_num_tokens)
+    assert stub.get_num_tokens(summary) <= 200, "Summary must fit the budget"
+    assert "x300" in summary, "Similar columns should be grouped"
+
+    # Ten wide datasets packed into a few prompts, each under the model limit
+    schemas = {f"ds_{i}": wide_schema(f"table{i}", 200 + i) for i in range(10)}
+
+    def answer(prompt):
+        ids = [line.split("Dataset: ")[1].split(" |")[0]
+               for line in prompt.splitlines() if line.startswith("Dataset: ")]
+        return "\n".join(f"### {dataset_id}\nWide metrics table." for dataset_id in ids)
+
+    stub = FakeChatModel(responder=answer, max_input_tokens=250)
+    batcher = SchemaBatcher(stub, max_prompt_tokens=250, per_dataset_tokens=150,
+                            max_concurrency=3, requests_per_minute=600,
+                            count_tokens=stub.get_num_tokens)
+    descriptions = batcher.describe(schemas)
+
+    assert set(descriptions) == set(schemas), "Every dataset needs a description"
+    assert 1 < stub.call_count < len(schemas), "Datasets should share requests"
+    assert max(stub.prompt_tokens) <= 250
+
+    print("✅ Schema summarizer test passed!")
+    print(f"   {len(schemas)} datasets described in {stub.call_count} requests")
+    return True
+
+
+def run_comprehensive_test():
+    """Run all tests and report results"""
+    print("🚀 LLM Configuration Test")
+    print("=" * 50)
+
+    tests = [
+        ("Client Cache", test_client_cache),
+        ("Response Cache", test_response_cache),
+        ("Schema Summarizer", test_schema_summarizer)
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                passed += 1
+                print(f"✅ {test_name}: PASSED\n")
+        except Exception as e:
+            print(f"❌ {test_name}: FAILED - {e}\n")
+
+    print(f"📊 Overall: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = run_comprehensive_test()
+    exit(0 if success else 1)
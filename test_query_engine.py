@@ -0,0 +1,289 @@
+"""
+Tests for querying ingested data
+Covers the SQL subset, structured queries, joins, pushdown, indexes and result caching
+"""
+
+from data.query_engine import PlanCache, QueryEngine, QueryError, get_default_plan_cache, run_query
+from shared.state import create_initial_state
+from agents.ingestion import ingest_data_file
+import numpy as np
+import pandas as pd
+import sqlite3
+from pathlib import Path
+
+
+def make_sales(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'sale_id': np.arange(n),
+        'product_id': rng.integers(1, 6, n),
+        'amount': rng.random(n) * 100,
+        'region': rng.choice(['North', 'South', 'East', 'West'], n)
+    })
+
+
+PRODUCTS = pd.DataFrame({
+    'product_id': [1, 2, 3, 4, 5],
+    'name': ['Laptop', 'Mouse', 'Keyboard', 'Monitor', 'Headphones'],
+    'category': ['Electronics', 'Accessories', 'Accessories', 'Electronics', 'Accessories']
+})
+
+
+def test_sql_queries():
+    """Test filter / group-by / aggregate / join with the SQL subset"""
+    print("🔍 Testing SQL Queries")
+    print("-" * 30)
+
+    sales = make_sales()
+    engine = QueryEngine()
+    engine.register('sales', sales)
+    engine.register('products', PRODUCTS)
+
+    result = engine.execute(
+        "SELECT region, SUM(amount) AS total, COUNT(*) AS orders FROM sales "
+        "WHERE amount > 10 AND region IN ('North', 'South') "
+        "GROUP BY region ORDER BY total DESC")
+    expected = sales[(sales.amount > 10) & sales.region.isin(['North', 'South'])] \
+        .groupby('region')['amount'].agg(['sum', 'size'])
+    assert list(result['region']) == list(expected['sum'].sort_values(ascending=False).index)
+    assert np.allclose(result.set_index('region')['total'], expected['sum'].loc[result['region']])
+    assert list(result['orders']) == list(expected['size'].loc[result['region']])
+
+    result = engine.execute(
+        "SELECT category, COUNT(DISTINCT region) AS regions FROM sales "
+        "JOIN products ON sales.product_id = products.product_id GROUP BY category")
+    assert set(result['category']) == {'Electronics', 'Accessories'}
+    assert result['regions'].max() == 4
+
+    result = engine.execute(
+        "SELECT name, COUNT(*) AS n FROM sales JOIN products ON sales.product_id = "
+        "products.product_id WHERE products.category = 'Electronics' AND sales.amount > 50 "
+        "GROUP BY name")
+    assert set(result['name']) == {'Laptop', 'Monitor'}
+    assert result['n'].sum() == ((sales.amount > 50) & sales.product_id.isin([1, 4])).sum()
+
+    for query in ["SELECT region FROM sales WHERE amount > 1 OR amount < 0",
+                  "SELECT region FROM sales GROUP BY region"]:
+        try:
+            engine.execute(query)
+            assert False, f"should be rejected: {query}"
+        except QueryError:
+            pass
+
+    print("✅ SQL queries test passed!")
+    return True
+
+
+def test_structured_queries_and_plan_cache():
+    """Test dict queries and reuse of cached plans for the same shape"""
+    print("🔍 Testing Structured Queries")
+    print("-" * 30)
+
+    sales = make_sales()
+    engine = QueryEngine(plan_cache=PlanCache())
+    engine.register('sales', sales)
+
+    for region in ['North', 'South', 'East']:
+        result = engine.execute({
+            "from": "sales",
+            "select": ["sale_id", "amount"],
+            "where": [["region", "=", region], ["amount", ">=", 90]],
+            "order_by": [["amount", "desc"]],
+            "limit": 3
+        })
+        expected = sales[(sales.region == region) & (sales.amount >= 90)] \
+            .nlargest(3, 'amount')['sale_id']
+        assert list(result['sale_id']) == list(expected)
+
+    stats = engine.plan_cache.stats()
+    assert stats['misses'] == 1 and stats['hits'] == 2, stats
+
+    print("✅ Structured queries test passed!")
+    return True
+
+
+def test_pushdown_sources():
+    """Test that lazy CSV/SQLite sources give the same answers with pushdown"""
+    print("🔍 Testing Predicate Pushdown")
+    print("-" * 30)
+
+    sales = make_sales()
+    Path("data").mkdir(exist_ok=True)
+    sales.to_csv('data/query_sales.csv', index=False)
+    conn = sqlite3.connect('data/query_products.db')
+    PRODUCTS.to_sql('products', conn, index=False, if_exists='replace')
+    conn.close()
+
+    query = ("SELECT name, SUM(amount) AS total FROM sales "
+             "JOIN products ON product_id = product_id "
+             "WHERE amount BETWEEN 10 AND 20 AND category = 'Accessories' "
+             "GROUP BY name ORDER BY name")
+
+    lazy = QueryEngine()
+    lazy.register_source('sales', 'data/query_sales.csv')
+    lazy.register_source('products', 'data/query_products.db', table='products')
+    plan = lazy.explain(query)
+    assert plan['pushed_down'] == {
+        'sales': [['amount', 'between', [10, 20]]],
+        'products': [['category', '=', 'Accessories']]}
+    assert plan['in_engine'] == []
+
+    memory = QueryEngine()
+    memory.register('sales', sales)
+    memory.register('products', PRODUCTS)
+
+    pd.testing.assert_frame_equal(lazy.execute(query), memory.execute(query))
+
+    # Date literals on a CSV date column are compared as dates
+    pd.DataFrame({'region': ['N', 'S', 'N', 'N'],
+                  'd': ['2024-01-15', '2024-02-03', '2024-02-01', '2024-03-09']}).to_csv(
+        'data/query_dates.csv', index=False)
+    lazy.register_source('dated', 'data/query_dates.csv')
+    result = lazy.execute("SELECT region FROM dated WHERE region = 'N' AND d >= '2024-02-01'")
+    assert len(result) == 2
+    try:
+        lazy.execute("SELECT region FROM dated WHERE d >= 'soon'")
+        assert False, "an uncomparable literal should be rejected"
+    except QueryError:
+        pass
+
+    # Queries straight from an ingestion state
+    state = ingest_data_file('data/query_sales.csv', create_initial_state())
+    total = run_query(state, "SELECT COUNT(*) AS n FROM data WHERE region = 'West'")
+    assert total['n'][0] == (state['df'].region == 'West').sum()
+
+    # run_query builds an engine per call but shares the plan cache
+    hits = get_default_plan_cache().stats()['hits']
+    total = run_query(state, "SELECT COUNT(*) AS n FROM data WHERE region = 'East'")
+    assert total['n'][0] == (state['df'].region == 'East').sum()
+    assert get_default_plan_cache().stats()['hits'] == hits + 1
+
+    print("✅ Pushdown test passed!")
+    return True
+
+
+def test_indexes():
+    """Test hash/sorted indexes, appends, persistence and use in queries"""
+    print("🔍 Testing Indexes")
+    print("-" * 30)
+
+    from shared.workspace import Workspace
+
+    rng = np.random.default_rng(1)
+    n = 200000
+    orders = pd.DataFrame({
+        'customer_id': rng.integers(0, 5000, n),
+        'order_date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, n), unit='D'),
+        'amount': rng.random(n) * 100
+    })
+
+    workspace = Workspace(spill_dir='data/index_test', index_columns={'customer_id': 'hash'})
+    workspace.register('orders', orders)
+    workspace.create_index('orders', 'order_date', 'sorted')
+
+    rows = workspace.lookup('orders', 'customer_id', 42)
+    pd.testing.assert_frame_equal(rows, orders[orders.customer_id == 42])
+    rows = workspace.range_lookup('orders', 'order_date', '2024-03-01', '2024-03-07')
+    expected = orders[orders.order_date.between('2024-03-01', '2024-03-07')]
+    pd.testing.assert_frame_equal(rows, expected)
+
+    # Appended rows are found without rebuilding the index
+    extra = pd.DataFrame({'customer_id': [42], 'order_date': [pd.Timestamp('2024-03-02')],
+                          'amount': [1.0]})
+    workspace.append('orders', extra)
+    assert len(workspace.lookup('orders', 'customer_id', 42)) == (orders.customer_id == 42).sum() + 1
+    assert len(workspace.range_lookup('orders', 'order_date', '2024-03-01', '2024-03-07')) == len(expected) + 1
+
+    # Indexes are saved next to the dataset and reload from disk
+    workspace.indexes.flush('orders', workspace.get('orders'))
+    workspace.indexes.release('orders')
+    assert workspace.indexes.columns('orders') == {'customer_id': 'hash', 'order_date': 'sorted'}
+    assert len(workspace.lookup('orders', 'customer_id', 42)) == (orders.customer_id == 42).sum() + 1
+
+    # The query engine answers indexed predicates through the index
+    engine = QueryEngine(workspace=workspace)
+    result = engine.execute("SELECT COUNT(*) AS n FROM orders WHERE customer_id IN (42, 43) AND amount > 50")
+    everything = workspace.get('orders')
+    assert result['n'][0] == (everything.customer_id.isin([42, 43]) & (everything.amount > 50)).sum()
+
+    # tz-aware values are indexed as UTC; lookups from another zone are converted too
+    from data.indexes import HashIndex, SortedIndex
+    stamps = pd.Series(pd.date_range('2024-01-01', periods=48, freq='h', tz='UTC'))
+    berlin = pd.Timestamp('2024-01-01 12:00', tz='Europe/Berlin')  # 11:00 UTC
+    assert list(SortedIndex(stamps).lookup(berlin)) == [11]
+    assert list(SortedIndex(stamps).range('2024-01-01 12:00+01:00', '2024-01-01 14:00+01:00')) == \
+        [11, 12, 13]
+    assert list(HashIndex(stamps).lookup(berlin)) == [11]
+
+    workspace.clear()
+    print("✅ Indexes test passed!")
+    return True
+
+
+def test_result_cache():
+    """Test that repeated queries hit the result cache until the data changes"""
+    print("🔍 Testing Result Cache")
+    print("-" * 30)
+
+    from data.result_cache import QueryResultCache
+    from shared.metrics import Metrics
+    from shared.workspace import Workspace
+
+    metrics = Metrics()
+    cache = QueryResultCache(metrics=metrics)
+    workspace = Workspace(spill_dir='data/result_cache_test')
+    workspace.register('sales', make_sales())
+    engine = QueryEngine(workspace=workspace, result_cache=cache)
+
+    query = "SELECT region, SUM(amount) AS total FROM sales GROUP BY region ORDER BY region"
+    first = engine.execute(query)
+    second = engine.execute(query)
+    pd.testing.assert_frame_equal(first, second)
+    assert metrics.counter('query_cache.misses') == 1
+    assert metrics.counter('query_cache.hits') == 1
+
+    # Appending changes the dataset version, so the cached result is dropped
+    workspace.append('sales', make_sales(10, seed=1))
+    assert cache.stats()['entries'] == 0
+    third = engine.execute(query)
+    assert not np.allclose(third['total'], first['total'])
+    assert metrics.counter('query_cache.misses') == 2
+
+    # Editing a returned frame does not change the cached one
+    third['total'] = 0.0
+    assert engine.execute(query)['total'].sum() > 0
+
+    workspace.clear()
+    print("✅ Result cache test passed!")
+    return True
+
+
+def run_comprehensive_test():
+    """Run all tests and report results"""
+    print("🚀 Query Engine Test")
+    print("=" * 50)
+
+    tests = [
+        ("SQL Queries", test_sql_queries),
+        ("Structured Queries", test_structured_queries_and_plan_cache),
+        ("Predicate Pushdown", test_pushdown_sources),
+        ("Indexes", test_indexes),
+        ("Result Cache", test_result_cache)
+    ]
+
+    passed = 0
+    for test_name, test_func in tests:
+        try:
+            if test_func():
+                passed += 1
+                print(f"✅ {test_name}: PASSED\n")
+        except Exception as e:
+            print(f"❌ {test_name}: FAILED - {e}\n")
+
+    print(f"📊 Overall: {passed}/{len(tests)} tests passed")
+    return passed == len(tests)
+
+
+if __name__ == "__main__":
+    success = run_comprehensive_test()
+    exit(0 if success else 1)